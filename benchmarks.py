@@ -0,0 +1,309 @@
+import os
+import time
+
+import numpy as np
+from scipy.stats import pearsonr
+
+from bitStream.file_binary_io import FileIO
+from constellation import Constellation
+from decimator import Decimator
+from demodulator import Demodulator
+from modulator import Modulator
+from noise_source import NoiseSource
+from parallel_demodulator import parallel_mpsk_demod
+from pipeline import NoiseSweep, transmit
+from pulse_shaping import MatchedFilter, PulseShaper
+from radio_channel import Channel
+
+
+def measure(function, *args, repeat=3):
+    """
+    Run function a few times and return the best time.
+    Parameters
+    ----------
+    function Function to be measured.
+    args Arguments passed to the function.
+    repeat Number of runs.
+
+    Returns
+    -------
+    float Best time in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def legacy_mpsk_mod(bits, m, period=6, amplitude=1, sample_rate=100):
+    """
+    Build sinwave the way the original make_*_mod did: timeline of the whole signal, one period of sinwave
+    for every phase, and a python list extended by the period of every symbol.
+    Parameters
+    ----------
+    bits List of bits, number of them divisible by log2(m).
+    m Number of phases.
+    period Period of sinwave.
+    amplitude Amplitude of sinwave.
+    sample_rate Number of samples per milisecond.
+
+    Returns
+    -------
+    tuple Timeline and list of samples.
+    """
+    bits_per_symbol = int(np.log2(m))
+    bits = list(bits)
+    timeline = np.arange(0, period * len(bits) / bits_per_symbol, 1 / sample_rate)
+    linspace = np.arange(0, period, 1 / sample_rate)
+    sinwaves = [amplitude * np.sin(2 * np.pi / period * linspace + (2 * k + 1) * np.pi / m) for k in range(m)]
+
+    sinwave = []
+    for i in range(0, len(bits), bits_per_symbol):
+        value = 0
+        for bit in bits[i:i + bits_per_symbol]:
+            value = 2 * value + (1 if bit == 1 else 0)
+        sinwave.extend(sinwaves[value])
+    return timeline, sinwave
+
+
+def legacy_correlate(sinwave, m, period=6, amplitude=1, sample_rate=100):
+    """
+    Find phases of symbols the way the original __generate_complex_* did: every symbol is correlated
+    with every pattern by pearsonr and the first best pattern gives the point.
+    Parameters
+    ----------
+    sinwave Received sinwave.
+    m Number of phases.
+    period Period of sinwave.
+    amplitude Amplitude of sinwave.
+    sample_rate Number of samples per milisecond.
+
+    Returns
+    -------
+    list Complex points of symbols.
+    """
+    linspace = np.arange(0, period, 1 / sample_rate)
+    thetas = [(2 * k + 1) * np.pi / m for k in range(m)]
+    patterns = [amplitude * np.sin(2 * np.pi / period * linspace + theta) for theta in thetas]
+
+    complex_numbers = []
+    for start in range(0, len(sinwave), period * sample_rate):
+        sample = sinwave[start:start + period * sample_rate]
+        coefficients = [pearsonr(sample, pattern)[0] for pattern in patterns]
+        phi = thetas[coefficients.index(max(coefficients))]
+        complex_numbers.append(np.cos(phi) + 1j * np.sin(phi))
+    return complex_numbers
+
+
+def benchmark_modulation(file_name=os.path.join("computerA", "cloud.png")):
+    # time of modulating the whole file with every psk, per-symbol list build of the original modulator
+    # against the waveform table
+    bits = FileIO(file_name).read_from_file()
+    modulator = Modulator()
+
+    for m in (2, 4, 8, 16):
+        length = len(bits) - len(bits) % int(np.log2(m))
+        legacy = measure(legacy_mpsk_mod, bits[:length], m, repeat=1)
+        table = measure(modulator.make_mpsk_mod, bits[:length], m)
+        print("{0}-psk modulation: legacy {1:.4f}s, table {2:.4f}s, speedup {3:.0f}x".format(
+            m, legacy, table, legacy / table))
+
+
+def benchmark_correlation(file_name=os.path.join("computerA", "cloud.png")):
+    # time of finding phases of the whole noise-free file, pearsonr loop of the original demodulator
+    # against the pattern correlator
+    bits = FileIO(file_name).read_from_file()
+    modulator = Modulator()
+    demodulator = Demodulator()
+
+    for m in (4, 8, 16):
+        signal = modulator.make_mpsk_mod(bits, m)
+        legacy = measure(legacy_correlate, signal.get_sinwave(), m, repeat=1)
+        matrix = measure(demodulator.correlate_symbols, signal, m)
+        print("{0}-psk correlation: legacy {1:.4f}s, matrix {2:.4f}s, speedup {3:.0f}x".format(
+            m, legacy, matrix, legacy / matrix))
+
+
+def benchmark_projection(file_name=os.path.join("computerA", "cloud.png")):
+    # time of finding points of the whole noise-free file with sine and cosine projection
+    bits = FileIO(file_name).read_from_file()
+    modulator = Modulator()
+    demodulator = Demodulator(detection=Demodulator.PROJECTION)
+
+    for m in (2, 4, 8, 16):
+        signal = modulator.make_mpsk_mod(bits, m)
+        print("{0}-psk projection: {1:.4f}s".format(m, measure(demodulator.project_symbols, signal)))
+
+
+def benchmark_detection(number_of_bits=240000, seed=0):
+    # time of finding points of noise-free 16-psk signal with correlation, projection and fft detection,
+    # symbols of one and of a few periods of sinwave
+    bits = np.random.default_rng(seed).integers(0, 2, number_of_bits)
+
+    for cycles in (1, 4):
+        signal = Modulator(cycles_per_symbol=cycles).make_mpsk_mod(bits, 16)
+        correlation = Demodulator(cycles_per_symbol=cycles)
+        projection = Demodulator(detection=Demodulator.PROJECTION, cycles_per_symbol=cycles)
+        fft = Demodulator(detection=Demodulator.FFT, cycles_per_symbol=cycles)
+        print("{0} period(s) per symbol: correlation {1:.4f}s, projection {2:.4f}s, fft {3:.4f}s".format(
+            cycles, measure(correlation.correlate_symbols, signal, 16), measure(projection.project_symbols, signal),
+            measure(fft.fft_symbols, signal)))
+
+
+def benchmark_decimation(number_of_bits=120000, seed=0, factors=(1, 2, 5, 10, 25, 50, 100), half_lengths=(10, 3)):
+    # bit error rate and time of detection with projection after decimation by growing factors.
+    # Time is split into the anti-alias filter and the detection of decimated samples, slowdown is the total
+    # against projection without decimator: the filter costs more than the detection it saves at every factor,
+    # so decimation is a net slowdown of detection
+    bits = np.random.default_rng(seed).integers(0, 2, number_of_bits)
+    modulator = Modulator()
+    noises = {2: 8, 4: 6, 8: 3, 16: 1.5}
+
+    for m, noise in noises.items():
+        signal = modulator.make_mpsk_mod(bits, m)
+        full_rate = measure(Demodulator(detection=Demodulator.PROJECTION).project_symbols, signal)
+        for half_length in half_lengths:
+            results = []
+            for factor in factors:
+                decimator = Decimator(factor, half_length)
+                demodulator = Demodulator(detection=Demodulator.PROJECTION, decimator=decimator, draw_diagram=False)
+                received = transmit(bits, m, noise, modulator, Channel(seed=seed), demodulator)
+                total = measure(demodulator.project_symbols, signal)
+                filtering = measure(decimator.decimate, signal.get_sinwave()) if factor > 1 else 0.0
+                results.append("x{0}: BER {1:.5f}, {2:.3f}s = filter {3:.3f}s + detection {4:.3f}s, "
+                               "slowdown {5:.1f}x".format(factor, np.mean(received != bits), total, filtering,
+                                                          max(0.0, total - filtering), total / full_rate))
+            print("{0}-psk noise {1}, filter half length {2}, projection without decimator {3:.3f}s:\n  {4}".format(
+                m, noise, half_length, full_rate, "\n  ".join(results)))
+
+
+def benchmark_shaping(number_of_bits=40000, seed=0):
+    # time of overlap-save filter against direct convolution, power of the sinwave outside of the band
+    # of root raised cosine, and bit error rate of shaped signal with matched filter against rectangular one
+    rng = np.random.default_rng(seed)
+    shaper = PulseShaper()
+    engine = shaper.make_filter(600)
+    samples = rng.standard_normal(200000)
+    print("{0} taps, 200000 samples: direct convolution {1:.3f}s, overlap-save {2:.3f}s".format(
+        len(engine.taps), measure(np.convolve, samples, engine.taps, repeat=1), measure(engine.apply, samples)))
+
+    bits = rng.integers(0, 2, number_of_bits)
+    band = (1 + shaper.rolloff) / 2
+    for name, modulator in (("rectangular", Modulator()), ("root raised cosine", Modulator(shaper=shaper))):
+        sinwave = modulator.make_mpsk_mod(bits[:4000], 4).get_sinwave()
+        power = np.abs(np.fft.rfft(sinwave)) ** 2
+        # frequency in symbol rates from the carrier, one period of carrier per symbol
+        offset = np.abs(np.arange(len(power)) * 600 / len(sinwave) - 1)
+        print("{0}: {1:.2e} of power further than {2} symbol rate from carrier".format(
+            name, power[offset > band].sum() / power.sum(), band))
+
+    noises = {2: 8, 4: 6, 8: 3, 16: 1.5}
+    for m, noise in noises.items():
+        rectangular = transmit(bits, m, noise, Modulator(), Channel(seed=seed),
+                               Demodulator(detection=Demodulator.PROJECTION, draw_diagram=False))
+        start = time.perf_counter()
+        shaped = transmit(bits, m, noise, Modulator(shaper=shaper), Channel(seed=seed),
+                          Demodulator(matched_filter=MatchedFilter(shaper), draw_diagram=False))
+        print("{0}-psk noise {1}: rectangular BER {2:.5f}, shaped BER {3:.5f} ({4:.2f}s)".format(
+            m, noise, np.mean(rectangular != bits), np.mean(shaped != bits), time.perf_counter() - start))
+
+
+def benchmark_slicing(number_of_symbols=4000000):
+    # time of turning random points into bits
+    demodulator = Demodulator()
+    points = np.exp(2j * np.pi * np.random.default_rng(0).random(number_of_symbols))
+
+    for m in (2, 4, 8, 16, 64):
+        print("{0}-psk slicing of {1} points: {2:.4f}s".format(
+            m, number_of_symbols, measure(demodulator.slice_symbols, points, m)))
+
+    # qam cells are found by rounding, cost does not grow with the order, unlike search of the nearest point
+    points = points * np.sqrt(np.random.default_rng(1).random(number_of_symbols) * 2)
+    rng = np.random.default_rng(2)
+    custom = Constellation(rng.standard_normal(16) + 1j * rng.standard_normal(16))
+    for constellation in [Constellation.qam(m) for m in (16, 32, 64, 256, 1024)] + [custom]:
+        print("{0} slicing ({1}) of {2} points: {3:.4f}s".format(
+            constellation.name, constellation.decision, number_of_symbols,
+            measure(demodulator.slice_symbols, points, constellation)))
+
+
+def benchmark_noise(number_of_samples=10**7, number_of_bits=120000, seed=0, threads=(2, 4)):
+    # time of filling a buffer with unit noise: float64 and float32 samples, threaded block fill and copy
+    # of a noise bank, then time of a noise sweep with fresh noise and with common noise copied from the bank
+    for dtype in (np.float64, np.float32):
+        out = np.empty(number_of_samples, dtype=dtype)
+        results = ["one stream {0:.3f}s".format(measure(NoiseSource(seed).fill, out))]
+        for number_of_threads in threads:
+            results.append("{0} threads {1:.3f}s".format(
+                number_of_threads, measure(NoiseSource(seed, threads=number_of_threads).fill, out)))
+        bank = NoiseSource(seed, bank_size=number_of_samples, bank_dtype=dtype)
+        results.append("bank copy {0:.3f}s".format(measure(bank.fill, out)))
+        print("{0} noise of {1} samples: {2}".format(np.dtype(dtype).name, number_of_samples, ", ".join(results)))
+
+    bits = np.random.default_rng(seed).integers(0, 2, number_of_bits)
+    noises = np.linspace(0.01, 0.5, 8)
+    demodulator = Demodulator(detection=Demodulator.PROJECTION, draw_diagram=False)
+    for common_noise in (False, True):
+        sweep = NoiseSweep(bits, 4, demodulator=demodulator, common_noise=common_noise, seed=seed)
+        start = time.perf_counter()
+        for noise in noises:
+            sweep.transmit(noise)
+        print("4-psk sweep of {0} levels, {1} noise: {2:.3f}s".format(
+            len(noises), "common" if common_noise else "fresh", time.perf_counter() - start))
+
+
+def benchmark_parallel(number_of_bits=400000, seed=0, workers=(1, 2, 4)):
+    # time of demodulation of a noisy 16-psk sinwave in one process and sharded over growing number of processes,
+    # bits of every number of processes have to equal bits of sequential demodulation
+    bits = np.random.default_rng(seed).integers(0, 2, number_of_bits)
+    signal = Channel(seed=seed).send_signal(Modulator().make_mpsk_mod(bits, 16), 0.3, copy=False)
+    print("{0} processors".format(os.cpu_count()))
+
+    for detection in (Demodulator.CORRELATION, Demodulator.PROJECTION):
+        demodulator = Demodulator(detection=detection, draw_diagram=False)
+        start = time.perf_counter()
+        sequential = demodulator.make_mpsk_demod(signal, Channel(0.3, seed=seed + 1), 16)
+        results = ["sequential {0:.3f}s".format(time.perf_counter() - start)]
+        for number_of_workers in workers:
+            start = time.perf_counter()
+            parallel = parallel_mpsk_demod(demodulator, signal, Channel(0.3, seed=seed + 1), 16, number_of_workers)
+            elapsed = time.perf_counter() - start
+            results.append("{0} workers {1:.3f}s{2}".format(
+                number_of_workers, elapsed, "" if np.array_equal(parallel, sequential) else " DIFFERENT"))
+        print("16-psk {0} of {1} samples: {2}".format(detection, signal.get_sinwave().size, ", ".join(results)))
+
+
+def benchmark_sample_types(number_of_bits=120000, seed=0):
+    # size of signal and bit error rate of every psk with float64, float32 and int16 samples,
+    # int16 samples use default full scale (64 * amplitude) and full scale fitted to the noise
+    bits = np.random.default_rng(seed).integers(0, 2, number_of_bits)
+    noises = {2: 8, 4: 6, 8: 3, 16: 1.5}
+
+    for m, noise in noises.items():
+        results = []
+        for dtype, full_scale in ((np.float64, None), (np.float32, None), (np.int16, None), (np.int16, 4 * noise)):
+            modulator = Modulator(dtype=dtype, full_scale=full_scale)
+            demodulator = Demodulator(detection=Demodulator.PROJECTION, dtype=dtype)
+            size = modulator.make_mpsk_mod(bits, m).get_sinwave().nbytes
+            received = transmit(bits, m, noise, modulator, Channel(seed=seed), demodulator)
+            results.append("{0}{1}: {2:.1f}MB BER {3:.5f}".format(
+                np.dtype(dtype).name, "" if full_scale is None else " (full scale {0})".format(full_scale),
+                size / 1e6, np.mean(received != bits)))
+        print("{0}-psk noise {1}: {2}".format(m, noise, ", ".join(results)))
+
+
+if __name__ == "__main__":
+    benchmark_modulation()
+    benchmark_correlation()
+    benchmark_projection()
+    benchmark_detection()
+    benchmark_decimation()
+    benchmark_shaping()
+    benchmark_slicing()
+    benchmark_noise()
+    benchmark_parallel()
+    benchmark_sample_types()
@@ -0,0 +1,154 @@
+import numpy as np
+from scipy.stats import norm
+
+import pipeline
+import utils
+from demodulator import Demodulator
+from modulator import Modulator
+from noise_to_bit_distortion import constellation_of
+from radio_channel import Channel
+
+
+class BerEstimate:
+    """
+    Bit error rate estimated by Monte Carlo simulation.
+    """
+
+    def __init__(self, errors, bits, interval, batches, converged):
+        """
+        Parameters
+        ----------
+        errors Number of wrong bits.
+        bits Number of simulated bits.
+        interval Tuple (lower, upper) bound of confidence interval of bit error rate.
+        batches Number of simulated payloads.
+        converged True if a stop condition was met before reaching maximal number of bits.
+        """
+        self.errors = errors
+        self.bits = bits
+        self.interval = interval
+        self.batches = batches
+        self.converged = converged
+
+    @property
+    def ber(self) -> float:
+        return self.errors / self.bits if self.bits else 0.0
+
+    def __repr__(self):
+        return "BerEstimate(ber={0:.3e}, interval=({1:.3e}, {2:.3e}), bits={3}, errors={4}, converged={5})".format(
+            self.ber, self.interval[0], self.interval[1], self.bits, self.errors, self.converged)
+
+
+def wilson_interval(errors, bits, confidence=0.95):
+    """
+    Compute Wilson score interval of bit error rate, which stays meaningful for zero or few errors.
+    Parameters
+    ----------
+    errors Number of wrong bits.
+    bits Number of simulated bits.
+    confidence Confidence level of the interval.
+
+    Returns
+    -------
+    tuple Lower and upper bound.
+    """
+    if bits == 0:
+        return 0.0, 1.0
+    z = norm.ppf(0.5 + confidence / 2)
+    p = errors / bits
+    denominator = 1 + z * z / bits
+    center = (p + z * z / (2 * bits)) / denominator
+    half_width = z * np.sqrt(p * (1 - p) / bits + z * z / (4 * bits * bits)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+class BerEstimator:
+    """
+    Monte Carlo estimation of bit error rate of one psk type or constellation.
+    Random payloads are sent through modulator, channel and demodulator until the estimate is precise enough.
+    """
+
+    def __init__(self, psk_type, target_errors=100, interval_width=None, relative_width=None, confidence=0.95,
+                 batch_size=20000, max_bits=10**7, seed=None, baseband=False, detection=Demodulator.CORRELATION):
+        """
+        Parameters
+        ----------
+        psk_type Type of psk or constellation to be tested.
+        target_errors Stop after this number of wrong bits, ignored if None.
+        interval_width Stop when confidence interval is not wider than this, ignored if None.
+        relative_width Stop when confidence interval is not wider than this fraction of bit error rate,
+                       ignored if None.
+        confidence Confidence level of the interval.
+        batch_size Number of bits of one random payload.
+        max_bits Maximal number of simulated bits, simulation stops here even if not converged.
+        seed Seed of payloads and channel noise, every estimate starts from it, so estimates for different
+             noise levels use the same random numbers. Fresh random numbers are used if None.
+        baseband Simulate one complex point per symbol instead of the whole sinwave.
+        detection Detection mode of demodulator, also followed by baseband simulation.
+        """
+        self.psk_type = psk_type
+        self.m = constellation_of(psk_type)
+        self.target_errors = target_errors
+        self.interval_width = interval_width
+        self.relative_width = relative_width
+        self.confidence = confidence
+        self.batch_size = batch_size
+        self.max_bits = max_bits
+        self.seed = seed
+        self.baseband = baseband
+        self.modulator = Modulator()
+        self.demodulator = Demodulator(detection=detection, draw_diagram=False)
+
+    def _converged(self, errors, bits, interval) -> bool:
+        """
+        Check stop conditions.
+        Parameters
+        ----------
+        errors Number of wrong bits so far.
+        bits Number of simulated bits so far.
+        interval Current confidence interval.
+
+        Returns
+        -------
+        bool True if the estimate is precise enough.
+        """
+        width = interval[1] - interval[0]
+        if self.target_errors is not None and errors >= self.target_errors:
+            return True
+        if self.interval_width is not None and width <= self.interval_width:
+            return True
+        if self.relative_width is not None and errors and width <= self.relative_width * errors / bits:
+            return True
+        return False
+
+    def estimate(self, noise_strength) -> BerEstimate:
+        """
+        Simulate random payloads with given noise until the estimate converges or maximal number of bits is reached.
+        Parameters
+        ----------
+        noise_strength Noise strength.
+
+        Returns
+        -------
+        BerEstimate Bit error rate, its confidence interval and number of simulated bits.
+        """
+        payload_seed, channel_seed = np.random.SeedSequence(self.seed).spawn(2)
+        random = np.random.default_rng(payload_seed)
+        channel = Channel(seed=channel_seed)
+
+        errors = 0
+        bits = 0
+        batches = 0
+        interval = (0.0, 1.0)
+        while bits < self.max_bits:
+            size = min(self.batch_size, self.max_bits - bits)
+            payload = random.integers(0, 2, size, dtype=np.uint8)
+            out_bits = pipeline.transmit(payload, self.m, noise_strength, modulator=self.modulator, channel=channel,
+                                         demodulator=self.demodulator, baseband=self.baseband)
+            errors += utils.compute_distorted_bits(payload, out_bits)
+            bits += size
+            batches += 1
+            interval = wilson_interval(errors, bits, self.confidence)
+            if self._converged(errors, bits, interval):
+                return BerEstimate(errors, bits, interval, batches, True)
+        return BerEstimate(errors, bits, interval, batches, False)
@@ -1,7 +1,12 @@
-import bitarray
+import os
+
+import numpy as np
 
 
 class FileIO:
+    # files larger than this number of bytes are memory-mapped instead of read
+    MEMMAP_SIZE = 64 * 1024 * 1024
+
     def __init__(self, file_name):
         """
         Initialize FileIO class
@@ -11,26 +16,64 @@ class FileIO:
         """
         self.file_name = file_name
 
-    def read_from_file(self) -> list:
+    def read_bytes(self) -> np.ndarray:
         """
-        Read bits from file and return them as a list.
-        Returns: list Array of 1 and 0.
+        Read bytes of the file with a single bulk read, large files are memory-mapped.
+        Returns: np.ndarray Array of bytes (np.uint8), read-only.
         -------
         """
+        if os.path.getsize(self.file_name) >= self.MEMMAP_SIZE:
+            return np.memmap(self.file_name, dtype=np.uint8, mode='r')
         with open(self.file_name, "rb") as file:
-            a = bitarray.bitarray()
-            while byte := file.read(1):
-                a.frombytes(byte)
-            return a.tolist()
+            return np.frombuffer(file.read(), dtype=np.uint8)
+
+    def read_from_file(self) -> np.ndarray:
+        """
+        Read bits from file and return them as an array.
+        Returns: np.ndarray Array of 1 and 0 (np.uint8), first bit is the most significant bit of the first byte.
+        -------
+        """
+        return np.unpackbits(self.read_bytes())
+
+    def iter_bits(self, chunk_size=8 * 1024 * 1024):
+        """
+        Lazily read bits from file chunk by chunk, without loading the whole file.
+        Parameters
+        ----------
+        chunk_size: int Number of bits in one chunk, rounded down to whole bytes (at least one).
+        Returns: generator of np.ndarray Consecutive parts of bits of the file.
+        -------
+        """
+        if os.path.getsize(self.file_name) == 0:
+            return
+        data = np.memmap(self.file_name, dtype=np.uint8, mode='r')
+        bytes_per_chunk = max(1, chunk_size // 8)
+        for start in range(0, len(data), bytes_per_chunk):
+            yield np.unpackbits(data[start:start + bytes_per_chunk])
 
     def write_to_file(self, bits_list):
         """
         Write input list of bits to the file.
         Parameters
         ----------
-        bits_list: list List of bits to be written to the file.
+        bits_list: list or np.ndarray List of bits to be written to the file.
+        """
+        with open(self.file_name, 'wb') as file:
+            file.write(np.packbits(np.asarray(bits_list, dtype=np.uint8)).tobytes())
+
+    def write_chunks(self, chunks):
+        """
+        Write bits given in chunks of any size to the file, without keeping all of them in memory.
+        Parameters
+        ----------
+        chunks: iterable of np.ndarray Consecutive parts of bits to be written to the file.
         """
         with open(self.file_name, 'wb') as file:
-            bits = bitarray.bitarray(bits_list)
-            bytes_list = bits.tobytes()
-            file.write(bytes_list)
+            rest = np.empty(0, dtype=np.uint8)
+            for chunk in chunks:
+                bits = np.concatenate((rest, np.asarray(chunk, dtype=np.uint8)))
+                whole = len(bits) - len(bits) % 8
+                file.write(np.packbits(bits[:whole]).tobytes())
+                rest = bits[whole:]
+            if len(rest):
+                file.write(np.packbits(rest).tobytes())
@@ -0,0 +1,283 @@
+import numpy as np
+
+import utils
+
+
+class Constellation:
+    """
+    Points of a digital modulation with the bits coded by every point.
+    Point k codes value k, bits of a value are its binary digits, first bit is the most significant one,
+    so labelling (e.g. Gray code) is the order of points.
+
+    Decisions find the nearest point of every received point. Structure of the points is found once:
+    points equally spaced on a circle (psk) are decided with one floor division of the angle, points on
+    a regular grid (square and cross qam) are decided by rounding both coordinates and a lookup table,
+    so both cost the same for every order. Other sets are compared with all their points.
+    """
+    SECTOR = 'sector'
+    GRID = 'grid'
+    SEARCH = 'search'
+
+    def __init__(self, points, name="custom", phases=None):
+        """
+        Parameters
+        ----------
+        points Complex point of every value, number of points has to be a power of two.
+        name Name of the constellation.
+        phases Exact phases of points on the unit circle, given instead of points to keep them exact.
+        """
+        if phases is not None:
+            phases = np.array(phases, dtype=np.float64)
+            points = np.exp(1j * phases)
+        self.points = np.array(points, dtype=np.complex128)
+        self.points.flags.writeable = False
+        self.m = len(self.points)
+        self.bits_per_symbol = utils.bits_per_symbol(self.m)
+        self.name = name
+        self.phases = np.angle(self.points) if phases is None else phases
+        self.phases.flags.writeable = False
+        # points given by phases lie exactly on the unit circle
+        self.magnitudes = np.abs(self.points) if phases is None else np.ones(self.m)
+        self.magnitudes.flags.writeable = False
+        self.constant_envelope = bool(np.allclose(np.abs(self.points), np.abs(self.points[0])))
+        self.bit_table = utils.psk_bit_table(self.m)
+        self.bit_table.flags.writeable = False
+
+        self.decision = Constellation.SEARCH
+        if not self.__prepare_sectors():
+            self.__prepare_grid()
+
+    @classmethod
+    def psk(cls, m, gray=False):
+        """
+        Make m-psk constellation, phases of utils.psk_phases.
+        Parameters
+        ----------
+        m Number of phases, power of two.
+        gray Label neighbouring phases with Gray code instead of their binary index.
+
+        Returns
+        -------
+        Constellation M-psk.
+        """
+        phases = utils.psk_phases(m)
+        if gray:
+            # value v is put on phase of index i with gray code of i equal to v
+            index = np.arange(m)
+            phases = phases[np.argsort(index ^ (index >> 1))]
+        return cls(None, "{0}psk{1}".format(m, " gray" if gray else ""), phases=phases)
+
+    @classmethod
+    def qam(cls, m):
+        """
+        Make square qam (m is a power of four) or cross qam (odd power of two from 32) constellation
+        with unit mean energy. Square qam is Gray coded on both axes. Cross qam with k bits per symbol is a square
+        of 3 * 2 ** ((k - 3) / 2) points on a side without squares of 1 / 6 of the side in its corners.
+        Points of cross qam are Gray coded row by row, so neighbours in a row differ in one bit.
+        Parameters
+        ----------
+        m Number of points.
+
+        Returns
+        -------
+        Constellation M-qam.
+        """
+        k = utils.bits_per_symbol(m)
+        if k % 2 == 0:
+            side = 1 << (k // 2)
+            levels = 2 * np.arange(side) - (side - 1)
+            index = np.arange(side)
+            gray = index ^ (index >> 1)
+            # value is Gray code of in-phase level followed by Gray code of quadrature level
+            in_phase = np.empty(side, dtype=np.float64)
+            in_phase[gray] = levels
+            points = (in_phase[:, np.newaxis] + 1j * in_phase[np.newaxis, :]).ravel()
+        elif k >= 5:
+            points = cls.__cross_points(k)
+        else:
+            raise ValueError("Qam needs a power of four or an odd power of two from 32 points, got {0}".format(m))
+        points = points / np.sqrt(np.mean(np.abs(points) ** 2))
+        return cls(points, "{0}qam".format(m))
+
+    @staticmethod
+    def __cross_points(k):
+        """
+        Points of cross qam with k bits per symbol, labelled row by row with Gray code.
+        Parameters
+        ----------
+        k Odd number of bits per symbol, at least 5.
+
+        Returns
+        -------
+        np.ndarray Complex points on odd integer grid, indexed by value.
+        """
+        side = 3 << ((k - 3) // 2)
+        corner = side // 6
+        levels = 2 * np.arange(side) - (side - 1)
+        rows = []
+        for row in range(side):
+            edge = row < corner or row >= side - corner
+            columns = levels[corner:side - corner] if edge else levels
+            rows.append(columns + 1j * levels[row])
+        ordered = np.concatenate(rows)
+        index = np.arange(len(ordered))
+        points = np.empty(len(ordered), dtype=np.complex128)
+        points[index ^ (index >> 1)] = ordered
+        return points
+
+    def __eq__(self, other):
+        return isinstance(other, Constellation) and np.array_equal(self.points, other.points)
+
+    def __hash__(self):
+        return hash(self.points.tobytes())
+
+    def __repr__(self):
+        return "Constellation({0}, decision={1})".format(self.name, self.decision)
+
+    @property
+    def key(self):
+        """ Hashable description of the points, e.g. for caches. """
+        return self.name, self.points.tobytes()
+
+    def __prepare_sectors(self):
+        """
+        Prepare sector lookup if the points are equally spaced on a circle.
+
+        Returns
+        -------
+        bool True if the points are psk.
+        """
+        if not self.constant_envelope:
+            return False
+        sector_width = 2 * np.pi / self.m
+        # every phase lies in the middle of its sector, all of them are shifted by the same offset
+        offset = self.phases[0] % sector_width
+        position = (self.phases - offset) / sector_width
+        sector_of_value = np.round(position).astype(np.intp) % self.m
+        if not np.allclose(position, np.round(position)) or len(np.unique(sector_of_value)) != self.m:
+            return False
+        self.__sector_width = sector_width
+        self.__offset = offset
+        self.__value_of_sector = np.empty(self.m, dtype=np.intp)
+        self.__value_of_sector[sector_of_value] = np.arange(self.m)
+        self.decision = Constellation.SECTOR
+        return True
+
+    def __prepare_grid(self):
+        """
+        Prepare grid lookup if the points lie on a regular rectangular grid filling most of its bounding box.
+        Every node of the grid holds the value of its point, nodes without a point are marked with -1.
+        """
+        coordinates = []
+        for axis in (self.points.real, self.points.imag):
+            values = np.unique(np.round(axis, 12))
+            steps = np.diff(values)
+            if not len(steps) or not np.allclose(steps, steps[0]):
+                return
+            coordinates.append((values[0], steps[0], len(values)))
+        (x0, x_step, columns), (y0, y_step, rows) = coordinates
+        if columns * rows > 2 * self.m:
+            return
+
+        table = np.full((rows, columns), -1, dtype=np.intp)
+        table[np.rint((self.points.imag - y0) / y_step).astype(np.intp),
+              np.rint((self.points.real - x0) / x_step).astype(np.intp)] = np.arange(self.m)
+        if np.count_nonzero(table >= 0) != self.m:
+            return
+        self.__grid = (x0, x_step, columns, y0, y_step, rows)
+        self.__value_of_node = table
+        self.decision = Constellation.GRID
+
+    def decide(self, complex_numbers):
+        """
+        Find value of the nearest point of every received point.
+        Parameters
+        ----------
+        complex_numbers Received points, any shape.
+
+        Returns
+        -------
+        np.ndarray Values of the same shape.
+        """
+        complex_numbers = np.asarray(complex_numbers)
+        if self.decision == Constellation.SECTOR:
+            # angles are shifted to positive values, so truncation works as floor division,
+            # m is a power of two, so modulo is a bit mask
+            sectors = (np.angle(complex_numbers) - self.__offset + self.__sector_width / 2 + 2 * np.pi) \
+                * (1 / self.__sector_width)
+            return self.__value_of_sector[sectors.astype(np.intp) & (self.m - 1)]
+        if self.decision == Constellation.GRID:
+            x0, x_step, columns, y0, y_step, rows = self.__grid
+            # points outside of the grid belong to its border nodes
+            column = np.clip(np.rint((complex_numbers.real - x0) / x_step), 0, columns - 1).astype(np.intp)
+            row = np.clip(np.rint((complex_numbers.imag - y0) / y_step), 0, rows - 1).astype(np.intp)
+            values = self.__value_of_node[row, column]
+            # nodes without a point (corners of cross qam) are few, their points are searched
+            empty = values < 0
+            if np.any(empty):
+                values[empty] = self.__search(complex_numbers[empty])
+            return values
+        return self.__search(complex_numbers)
+
+    def __search(self, complex_numbers, chunk_size=1 << 16):
+        """
+        Find value of the nearest point by comparing every received point with all points.
+        Parameters
+        ----------
+        complex_numbers Received points.
+        chunk_size Number of received points compared at once.
+
+        Returns
+        -------
+        np.ndarray Values of the same shape.
+        """
+        flat = np.asarray(complex_numbers).reshape(-1)
+        values = np.empty(len(flat), dtype=np.intp)
+        for start in range(0, len(flat), chunk_size):
+            part = flat[start:start + chunk_size]
+            values[start:start + chunk_size] = np.argmin(np.abs(part[:, np.newaxis] - self.points) ** 2, axis=1)
+        return values.reshape(np.shape(complex_numbers))
+
+    def slice(self, complex_numbers):
+        """
+        Turn received points into bits of their nearest points.
+        Parameters
+        ----------
+        complex_numbers Received points, or batch of them with one sequence in every row.
+
+        Returns
+        -------
+        np.ndarray Bits coded by the points, one row of bits for every row of the batch.
+        """
+        values = self.decide(complex_numbers)
+        return np.take(self.bit_table, values, axis=0).reshape(values.shape[:-1] + (-1,))
+
+
+# the four psk of the project
+BPSK = Constellation.psk(2)
+QPSK = Constellation.psk(4)
+PSK8 = Constellation.psk(8)
+PSK16 = Constellation.psk(16)
+
+_PSK_BY_ORDER = {2: BPSK, 4: QPSK, 8: PSK8, 16: PSK16}
+
+
+def get_constellation(scheme) -> Constellation:
+    """
+    Get constellation of a scheme given as number of phases of psk or as a constellation.
+    Parameters
+    ----------
+    scheme Constellation, or number of phases of psk (power of two up to 64).
+
+    Returns
+    -------
+    Constellation Given constellation, or psk constellation of given order.
+    """
+    if isinstance(scheme, Constellation):
+        return scheme
+    m = int(scheme)
+    if m not in _PSK_BY_ORDER:
+        if m > 64:
+            raise ValueError("Psk of more than 64 phases is not supported, got {0}".format(m))
+        _PSK_BY_ORDER[m] = Constellation.psk(m)
+    return _PSK_BY_ORDER[m]
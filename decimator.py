@@ -0,0 +1,99 @@
+from scipy import signal
+
+from waveform_cache import waveform_cache
+
+
+class Decimator:
+    """
+    Front-end of demodulator lowering the sample rate of received sinwave before detection.
+    Sinwave is low-pass filtered with an anti-alias FIR filter and only every factor-th sample is kept,
+    the polyphase implementation computes only the kept samples.
+    Noise above the new Nyquist frequency is removed with the dropped samples, so noise-free points
+    do not change. The filter spreads phase jumps between neighbouring symbols, which raises bit error rate
+    when the factor is large.
+    Decimation does not make demodulation faster: every kept sample costs 2 * half_length * factor + 1
+    multiplications of the filter, more than the correlation or projection of the factor samples it replaces,
+    so filtering the whole sinwave costs several times the detection it saves (benchmark_decimation).
+    Detection after decimation is a net slowdown, the stage only pays off for detectors much more expensive
+    per sample than the filter.
+    """
+
+    def __init__(self, factor, half_length=10, beta=5.0):
+        """
+        Parameters
+        ----------
+        factor Decimation factor, number of samples of a symbol has to be divisible by it.
+        half_length Number of taps of the filter on each side of its middle, per output sample.
+        beta Parameter of Kaiser window of the filter, larger gives lower side lobes and wider transition.
+        """
+        if factor < 1 or int(factor) != factor:
+            raise ValueError("Decimation factor should be a positive integer, got {0}".format(factor))
+        self.factor = int(factor)
+        self.half_length = half_length
+        self.beta = beta
+
+    def get_parameters(self):
+        """
+        Return parameters which change decimated samples.
+
+        Returns
+        -------
+        dict Factor, half_length and beta.
+        """
+        return {'factor': self.factor, 'half_length': self.half_length, 'beta': self.beta}
+
+    def decimated_length(self, samples_per_symbol, cycles_per_symbol=1):
+        """
+        Check that a symbol can be decimated and get its number of samples after decimation.
+        Parameters
+        ----------
+        samples_per_symbol Number of samples of a symbol before decimation.
+        cycles_per_symbol Number of periods of sinwave in one symbol.
+
+        Returns
+        -------
+        int Number of samples of a decimated symbol.
+        """
+        if samples_per_symbol % self.factor:
+            raise ValueError("Decimation factor {0} does not divide {1} samples of a symbol".format(
+                self.factor, samples_per_symbol))
+        length = samples_per_symbol // self.factor
+        if length <= 2 * cycles_per_symbol:
+            raise ValueError("Decimation factor {0} leaves {1} samples of a symbol of {2} periods, "
+                             "more than 2 samples per period are needed".format(self.factor, length,
+                                                                                cycles_per_symbol))
+        return length
+
+    def taps(self):
+        """
+        Design the anti-alias filter, cut-off at the new Nyquist frequency.
+
+        Returns
+        -------
+        np.ndarray Read-only taps of the filter, 2 * half_length * factor + 1 of them.
+        """
+        def generate():
+            number_of_taps = 2 * self.half_length * self.factor + 1
+            return signal.firwin(number_of_taps, 1 / self.factor, window=('kaiser', self.beta))
+
+        return waveform_cache.get(('decimator', self.factor, self.half_length, self.beta), generate)
+
+    def decimate(self, samples):
+        """
+        Filter and decimate samples along the last axis, rows of a batch are decimated separately.
+        Delay of the filter is compensated, so sample k of the result is at time of sample k * factor.
+        Parameters
+        ----------
+        samples Floating point samples, number of them divisible by factor.
+
+        Returns
+        -------
+        np.ndarray Decimated samples of the same type.
+        """
+        if self.factor == 1:
+            return samples
+        if samples.shape[-1] % self.factor:
+            raise ValueError("Number of samples {0} is not divisible by decimation factor {1}".format(
+                samples.shape[-1], self.factor))
+        decimated = signal.resample_poly(samples, 1, self.factor, axis=-1, window=self.taps())
+        return decimated.astype(samples.dtype, copy=False)
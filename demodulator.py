@@ -1,14 +1,20 @@
-import math
 import numpy as np
 import matplotlib.pylab as plt
 from radio_channel import Channel
-from scipy.stats import pearsonr
 
+import utils
+from constellation import BPSK, get_constellation
+from waveform_cache import symbol_length, waveform_cache
 from wireless_signal import WirelessSignal
 
 
 class Demodulator:
-    def __init__(self, period=6, amplitude=1, sample_rate=100):
+    CORRELATION = 'correlation'
+    PROJECTION = 'projection'
+    FFT = 'fft'
+
+    def __init__(self, period=6, amplitude=1, sample_rate=100, detection=CORRELATION, dtype=np.float64,
+                 draw_diagram=True, cycles_per_symbol=1, decimator=None, matched_filter=None):
         """ Set default parameters for modulation
 
             Parameters
@@ -19,11 +25,307 @@ class Demodulator:
                 Amplitude, signal strength
             sample_rate: int
                 Sample rate, number of samples per milisecond
+            detection: string
+                How phases of symbols are found:
+                'correlation' - pattern matching, matched phase gets channel noise added to draw a diagram,
+                'projection' - projection on cosine and sine references, gives received points for any psk
+                'fft' - carrier bin of the spectrum of every symbol, gives the same points as projection
+                Baseband signals follow the same detection, so they give the same bit error rate as sinwave
+            dtype: np.dtype
+                Type of computations: np.float64 or np.float32, quantized samples are computed in np.float32
+            draw_diagram: bool
+                Draw constellation diagram after demodulation
+            cycles_per_symbol: int
+                Number of whole periods of sinwave in one symbol
+            decimator: Decimator or None
+                Front-end lowering sample rate of sinwave before detection, symbols are detected
+                at sample_rate / decimator.factor, baseband signals are not decimated.
+                The factor has to divide the number of samples of a symbol
+            matched_filter: MatchedFilter or None
+                Receiver of signals shaped by PulseShaper, points of symbols are sampled from the output
+                of the matched filter instead of detection, baseband signals are not filtered
         """
+        if detection not in (Demodulator.CORRELATION, Demodulator.PROJECTION, Demodulator.FFT):
+            raise ValueError("Unknown detection: {0}".format(detection))
+        if decimator is not None and matched_filter is not None:
+            raise ValueError("Matched filter works at the full sample rate, it can not be used with decimator")
         self.__period = period
         self.__frequency = 1/period
         self.__amplitude = amplitude
         self.__sample_rate = sample_rate
+        self.__cycles_per_symbol = cycles_per_symbol
+        self.__decimator = decimator
+        self.__matched_filter = matched_filter
+        # detected samples are every decimation-th sample of a symbol
+        self.__decimation = 1
+        if decimator is not None:
+            decimator.decimated_length(symbol_length(period, sample_rate, cycles_per_symbol), cycles_per_symbol)
+            self.__decimation = decimator.factor
+        self.__detection = detection
+        self.__dtype = utils.compute_dtype(dtype)
+        self.draw_diagram = draw_diagram
+
+    def get_parameters(self):
+        """
+        Return parameters which change demodulated bits, e.g. to identify stored results.
+
+        Returns
+        -------
+            parameters: dict of period, amplitude, sample rate, periods per symbol, detection, type of computations
+            and parameters of decimator and matched filter.
+        """
+        return {'period': self.__period, 'amplitude': self.__amplitude, 'sample_rate': self.__sample_rate,
+                'cycles_per_symbol': self.__cycles_per_symbol, 'detection': self.__detection,
+                'dtype': self.__dtype.name,
+                'decimator': None if self.__decimator is None else self.__decimator.get_parameters(),
+                'matched_filter': None if self.__matched_filter is None else self.__matched_filter.get_parameters()}
+
+    def make_pattern_table(self, m):
+        """
+        Generate pattern sinwaves of cycles_per_symbol periods for every symbol of m-psk, at the detection rate.
+
+        Parameters
+        ----------
+        m: int or Constellation
+            Number of phases, power of two, or constellation.
+        Returns
+        -------
+            patterns: array of shape (m, samples per symbol), row k is the pattern of symbol value k.
+
+        """
+        return waveform_cache.psk_table(m, self.__period, self.__amplitude, self.__sample_rate, dtype=self.__dtype,
+                                        cycles=self.__cycles_per_symbol, decimation=self.__decimation)
+
+    def __split_symbols(self, data_signal, samples_per_symbol):
+        """
+        Reshape sinwave of the signal to a matrix with single symbol of signal in every row.
+        Batch of sinwaves (one per row) is reshaped to a stack of such matrices.
+        Sinwave is decimated first if the demodulator has a decimator.
+
+        Parameters
+        ----------
+        data_signal: WirelessSignal
+            Reference signal.
+        samples_per_symbol: int
+            Number of samples of one symbol at the detection rate.
+        Returns
+        -------
+            samples: array of shape (number of symbols, samples per symbol),
+            or (number of sinwaves, number of symbols, samples per symbol) for a batch.
+
+        """
+        sinwave = data_signal.get_samples(self.__dtype)
+        if self.__decimator is not None:
+            length = sinwave.shape[-1]
+            symbol_length = samples_per_symbol * self.__decimator.factor
+            sinwave = self.__decimator.decimate(sinwave[..., :length - length % symbol_length])
+        length = sinwave.shape[-1]
+        whole = sinwave[..., :length - length % samples_per_symbol]
+        return whole.reshape(sinwave.shape[:-1] + (-1, samples_per_symbol))
+
+    def correlate_symbols(self, data_signal, m):
+        """
+        Find phase of every symbol of m-psk signal using pearson correlation with all patterns at once.
+        Signal is reshaped to (number of symbols, samples per symbol) matrix and compared
+        with the whole pattern table with a single matrix multiplication.
+        Correlation does not see amplitude, so it works only for constellations of constant envelope.
+
+        Parameters
+        ----------
+        data_signal: WirelessSignal
+            Reference signal.
+        m: int or Constellation
+            Number of phases, power of two, or constellation of constant envelope.
+        Returns
+        -------
+            complex_array: array of complex numbers.
+
+        """
+        constellation = get_constellation(m)
+        if not constellation.constant_envelope:
+            raise ValueError("Correlation needs constellation of constant envelope, got {0}".format(
+                constellation.name))
+        phases = constellation.phases
+        # Pearson correlation: centered and normalized patterns.
+        # Centered patterns sum up to zero, so the mean of a sample does not change the product,
+        # and the norm of a sample is the same for every pattern, so it does not change the best match.
+        patterns = waveform_cache.pearson_table(m, self.__period, self.__amplitude, self.__sample_rate,
+                                                dtype=self.__dtype, cycles=self.__cycles_per_symbol,
+                                                decimation=self.__decimation)
+        samples = self.__split_symbols(data_signal, patterns.shape[1])
+        coefficients = samples @ patterns.T
+
+        # calculate complex numbers to draw a constalation diagram
+        phi = phases[np.argmax(coefficients, axis=-1)]
+        return np.cos(phi) + 1j * np.sin(phi)
+
+    def project_symbols(self, data_signal):
+        """
+        Find complex point of every symbol by projecting each symbol of signal
+        on one sine and one cosine reference (integrate and dump).
+        Cost does not depend on number of phases, so it works for any psk.
+
+        Parameters
+        ----------
+        data_signal: WirelessSignal
+            Reference signal.
+        Returns
+        -------
+            complex_array: array of complex numbers, point of noise-free symbol lies on unit circle.
+
+        """
+        references = waveform_cache.quadrature_references(self.__period, self.__amplitude, self.__sample_rate,
+                                                          dtype=self.__dtype, cycles=self.__cycles_per_symbol,
+                                                          decimation=self.__decimation)
+        samples = self.__split_symbols(data_signal, references.shape[1])
+
+        in_phase, quadrature = np.moveaxis(references @ np.swapaxes(samples, -1, -2), -2, 0)
+        return in_phase + 1j * quadrature
+
+    def fft_symbols(self, data_signal):
+        """
+        Find complex point of every symbol from the spectrum of the symbol.
+        Symbol holds cycles_per_symbol whole periods of carrier, so the carrier falls exactly into bin
+        cycles_per_symbol of its discrete Fourier transform, and the phase of that bin is the phase of the symbol.
+        All symbols are transformed with a single rfft along the sample axis.
+
+        Parameters
+        ----------
+        data_signal: WirelessSignal
+            Reference signal.
+        Returns
+        -------
+            complex_array: array of complex numbers, point of noise-free symbol lies on unit circle.
+
+        """
+        samples_per_symbol = self.make_pattern_table(2).shape[1]
+        samples = self.__split_symbols(data_signal, samples_per_symbol)
+
+        # bin k of A * sin(2 pi k n / N + phi) is A * N / (2j) * exp(j phi)
+        carrier = np.fft.rfft(samples, axis=-1)[..., self.__cycles_per_symbol]
+        return carrier * (2j / (samples_per_symbol * self.__amplitude))
+
+    def __correlator(self, m):
+        """
+        Choose correlation detector of given constellation.
+
+        Parameters
+        ----------
+        m: int or Constellation
+            Number of phases, power of two, or constellation.
+        Returns
+        -------
+            generate_complex: function, or None if the constellation has no constant envelope and is projected.
+
+        """
+        constellation = get_constellation(m)
+        if constellation == BPSK:
+            return self.__generate_complex_bpsk
+        if not constellation.constant_envelope:
+            return None
+
+        def generate_complex(signal):
+            return self.correlate_symbols(signal, constellation)
+        return generate_complex
+
+    def __detect_symbols(self, data_signal, channel, m, generate_complex):
+        """
+        Get complex points of symbols with chosen detection.
+
+        Parameters
+        ----------
+        data_signal: WirelessSignal
+            Reference signal.
+        channel: Channel
+            Channel responsible for delivering data_signal.
+        m: int or Constellation
+            Number of phases, power of two, or constellation.
+        generate_complex: function
+            Correlation detector of given psk, None if symbols are always projected.
+        Returns
+        -------
+            complex_array: array of complex numbers.
+
+        """
+        if data_signal.baseband:
+            # baseband signal already holds received (projected) points
+            points = np.asarray(data_signal.get_sinwave()) / self.__amplitude
+            if self.__detection != Demodulator.CORRELATION or generate_complex is None:
+                return points
+            return channel.add_noise_to_complex(self.__correlate_points(points, data_signal, channel, m))
+        if self.__matched_filter is not None:
+            # noise of the channel is already in received points
+            samples_per_symbol = self.make_pattern_table(2).shape[1]
+            points = self.__matched_filter.points(data_signal.get_samples(self.__dtype), samples_per_symbol,
+                                                  samples_per_symbol // self.__cycles_per_symbol)
+            return points / self.__amplitude
+        if self.__detection == Demodulator.PROJECTION or generate_complex is None:
+            # noise of the channel is already in received points
+            return self.project_symbols(data_signal)
+        if self.__detection == Demodulator.FFT:
+            return self.fft_symbols(data_signal)
+        complex_numbers = generate_complex(data_signal)
+        return channel.add_noise_to_complex(complex_numbers)
+
+    def __correlate_points(self, points, data_signal, channel, m):
+        """
+        Find phases which correlation would match for received baseband points, without the sinwave.
+        Pattern of the largest correlation is the pattern of the nearest phase, so psk points are moved
+        to their nearest phase. Bpsk correlation keeps angle between symbol and pattern, which is shrunk by noise
+        outside of the projection: its energy is replaced by its mean, (symbol_length - 2) * noise_strength ** 2.
+
+        Parameters
+        ----------
+        points: np.ndarray
+            Received points of baseband signal, point of noise-free symbol lies on unit circle.
+        data_signal: WirelessSignal
+            Baseband signal of the points.
+        channel: Channel
+            Channel responsible for delivering data_signal.
+        m: int or Constellation
+            Number of phases, power of two, or constellation of constant envelope.
+        Returns
+        -------
+            complex_array: array of complex numbers.
+
+        """
+        constellation = get_constellation(m)
+        if constellation != BPSK:
+            return constellation.points[constellation.decide(points)]
+
+        noise_strength = np.asarray(channel.get_noise_strength(), dtype=np.float64)
+        # strengths of a batch belong to its rows
+        noise_strength = noise_strength.reshape(noise_strength.shape + (1,) * (points.ndim - noise_strength.ndim))
+        symbol_length = data_signal.symbol_length
+        outside = 2 * noise_strength ** 2 * (symbol_length - 2) / (symbol_length * self.__amplitude ** 2)
+        cosine = points.real / np.sqrt(np.abs(points) ** 2 + outside)
+        phi = np.arccos(np.clip(cosine, -1, 1))
+        return np.cos(phi) + 1j * np.sin(phi)
+
+    def __generate_complex_bpsk(self, data_signal):
+        """
+        Generate complex number array out out input signal.
+
+        Parameters
+        ----------
+        data_signal: WirelessSignal
+            Reference signal.
+        Returns
+        -------
+            complex_array: array of complex numbers.
+
+        """
+        # pattern sine wave, phase 0 codes bit 1
+        pattern_sinwave = self.make_pattern_table(2)[1]
+        samples = self.__split_symbols(data_signal, len(pattern_sinwave))
+
+        # calculate phase shift between pattern and every single period of signal
+        # dot - iloczyn skalrany dwóch argumentów
+        cosine = samples @ pattern_sinwave / (np.linalg.norm(pattern_sinwave) * np.linalg.norm(samples, axis=-1))
+        phi = np.arccos(np.clip(cosine, -1, 1))
+
+        # calculate complex numbers to draw a constalation diagram
+        return np.cos(phi) + 1j * np.sin(phi)
 
     def __generate_complex_qpsk(self, data_signal):
         """
@@ -38,46 +340,7 @@ class Demodulator:
             complex_array: array of complex numbers.
 
         """
-        sinwave = data_signal.get_sinwave()
-        complex_numbers = []
-        theta1 = np.pi / 4  # coding 11
-        theta2 = 3 * np.pi / 4  # coding 01
-        theta3 = 5 * np.pi / 4  # coding 00
-        theta4 = 7 * np.pi / 4  # coding 10
-        pattern_sin_time = np.arange(0, self.__period, 1 / self.__sample_rate)
-        pattern_sinwave1 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta1)
-        pattern_sinwave2 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta2)
-        pattern_sinwave3 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta3)
-        pattern_sinwave4 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta4)
-
-        for bit in range(0, len(sinwave), self.__period * self.__sample_rate):
-            # take each single period of signal
-            start_of_sample = bit
-            end_of_sample = bit + self.__period * self.__sample_rate
-            sample = sinwave[start_of_sample:end_of_sample]
-
-            # Find the phase shift using pearson correlation.
-            coeff1, _ = pearsonr(sample, pattern_sinwave1)
-            coeff2, _ = pearsonr(sample, pattern_sinwave2)
-            coeff3, _ = pearsonr(sample, pattern_sinwave3)
-            coeff4, _ = pearsonr(sample, pattern_sinwave4)
-
-            maxval = max(coeff1, coeff2, coeff3, coeff4)
-
-            if maxval == coeff1:
-                phi = np.pi / 4
-            elif maxval == coeff2:
-                phi = 3 * np.pi / 4
-            elif maxval == coeff3:
-                phi = 5 * np.pi / 4
-            elif maxval == coeff4:
-                phi = 7 * np.pi / 4
-
-            # calculate complex number to draw a constalation diagram
-            complex_num = np.cos(phi) + 1j * np.sin(phi)
-
-            complex_numbers.append(complex_num)
-        return complex_numbers
+        return self.correlate_symbols(data_signal, 4)
 
     def __generate_complex_8psk(self, data_signal):
         """
@@ -92,65 +355,7 @@ class Demodulator:
             complex_array: array of complex numbers.
 
         """
-        sinwave = data_signal.get_sinwave()
-        complex_numbers = []
-        theta1 = np.pi / 8  # coding 000
-        theta2 = 3 * np.pi / 8  # coding 001
-        theta3 = 5 * np.pi / 8  # coding 010
-        theta4 = 7 * np.pi / 8  # coding 011
-        theta5 = 9 * np.pi / 8  # coding 100
-        theta6 = 11 * np.pi / 8  # coding 101
-        theta7 = 13 * np.pi / 8  # coding 110
-        theta8 = 15 * np.pi / 8  # coding 111
-        pattern_sin_time = np.arange(0, self.__period, 1 / self.__sample_rate)
-        pattern_sinwave1 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta1)
-        pattern_sinwave2 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta2)
-        pattern_sinwave3 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta3)
-        pattern_sinwave4 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta4)
-        pattern_sinwave5 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta5)
-        pattern_sinwave6 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta6)
-        pattern_sinwave7 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta7)
-        pattern_sinwave8 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta8)
-
-        for bit in range(0, len(sinwave), self.__period * self.__sample_rate):
-            # take each single period of signal
-            start_of_sample = bit
-            end_of_sample = bit + self.__period * self.__sample_rate
-            sample = sinwave[start_of_sample:end_of_sample]
-
-            # Find the phase shift using pearson correlation.
-            coeff1, _ = pearsonr(sample, pattern_sinwave1)
-            coeff2, _ = pearsonr(sample, pattern_sinwave2)
-            coeff3, _ = pearsonr(sample, pattern_sinwave3)
-            coeff4, _ = pearsonr(sample, pattern_sinwave4)
-            coeff5, _ = pearsonr(sample, pattern_sinwave5)
-            coeff6, _ = pearsonr(sample, pattern_sinwave6)
-            coeff7, _ = pearsonr(sample, pattern_sinwave7)
-            coeff8, _ = pearsonr(sample, pattern_sinwave8)
-
-            maxval = max(coeff1, coeff2, coeff3, coeff4, coeff5, coeff6, coeff7, coeff8)
-
-            if maxval == coeff1:
-                phi = np.pi / 8
-            elif maxval == coeff2:
-                phi = 3 * np.pi / 8
-            elif maxval == coeff3:
-                phi = 5 * np.pi / 8
-            elif maxval == coeff4:
-                phi = 7 * np.pi / 8
-            elif maxval == coeff5:
-                phi = 9 * np.pi / 8
-            elif maxval == coeff6:
-                phi = 11 * np.pi / 8
-            elif maxval == coeff7:
-                phi = 13 * np.pi / 8
-            elif maxval == coeff8:
-                phi = 15 * np.pi / 8
-
-            # calculate complex number to draw a constalation diagram
-            complex_num = np.cos(phi) + 1j * np.sin(phi)
-            complex_numbers.append(complex_num)
-        return complex_numbers
+        return self.correlate_symbols(data_signal, 8)
 
     def __generate_complex_16psk(self, data_signal):
         """
@@ -165,106 +370,147 @@ class Demodulator:
             complex_array: array of complex numbers.
 
         """
-        sinwave = data_signal.get_sinwave()
-        complex_numbers = []
-        theta1 = np.pi / 16  # coding 0000
-        theta2 = 3 * np.pi / 16  # coding 0001
-        theta3 = 5 * np.pi / 16  # coding 0010
-        theta4 = 7 * np.pi / 16  # coding 0011
-        theta5 = 9 * np.pi / 16  # coding 0100
-        theta6 = 11 * np.pi / 16  # coding 0101
-        theta7 = 13 * np.pi / 16  # coding 0110
-        theta8 = 15 * np.pi / 16  # coding 0111
-        theta9 = 17 * np.pi / 16  # coding 1000
-        theta10 = 19 * np.pi / 16  # coding 1001
-        theta11 = 21 * np.pi / 16  # coding 1010
-        theta12 = 23 * np.pi / 16  # coding 1011
-        theta13 = 25 * np.pi / 16  # coding 1100
-        theta14 = 27 * np.pi / 16  # coding 1101
-        theta15 = 29 * np.pi / 16  # coding 1110
-        theta16 = 31 * np.pi / 16  # coding 1111
-        pattern_sin_time = np.arange(0, self.__period, 1 / self.__sample_rate)
-        pattern_sinwave1 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta1)
-        pattern_sinwave2 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta2)
-        pattern_sinwave3 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta3)
-        pattern_sinwave4 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta4)
-        pattern_sinwave5 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta5)
-        pattern_sinwave6 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta6)
-        pattern_sinwave7 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta7)
-        pattern_sinwave8 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta8)
-        pattern_sinwave9 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta9)
-        pattern_sinwave10 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta10)
-        pattern_sinwave11 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta11)
-        pattern_sinwave12 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta12)
-        pattern_sinwave13 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta13)
-        pattern_sinwave14 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta14)
-        pattern_sinwave15 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta15)
-        pattern_sinwave16 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta16)
-
-        for bit in range(0, len(sinwave), self.__period * self.__sample_rate):
-            # take each single period of signal
-            start_of_sample = bit
-            end_of_sample = bit + self.__period * self.__sample_rate
-            sample = sinwave[start_of_sample:end_of_sample]
-
-            # Find the phase shift using pearson correlation.
-            coeff1, _ = pearsonr(sample, pattern_sinwave1)
-            coeff2, _ = pearsonr(sample, pattern_sinwave2)
-            coeff3, _ = pearsonr(sample, pattern_sinwave3)
-            coeff4, _ = pearsonr(sample, pattern_sinwave4)
-            coeff5, _ = pearsonr(sample, pattern_sinwave5)
-            coeff6, _ = pearsonr(sample, pattern_sinwave6)
-            coeff7, _ = pearsonr(sample, pattern_sinwave7)
-            coeff8, _ = pearsonr(sample, pattern_sinwave8)
-            coeff9, _ = pearsonr(sample, pattern_sinwave9)
-            coeff10, _ = pearsonr(sample, pattern_sinwave10)
-            coeff11, _ = pearsonr(sample, pattern_sinwave11)
-            coeff12, _ = pearsonr(sample, pattern_sinwave12)
-            coeff13, _ = pearsonr(sample, pattern_sinwave13)
-            coeff14, _ = pearsonr(sample, pattern_sinwave14)
-            coeff15, _ = pearsonr(sample, pattern_sinwave15)
-            coeff16, _ = pearsonr(sample, pattern_sinwave16)
-
-            maxval = max(coeff1, coeff2, coeff3, coeff4, coeff5, coeff6, coeff7, coeff8, coeff9, coeff10, coeff11,
-                         coeff12, coeff13, coeff14, coeff15, coeff16)
-
-            if maxval == coeff1:
-                phi = np.pi / 16
-            elif maxval == coeff2:
-                phi = 3 * np.pi / 16
-            elif maxval == coeff3:
-                phi = 5 * np.pi / 16
-            elif maxval == coeff4:
-                phi = 7 * np.pi / 16
-            elif maxval == coeff5:
-                phi = 9 * np.pi / 16
-            elif maxval == coeff6:
-                phi = 11 * np.pi / 16
-            elif maxval == coeff7:
-                phi = 13 * np.pi / 16
-            elif maxval == coeff8:
-                phi = 15 * np.pi / 16
-            elif maxval == coeff9:
-                phi = 17 * np.pi / 16
-            elif maxval == coeff10:
-                phi = 19 * np.pi / 16
-            elif maxval == coeff11:
-                phi = 21 * np.pi / 16
-            elif maxval == coeff12:
-                phi = 23 * np.pi / 16
-            elif maxval == coeff13:
-                phi = 25 * np.pi / 16
-            elif maxval == coeff14:
-                phi = 27 * np.pi / 16
-            elif maxval == coeff15:
-                phi = 29 * np.pi / 16
-            elif maxval == coeff16:
-                phi = 31 * np.pi / 16
-
-            # calculate complex number to draw a constalation diagram
-            complex_num = np.cos(phi) + 1j * np.sin(phi)
-            complex_numbers.append(complex_num)
-        return complex_numbers
+        return self.correlate_symbols(data_signal, 16)
+
+    def slice_symbols(self, complex_numbers, m):
+        """ Turns complex points into bits of the nearest points of m-psk or of any constellation.
+            Psk points fall into sectors of the circle found with one floor division of their angle,
+            qam points into cells of a grid, see Constellation.decide.
+
+            Parameters
+            ----------
+            complex_numbers: list or np.ndarray
+                Received points, or batch of received points with one sequence in every row
+            m : int or Constellation
+                Number of phases, power of two, or constellation
+
+            Returns
+            -------
+                bits : np.ndarray
+                Array of bits coded by the points, one row of bits for every row of the batch
+        """
+        return get_constellation(m).slice(complex_numbers)
+
+    @staticmethod
+    def __remove_padding(bits, data_signal):
+        """ Removes bits added by modulator to complete the last symbol
+
+            Parameters
+            ----------
+            bits: np.ndarray
+                Demodulated bits, or batch of them with bits of one sinwave in every row
+            data_signal: WirelessSignal
+                Given signal
+
+            Returns
+            -------
+                bits : np.ndarray
+                Bits without padding
+        """
+        return bits[..., :bits.shape[-1] - data_signal.padding]
+
+    def make_mpsk_demod(self, data_signal, channel, m):
+        """ Demodulates given signal (WirelessSignal) to array of bits based on m-psk modulation.
+            Batch signal of Channel.send_batch, with one noisy sinwave in every row,
+            is demodulated at once to one row of bits for every sinwave.
+
+            Parameters
+            ----------
+            data_signal: WirelessSignal
+                Given signal or batch signal
+            channel : Channel
+                Channel responsible for delivering data_signal
+            m : int or Constellation
+                Number of phases, power of two, or constellation
+
+            Returns
+            -------
+                bits : np.ndarray
+                Array of bits read from given signal
+        """
+        generate_complex = self.__correlator(m)
+
+        complex_numbers = self.__detect_symbols(data_signal, channel, m, generate_complex)
+        result_data_bits = self.__remove_padding(self.slice_symbols(complex_numbers, m), data_signal)
+
+        if self.draw_diagram:
+            self.draw_constellation_diagram(complex_numbers)
+        return result_data_bits
+
+    def stream_mpsk_demod(self, chunks, channel, m, number_of_bits=None):
+        """ Demodulates signal of m-psk given in chunks of any size and yields bits chunk by chunk.
+            Samples of a symbol split between chunks are kept until the rest of the symbol comes.
+            Decimator filters every part of whole symbols separately, so samples at the edges of parts
+            differ slightly from decimation of the whole signal.
+
+            Parameters
+            ----------
+            chunks: iterable of np.ndarray
+                Consecutive parts of sinwave
+            channel : Channel
+                Channel responsible for delivering chunks
+            m : int or Constellation
+                Number of phases, power of two, or constellation
+            number_of_bits : int
+                Number of sent bits, used to remove padding of the last symbol
+
+            Returns
+            -------
+                bits : generator of np.ndarray
+                Consecutive parts of bits read from the signal
+        """
+        generate_complex = self.__correlator(m)
+
+        samples_per_symbol = self.make_pattern_table(m).shape[1]
+        if self.__decimator is not None:
+            samples_per_symbol *= self.__decimator.factor
+        if self.__matched_filter is None:
+            points = self.__stream_blocks(chunks, channel, m, generate_complex, samples_per_symbol)
+        else:
+            points = (part / self.__amplitude for part in self.__matched_filter.stream_points(
+                chunks, samples_per_symbol, samples_per_symbol // self.__cycles_per_symbol))
+
+        remaining_bits = number_of_bits
+        for complex_numbers in points:
+            bits = self.slice_symbols(complex_numbers, m)
+            if remaining_bits is not None:
+                bits = bits[:remaining_bits]
+                remaining_bits -= len(bits)
+            yield bits
+
+    def __stream_blocks(self, chunks, channel, m, generate_complex, samples_per_symbol):
+        """ Detects symbols of chunks of any size, block of whole symbols at a time.
+            Samples of a symbol split between chunks are kept until the rest of the symbol comes.
+
+            Parameters
+            ----------
+            chunks: iterable of np.ndarray
+                Consecutive parts of sinwave
+            channel : Channel
+                Channel responsible for delivering chunks
+            m : int or Constellation
+                Number of phases, power of two, or constellation
+            generate_complex: function
+                Correlation detector of given psk
+            samples_per_symbol : int
+                Number of samples of one symbol of chunks
+
+            Returns
+            -------
+                points : generator of np.ndarray
+                Complex points of consecutive blocks
+        """
+        rest = np.empty(0)
+        for chunk in chunks:
+            if len(rest):
+                chunk = np.concatenate((rest, chunk))
+            whole = len(chunk) - len(chunk) % samples_per_symbol
+            rest = chunk[whole:]
+            if not whole:
+                continue
+
+            block = WirelessSignal(None, chunk[:whole], self.__sample_rate)
+            yield self.__detect_symbols(block, channel, m, generate_complex)
 
     def make_bpsk_demod(self, data_signal, channel):
         """ Demodulates given signal (WirelessSignal) to list of bits based on bpsk modulation
@@ -278,51 +524,14 @@ class Demodulator:
 
             Returns
             -------
-                bits : list
+                bits : np.ndarray
                 List of bits read from given signal
         """
-        sinwave = data_signal.get_sinwave()
-        complex_numbers = []
-        result_data_bits = []
-
-        # pattern sine wave
-        theta = 0
-        pattern_sin_time = np.arange(0, self.__period, 1 / self.__sample_rate)
-        pattern_sinwave = self.__amplitude * np.sin(2 * np.pi * self.__frequency * pattern_sin_time + theta)
-
-        for bit in range(0, len(sinwave), self.__period * self.__sample_rate):
-            # take each single period of signal
-            start_of_sample = bit
-            end_of_sample = bit + self.__period * self.__sample_rate
-            sample = sinwave[start_of_sample:end_of_sample]
-
-            # calculate phase shift between pattern and the next fragment of signal
-            # dot - iloczyn skalrany dwóch argumentów
-            phi = math.acos(
-                np.dot(pattern_sinwave, sample) / (np.linalg.norm(pattern_sinwave) * np.linalg.norm(sample)))
-            # print(phi)
-
-            # ALTERNATYWNA WCZEŚNIEJSZA WERSJA
-            # if phi < np.pi/2 or phi >= 3*np.pi/2:       # jeśli faza mieści się w zakresie dla 1
-            #     result_data_bits.append(1)
-            # elif phi >= np.pi/2 or phi < 3*np.pi/2:     # jeśli faza mieści się w zakresie dla 0
-            #     result_data_bits.append(0)
-
-            # calculate complex number to draw a constalation diagram
-            complex_num = np.cos(phi) + 1j * np.sin(phi)
-            # print(complex_num)
-            # print("Rel_cos: " + str(np.cos(phi)) + " Ima_sin: " + str(np.sin(phi)))
-            complex_numbers.append(complex_num)
-
-        complex_numbers = channel.add_noise_to_complex(complex_numbers)
-        result_data_bits = []
-        for com in complex_numbers:
-            if np.real(com) > 0:
-                result_data_bits.append(1)
-            elif np.real(com) <= 0:
-                result_data_bits.append(0)
-
-        self.draw_constellation_diagram(complex_numbers)
+        complex_numbers = self.__detect_symbols(data_signal, channel, 2, self.__generate_complex_bpsk)
+        result_data_bits = self.__remove_padding(self.slice_symbols(complex_numbers, 2), data_signal)
+
+        if self.draw_diagram:
+            self.draw_constellation_diagram(complex_numbers)
         return result_data_bits
 
     def make_qpsk_demod(self, data_signal: WirelessSignal, channel: Channel):
@@ -337,28 +546,14 @@ class Demodulator:
 
             Returns
             -------
-                bits : list
+                bits : np.ndarray
                 List of bits read from given signal
         """
-        sinwave = data_signal.get_sinwave()
-        complex_numbers = self.__generate_complex_qpsk(data_signal)
-        complex_numbers = channel.add_noise_to_complex(complex_numbers)
-        result_data_bits = []
-        for com in complex_numbers:
-            if np.real(com) > 0 and np.imag(com) > 0:  # theta1
-                result_data_bits.extend([1, 1])
-            elif np.real(com) > 0 and np.imag(com) < 0:  # theta4
-                result_data_bits.extend([1, 0])
-            elif np.real(com) < 0 and np.imag(com) > 0:  # theta2
-                result_data_bits.extend([0, 1])
-            elif np.real(com) < 0 and np.imag(com) < 0:  # theta3
-                result_data_bits.extend([0, 0])
-
-        # if we had an odd number of bits we added one and now it is necessary, we can remove that
-        if data_signal.was_odd is True:
-            result_data_bits.pop()
-
-        self.draw_constellation_diagram(complex_numbers)
+        complex_numbers = self.__detect_symbols(data_signal, channel, 4, self.__generate_complex_qpsk)
+        result_data_bits = self.__remove_padding(self.slice_symbols(complex_numbers, 4), data_signal)
+
+        if self.draw_diagram:
+            self.draw_constellation_diagram(complex_numbers)
         return result_data_bits
 
     def make_8psk_demod(self, data_signal: WirelessSignal, channel: Channel):
@@ -373,45 +568,14 @@ class Demodulator:
 
             Returns
             -------
-                bits : list
+                bits : np.ndarray
                 List of bits read from given signal
         """
-        sinwave = data_signal.get_sinwave()
-        complex_numbers = self.__generate_complex_8psk(data_signal)
-        complex_numbers = channel.add_noise_to_complex(complex_numbers)
-        result_data_bits = []
-
-        phi_of_complex_numbers = np.angle(complex_numbers)
-        for com in range(len(phi_of_complex_numbers)):
-            if phi_of_complex_numbers[com] >= 0 and phi_of_complex_numbers[com] < np.pi / 4:
-                result_data_bits.extend([0, 0, 0])
-            elif phi_of_complex_numbers[com] >= np.pi / 4 and phi_of_complex_numbers[com] < np.pi / 2:
-                result_data_bits.extend([0, 0, 1])
-            elif phi_of_complex_numbers[com] >= np.pi / 2 and phi_of_complex_numbers[com] < 3 * np.pi / 4:
-                result_data_bits.extend([0, 1, 0])
-            elif phi_of_complex_numbers[com] >= 3 * np.pi / 4 and phi_of_complex_numbers[com] < np.pi:
-                result_data_bits.extend([0, 1, 1])
-            elif phi_of_complex_numbers[com] >= np.pi - 2 * np.pi and phi_of_complex_numbers[
-                com] < 5 * np.pi / 4 - 2 * np.pi:
-                result_data_bits.extend([1, 0, 0])
-            elif phi_of_complex_numbers[com] >= 5 * np.pi / 4 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 3 * np.pi / 2 - 2 * np.pi:
-                result_data_bits.extend([1, 0, 1])
-            elif phi_of_complex_numbers[com] >= 3 * np.pi / 2 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 7 * np.pi / 4 - 2 * np.pi:
-                result_data_bits.extend([1, 1, 0])
-            elif phi_of_complex_numbers[com] >= 7 * np.pi / 4 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 2 * np.pi - 2 * np.pi:
-                result_data_bits.extend([1, 1, 1])
-
-        # if we added bits, now it is necessary to remove that
-        if data_signal.was_two is True:
-            result_data_bits.pop()
-        if data_signal.was_one is True:
-            result_data_bits.pop()
-            result_data_bits.pop()
-
-        self.draw_constellation_diagram(complex_numbers)
+        complex_numbers = self.__detect_symbols(data_signal, channel, 8, self.__generate_complex_8psk)
+        result_data_bits = self.__remove_padding(self.slice_symbols(complex_numbers, 8), data_signal)
+
+        if self.draw_diagram:
+            self.draw_constellation_diagram(complex_numbers)
         return result_data_bits
 
     def make_16psk_demod(self, data_signal: WirelessSignal, channel: Channel):
@@ -426,70 +590,14 @@ class Demodulator:
 
             Returns
             -------
-                bits : list
+                bits : np.ndarray
                 List of bits read from given signal
         """
-        sinwave = data_signal.get_sinwave()
-        complex_numbers = self.__generate_complex_16psk(data_signal)
-        complex_numbers = channel.add_noise_to_complex(complex_numbers)
-        result_data_bits = []
-
-        phi_of_complex_numbers = np.angle(complex_numbers)
-        for com in range(len(phi_of_complex_numbers)):
-            if phi_of_complex_numbers[com] >= 0 and phi_of_complex_numbers[com] < np.pi / 8:
-                result_data_bits.extend([0, 0, 0, 0])
-            elif phi_of_complex_numbers[com] >= np.pi / 8 and phi_of_complex_numbers[com] < np.pi / 4:
-                result_data_bits.extend([0, 0, 0, 1])
-            elif phi_of_complex_numbers[com] >= np.pi / 4 and phi_of_complex_numbers[com] < 3 * np.pi / 8:
-                result_data_bits.extend([0, 0, 1, 0])
-            elif phi_of_complex_numbers[com] >= 3 * np.pi / 8 and phi_of_complex_numbers[com] < np.pi / 2:
-                result_data_bits.extend([0, 0, 1, 1])
-            elif phi_of_complex_numbers[com] >= np.pi / 2 and phi_of_complex_numbers[com] < 5 * np.pi / 8:
-                result_data_bits.extend([0, 1, 0, 0])
-            elif phi_of_complex_numbers[com] >= 5 * np.pi / 8 and phi_of_complex_numbers[com] < 3 * np.pi / 4:
-                result_data_bits.extend([0, 1, 0, 1])
-            elif phi_of_complex_numbers[com] >= 3 * np.pi / 4 and phi_of_complex_numbers[com] < 7 * np.pi / 8:
-                result_data_bits.extend([0, 1, 1, 0])
-            elif phi_of_complex_numbers[com] >= 7 * np.pi / 8 and phi_of_complex_numbers[com] < np.pi:
-                result_data_bits.extend([0, 1, 1, 1])
-            elif phi_of_complex_numbers[com] >= np.pi - 2 * np.pi and phi_of_complex_numbers[
-                com] < 9 * np.pi / 8 - 2 * np.pi:
-                result_data_bits.extend([1, 0, 0, 0])
-            elif phi_of_complex_numbers[com] >= 9 * np.pi / 8 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 5 * np.pi / 4 - 2 * np.pi:
-                result_data_bits.extend([1, 0, 0, 1])
-            elif phi_of_complex_numbers[com] >= 5 * np.pi / 4 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 11 * np.pi / 8 - 2 * np.pi:
-                result_data_bits.extend([1, 0, 1, 0])
-            elif phi_of_complex_numbers[com] >= 11 * np.pi / 8 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 3 * np.pi / 2 - 2 * np.pi:
-                result_data_bits.extend([1, 0, 1, 1])
-            elif phi_of_complex_numbers[com] >= 3 * np.pi / 2 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 13 * np.pi / 8 - 2 * np.pi:
-                result_data_bits.extend([1, 1, 0, 0])
-            elif phi_of_complex_numbers[com] >= 13 * np.pi / 8 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 7 * np.pi / 4 - 2 * np.pi:
-                result_data_bits.extend([1, 1, 0, 1])
-            elif phi_of_complex_numbers[com] >= 7 * np.pi / 4 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 15 * np.pi / 8 - 2 * np.pi:
-                result_data_bits.extend([1, 1, 1, 0])
-            elif phi_of_complex_numbers[com] >= 15 * np.pi / 8 - 2 * np.pi and phi_of_complex_numbers[
-                com] < 2 * np.pi - 2 * np.pi:
-                result_data_bits.extend([1, 1, 1, 1])
-
-        print(result_data_bits)
-        # if we added bits, now it is necessary to remove that
-        if data_signal.was_three is True:
-            result_data_bits.pop()
-        if data_signal.was_two is True:
-            result_data_bits.pop()
-            result_data_bits.pop()
-        if data_signal.was_one is True:
-            result_data_bits.pop()
-            result_data_bits.pop()
-            result_data_bits.pop()
-
-        self.draw_constellation_diagram(complex_numbers)
+        complex_numbers = self.__detect_symbols(data_signal, channel, 16, self.__generate_complex_16psk)
+        result_data_bits = self.__remove_padding(self.slice_symbols(complex_numbers, 16), data_signal)
+
+        if self.draw_diagram:
+            self.draw_constellation_diagram(complex_numbers)
         return result_data_bits
 
     @staticmethod
@@ -499,11 +607,11 @@ class Demodulator:
            Parameters
            ----------
            complex_numbers: list
-                list with complex number
+                list with complex number, every row of a batch is drawn in its own color
        """
         try:
             # draw constelation diagram
-            plt.plot(np.real(complex_numbers), np.imag(complex_numbers), '.')
+            plt.plot(np.real(complex_numbers).T, np.imag(complex_numbers).T, '.')
             plt.axhline(0, color='green')
             plt.axvline(0, color='green')
             plt.title("Diagram konstalacji syganłu")
@@ -0,0 +1,336 @@
+import time
+
+import numpy as np
+
+import utils
+
+
+class Impairment:
+    """
+    Stage of channel impairments applied to the signal before the noise.
+    Multiplicative stages give every symbol a complex gain, gains of all stages are multiplied
+    and applied to the samples in one pass. Additive stages change the samples themselves.
+    Every stage has its own generator and draws its random values in order of symbols (samples),
+    so they do not depend on splitting of the signal into chunks. Every stage counts time spent in it.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    def reset(self):
+        """
+        Forget state of the previous transmission, called before the first symbol of a signal.
+        """
+
+    def gains(self, symbols, random):
+        """
+        Compute gains of symbols.
+        Parameters
+        ----------
+        symbols Indexes of symbols of the chunk, counted from the beginning of the signal.
+        random Generator of the stage.
+
+        Returns
+        -------
+        np.ndarray Complex (or real) gain of every symbol, or a single gain of all of them, None if no gain.
+        """
+        return None
+
+    def disturb(self, samples, random, unit, first_sample):
+        """
+        Change samples in place.
+        Parameters
+        ----------
+        samples Flat floating point samples of the chunk, real and imaginary parts of baseband points in pairs.
+        random Generator of the stage.
+        unit Strength of unit noise of a sample, equivalent to unit noise of sinwave.
+        first_sample Index of the first of samples, counted from the beginning of the signal.
+        """
+
+
+class PhaseOffset(Impairment):
+    """
+    Constant rotation of all symbols, e.g. phase of unsynchronized carrier.
+    """
+
+    def __init__(self, phase):
+        """
+        Parameters
+        ----------
+        phase Rotation in radians.
+        """
+        super().__init__()
+        self.phase = phase
+
+    def gains(self, symbols, random):
+        return np.exp(1j * self.phase)
+
+
+class FrequencyOffset(Impairment):
+    """
+    Rotation growing from symbol to symbol, carrier frequency of receiver differs from frequency of transmitter.
+    Rotation is constant within a symbol.
+    """
+
+    def __init__(self, offset, phase=0.0):
+        """
+        Parameters
+        ----------
+        offset Frequency offset as a fraction of symbol rate (cycles per symbol).
+        phase Rotation of the first symbol in radians.
+        """
+        super().__init__()
+        self.offset = offset
+        self.phase = phase
+
+    def gains(self, symbols, random):
+        return np.exp(1j * (self.phase + 2 * np.pi * self.offset * symbols))
+
+
+class AmplitudeScaling(Impairment):
+    """
+    Constant gain (attenuation) of the signal.
+    """
+
+    def __init__(self, gain):
+        """
+        Parameters
+        ----------
+        gain Amplitude gain, below 1 for attenuation.
+        """
+        super().__init__()
+        self.gain = gain
+
+    def gains(self, symbols, random):
+        return self.gain
+
+
+class Fading(Impairment):
+    """
+    Flat block fading: gain is constant for coherence_symbols symbols and random between blocks.
+    Rayleigh fading without line of sight for k_factor 0, Rician fading otherwise.
+    Mean power of the gain is 1.
+    """
+
+    def __init__(self, k_factor=0.0, coherence_symbols=1):
+        """
+        Parameters
+        ----------
+        k_factor Power of line of sight to power of scattered paths, 0 for Rayleigh fading.
+        coherence_symbols Number of symbols with the same gain.
+        """
+        super().__init__()
+        self.k_factor = k_factor
+        self.coherence_symbols = coherence_symbols
+        self.__block = -1
+        self.__gain = None
+
+    def reset(self):
+        self.__block = -1
+
+    def gains(self, symbols, random):
+        blocks = symbols // self.coherence_symbols
+        first_block = blocks[0]
+        # gain of a block split between chunks is kept
+        known = 1 if first_block == self.__block else 0
+        scattered = random.standard_normal((blocks[-1] - first_block + 1 - known, 2)).view(np.complex128)[:, 0]
+        block_gains = (np.sqrt(self.k_factor) + scattered / np.sqrt(2)) / np.sqrt(self.k_factor + 1)
+        if known:
+            block_gains = np.concatenate(([self.__gain], block_gains))
+        self.__block = blocks[-1]
+        self.__gain = block_gains[-1]
+        return block_gains[blocks - first_block]
+
+
+class ImpulsiveNoise(Impairment):
+    """
+    Impulses hitting single samples at random, e.g. switching or lightning.
+    """
+
+    def __init__(self, probability, strength):
+        """
+        Parameters
+        ----------
+        probability Probability of impulse in a sample.
+        strength Standard deviation of impulses in a sample of sinwave, impulses of baseband points
+                 are scaled as the channel noise.
+        """
+        super().__init__()
+        self.probability = probability
+        self.strength = strength
+        self.reset()
+
+    def reset(self):
+        # impulses drawn beyond the end of the previous chunk
+        self.__hits = np.empty(0, dtype=np.int64)
+        self.__amplitudes = np.empty(0)
+        self.__last = -1
+
+    def disturb(self, samples, random, unit, first_sample):
+        if self.probability <= 0:
+            return
+        end = first_sample + len(samples)
+        # gap to the next impulse is geometric: exponential (half of the sum of squares of two normals)
+        # divided by its rate and rounded down. Every impulse draws three normals, its amplitude and its gap,
+        # so no random number is drawn for every sample and impulses are drawn in order of samples.
+        rate = -np.log1p(-self.probability)
+        hits, amplitudes = [self.__hits], [self.__amplitudes]
+        while self.__last < end:
+            draws = random.standard_normal((16 + int(len(samples) * self.probability), 3))
+            gaps = np.floor((draws[:, 1] ** 2 + draws[:, 2] ** 2) / (2 * rate)).astype(np.int64) + 1
+            positions = self.__last + np.cumsum(gaps)
+            hits.append(positions)
+            amplitudes.append(draws[:, 0])
+            self.__last = positions[-1]
+        hits, amplitudes = np.concatenate(hits), np.concatenate(amplitudes)
+
+        inside = np.searchsorted(hits, end)
+        samples[hits[:inside] - first_sample] += (self.strength * unit) * amplitudes[:inside].astype(samples.dtype)
+        self.__hits, self.__amplitudes = hits[inside:], amplitudes[inside:]
+
+
+class ImpairmentChain:
+    """
+    Ordered stages of impairments applied chunk by chunk to samples of a signal.
+    Gains of multiplicative stages are combined, so every chunk is changed in one pass, whatever the number of stages.
+    Phase of a symbol of sinwave is turned with its quadrature: the symbol window holds whole periods of sinwave,
+    so rolling it by a quarter of period gives the sinwave shifted by a quarter of period
+    (exactly if number of samples per period is divisible by 4). Envelope of shaped symbols changes within
+    the window, so stages turning phase reject pulse shaped signals.
+    """
+
+    def __init__(self, stages, chunk_size=1 << 16):
+        """
+        Parameters
+        ----------
+        stages List of Impairment objects, in order of application.
+        chunk_size Approximate number of samples of one chunk, rounded to whole symbols.
+        """
+        self.stages = list(stages)
+        self.chunk_size = chunk_size
+        self.apply_seconds = 0.0
+
+    def report(self):
+        """
+        Get time spent in every stage and in applying combined gains.
+
+        Returns
+        -------
+        list Pairs (name, seconds).
+        """
+        return [(stage.name, stage.seconds) for stage in self.stages] + [("apply gains", self.apply_seconds)]
+
+    def generators(self, seed):
+        """
+        Make independent generator of every stage.
+        Parameters
+        ----------
+        seed np.random.SeedSequence of the impairments, spawned for every stage.
+
+        Returns
+        -------
+        list Generator of every stage, in order of stages.
+        """
+        return [np.random.default_rng(stage_seed) for stage_seed in seed.spawn(len(self.stages))]
+
+    def apply(self, samples, wireless_signal, randoms, first_symbol=0):
+        """
+        Apply all stages to samples in place.
+        Parameters
+        ----------
+        samples Contiguous samples of the signal: floating point, complex (baseband) or quantized.
+        wireless_signal Signal of the samples, its baseband, shaped, symbol_length, cycles_per_symbol and scale
+                        describe the samples.
+        randoms Generator of every stage (generators).
+        first_symbol Index of the first symbol of samples, when a signal is applied in parts.
+        """
+        if first_symbol == 0:
+            for stage in self.stages:
+                stage.reset()
+
+        samples_per_symbol = 1 if wireless_signal.baseband else wireless_signal.symbol_length
+        symbols = samples.reshape(-1, samples_per_symbol)
+        symbols_per_chunk = max(1, self.chunk_size // samples_per_symbol)
+        quantized = np.issubdtype(samples.dtype, np.integer)
+        # baseband point gets impulses of the same strength as its noise
+        unit = np.sqrt(2 / wireless_signal.symbol_length) if wireless_signal.baseband else 1.0
+        # real and imaginary parts of baseband points are two samples
+        flat_per_symbol = 2 if wireless_signal.baseband else samples_per_symbol
+
+        for start in range(0, len(symbols), symbols_per_chunk):
+            part = symbols[start:start + symbols_per_chunk]
+            chunk = part * np.asarray(wireless_signal.scale, dtype=np.float32) if quantized else part
+            indexes = np.arange(first_symbol + start, first_symbol + start + len(part))
+
+            gain = self.__combined_gain(indexes, randoms)
+            begin = time.perf_counter()
+            if gain is not None:
+                self.__apply_gain(chunk, gain, wireless_signal.baseband, wireless_signal.cycles_per_symbol,
+                                  wireless_signal.shaped)
+            self.apply_seconds += time.perf_counter() - begin
+
+            flat = chunk.reshape(-1)
+            if wireless_signal.baseband:
+                flat = flat.view(chunk.real.dtype)
+            for stage, random in zip(self.stages, randoms):
+                begin = time.perf_counter()
+                stage.disturb(flat, random, unit, indexes[0] * flat_per_symbol)
+                stage.seconds += time.perf_counter() - begin
+
+            if quantized:
+                part[...] = utils.quantize(chunk, wireless_signal.scale, samples.dtype)
+
+    def __combined_gain(self, indexes, randoms):
+        """
+        Multiply gains of all multiplicative stages.
+        Parameters
+        ----------
+        indexes Indexes of symbols of the chunk.
+        randoms Generator of every stage.
+
+        Returns
+        -------
+        np.ndarray Gain of every symbol, single gain, or None if no stage has gain.
+        """
+        gain = None
+        for stage, random in zip(self.stages, randoms):
+            begin = time.perf_counter()
+            stage_gain = stage.gains(indexes, random)
+            if stage_gain is not None:
+                gain = stage_gain if gain is None else gain * stage_gain
+            stage.seconds += time.perf_counter() - begin
+        return gain
+
+    @staticmethod
+    def __apply_gain(chunk, gain, baseband, cycles_per_symbol=1, shaped=False):
+        """
+        Multiply symbols of the chunk by their gains in place.
+        Parameters
+        ----------
+        chunk Symbols of the chunk, one complex point or one window of sinwave in every row.
+        gain Gain of every symbol or single gain.
+        baseband True if the chunk holds complex points.
+        cycles_per_symbol Number of periods of sinwave in one window.
+        shaped True if symbols of sinwave have envelope of a pulse shaper.
+        """
+        gain = np.asarray(gain)
+        if baseband:
+            chunk *= gain.reshape(gain.shape + (1,) * (chunk.ndim - gain.ndim)).astype(chunk.dtype)
+            return
+        gain = gain.reshape(gain.shape + (1,) * (chunk.ndim - gain.ndim))
+        if not np.iscomplexobj(gain) or not np.any(gain.imag):
+            chunk *= gain.real.astype(chunk.dtype)
+            return
+        if shaped:
+            raise ValueError("Phase of pulse shaped sinwave can not be turned, its symbols do not hold whole periods "
+                             "of constant envelope")
+        # a sin(wt + phi) turned by theta: sin(wt + phi) cos(theta) + cos(wt + phi) sin(theta),
+        # cosine of a window of whole periods is the window rolled by a quarter of period
+        quadrature = np.roll(chunk, -(chunk.shape[-1] // (4 * cycles_per_symbol)), axis=-1)
+        chunk *= gain.real.astype(chunk.dtype)
+        quadrature *= gain.imag.astype(chunk.dtype)
+        chunk += quadrature
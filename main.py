@@ -1,11 +1,13 @@
+import pipeline
+import result_store
 import utils
-import csv
 
 from bitStream.pbm_class import PbmClass
 from modulator import Modulator
 from demodulator import Demodulator
-from noise_to_bit_distortion import NoiseToBitDistortion, Psk
+from noise_to_bit_distortion import NoiseToBitDistortion, Psk, PSK_CONSTELLATIONS, sweep_parameters
 from radio_channel import Channel
+from result_store import ResultStore
 from wireless_signal import WirelessSignal
 from bitStream.file_binary_io import FileIO
 
@@ -164,83 +166,41 @@ def test_16psk_picture(noise_strength):
     FileIO("computerB\\recieved_16psk_cloud.png").write_to_file(result_bits)
 
 
-def wrong_bits_test():
+def wrong_bits_test(store=None, seed=None):
     noise_strength = [0.001, 0.009, 0.01, 0.03, 0.05, 0.1, 0.2, 0.5]
-    bpsk = {}
-    qpsk = {}
-    psk8 = {}
-    psk16 = {}
+    file_name = "computerA\\cloud.png"
 
-    # tests sending png from computerA to computerB with 16psk
+    # tests sending png from computerA to computerB with every psk
     modulator = Modulator()
     demodulator = Demodulator()
-    channel = Channel()
 
     # send signal to modulator
-    bits = FileIO("computerA\\cloud.png").read_from_file()
+    bits = FileIO(file_name).read_from_file()
+
+    # finished points are kept on disk, so only missing ones are simulated,
+    # keys are the same as keys of NoiseToBitDistortion, so both share the points
+    store = store or ResultStore()
+    seed = result_store.effective_seed(seed)
+    data_hash = result_store.bits_hash(bits)
+    parameters = sweep_parameters(False)
 
-    for noise in noise_strength:
-        # bpsk
-        signal1 = modulator.make_bpsk_mod(bits)
-        # send signal to channel
-        signal1 = channel.send_signal(signal1, noise)
-        result_bits1 = demodulator.make_bpsk_demod(signal1, channel)
-
-        # qpsk
-        signal2 = modulator.make_qpsk_mod(bits)
-        # send signal to channel
-        signal2 = channel.send_signal(signal2, noise)
-        result_bits2 = demodulator.make_qpsk_demod(signal2, channel)
-
-        # 8psk
-        signal3 = modulator.make_8psk_mod(bits)
-        # send signal to channel
-        signal3 = channel.send_signal(signal3, noise)
-        result_bits3 = demodulator.make_8psk_demod(signal3, channel)
-
-        # 16psk
-        signal4 = modulator.make_16psk_mod(bits)
-        # send signal to channel
-        signal4 = channel.send_signal(signal4, noise)
-        result_bits4 = demodulator.make_16psk_demod(signal4, channel)
-
-        # wrong bits counters
-        wrong_bpsk = 0
-        wrong_qpsk = 0
-        wrong_8psk = 0
-        wrong_16psk = 0
-
-        for i in range(len(result_bits1)):
-            # check how many wrong bits
-            if bits[i] != result_bits1[i]:
-                wrong_bpsk += 1
-            if bits[i] != result_bits2[i]:
-                wrong_qpsk += 1
-            if bits[i] != result_bits3[i]:
-                wrong_8psk += 1
-            if bits[i] != result_bits4[i]:
-                wrong_16psk += 1
-
-        bpsk[noise] = wrong_bpsk
-        qpsk[noise] = wrong_qpsk
-        psk8[noise] = wrong_8psk
-        psk16[noise] = wrong_16psk
-
-    out_file = open('wrong_bits.csv', 'w', newline='')
-    headers = ['noise', 'bpsk', 'qpsk', 'psk8', 'psk16', 'oryginal_size']
-    writer = csv.DictWriter(out_file, delimiter=';', lineterminator='\n', fieldnames=headers)
-
-    writer.writeheader()
-
-    for i in range(0, 8):
-        writer.writerow({'noise': noise_strength[i],
-                         'bpsk': str(list(bpsk.values())[i]).replace('.', ','),
-                         'qpsk': str(list(qpsk.values())[i]).replace('.', ','),
-                         'psk8': str(list(psk8.values())[i]).replace('.', ','),
-                         'psk16': str(list(psk16.values())[i]).replace('.', ','),
-                         'oryginal_size': len(bits)})
-
-    out_file.close()
+    # every psk is modulated once, when its first missing point is simulated, and reused for every noise
+    sweeps = {}
+
+    def simulate(constellation, noise):
+        if constellation not in sweeps:
+            sweeps[constellation] = pipeline.NoiseSweep(bits, constellation, modulator, demodulator)
+        channel = Channel(seed=result_store.point_seed(seed, constellation, noise))
+        result_bits = sweeps[constellation].transmit(noise, channel)
+        # check how many wrong bits
+        return utils.compute_distorted_bits(bits, result_bits)
+
+    for constellation in PSK_CONSTELLATIONS.values():
+        for noise in noise_strength:
+            store.point(data_hash, constellation, noise, lambda: simulate(constellation, noise), parameters, seed)
+        sweeps.pop(constellation, None)
+
+    store.export_csv('wrong_bits.csv', data_hash, noise_strength, len(bits), parameters, seed)
 
 
 # Try sending PNG image through channel using qpsk
@@ -274,16 +234,17 @@ def qpsk_img_compute_distorsion(noise_strength):
     print("Number of distorted bits: ", utils.compute_distorted_bits(bit_list, result_bits))
 
 
-noise_strength = 0.1
-# test_bpsk(noise_strength)
-# test_bpsk_picture(noise_strength)
-# test_qpsk(noise_strength)
-# test_qpsk_picture(noise_strength)
-# test_8psk(noise_strength)
-# test_8psk_picture(noise_strength)
-# test_16psk(noise_strength)
-# test_16psk_picture(noise_strength)
-# wrong_bits_test()
-# qpsk_img_compute_distorsion(noise_strength)
-
-NoiseToBitDistortion(0.01, 0.5, Psk.Qpsk, 0.02)
+if __name__ == '__main__':
+    noise_strength = 0.1
+    # test_bpsk(noise_strength)
+    # test_bpsk_picture(noise_strength)
+    # test_qpsk(noise_strength)
+    # test_qpsk_picture(noise_strength)
+    # test_8psk(noise_strength)
+    # test_8psk_picture(noise_strength)
+    # test_16psk(noise_strength)
+    # test_16psk_picture(noise_strength)
+    # wrong_bits_test()
+    # qpsk_img_compute_distorsion(noise_strength)
+
+    NoiseToBitDistortion(0.01, 0.5, Psk.Qpsk, 0.02)
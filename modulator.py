@@ -1,11 +1,15 @@
 import numpy as np
 
-from demodulator import Demodulator
+import pulse_shaping
+import utils
+from constellation import get_constellation
+from waveform_cache import waveform_cache
 from wireless_signal import WirelessSignal
 
 
 class Modulator:
-    def __init__(self, period=6, amplitude=1, sample_rate=100):
+    def __init__(self, period=6, amplitude=1, sample_rate=100, dtype=np.float64, full_scale=None,
+                 cycles_per_symbol=1, shaper=None):
         """ Set default parameters for modulation
 
             Parameters
@@ -16,55 +20,303 @@ class Modulator:
                 Amplitude, signal strength
             sample_rate: int
                 Sample rate, number of samples per milisecond
+            dtype: np.dtype
+                Type of samples: np.float64, np.float32 or quantized np.int16
+            full_scale: number (int, float...)
+                Largest value of quantized samples, channel noise above it is clipped.
+                Default 64 * amplitude leaves headroom of 6 standard deviations of noise strength up to 10
+                (noise of the benchmarks reaches 8), while one step of int16 stays 2e-3 * amplitude,
+                far below noise of any sweep. Smaller full scale suits only weak noise.
+            cycles_per_symbol: int
+                Number of whole periods of sinwave in one symbol
+            shaper: PulseShaper or None
+                Gives symbols (root) raised cosine envelope instead of rectangular one,
+                baseband signals are not shaped
         """
         self.__period = period
         self.__frequency = 1/period
         self.__amplitude = amplitude
         self.__sample_rate = sample_rate
+        self.__cycles_per_symbol = cycles_per_symbol
+        self.__shaper = shaper
+        self.__dtype = np.dtype(dtype)
+        self.__scale = 1
+        if np.issubdtype(self.__dtype, np.integer):
+            if full_scale is None:
+                full_scale = 64 * amplitude
+            self.__scale = full_scale / np.iinfo(self.__dtype).max
+
+    def get_parameters(self):
+        """ Returns parameters which change generated signals, e.g. to identify stored results.
 
-    def make_bpsk_mod(self, bits):
-        """ Generates WirelessSignal object from given list of bits in binary phase-shift keying.
-            WirelessSignal objects contains linspace and sinwave.
+           Returns
+           -------
+           parameters : dict
+               Period, amplitude, sample rate, periods per symbol, type of samples, scale of quantized samples
+               and parameters of shaper
+        """
+        return {'period': self.__period, 'amplitude': self.__amplitude, 'sample_rate': self.__sample_rate,
+                'cycles_per_symbol': self.__cycles_per_symbol, 'dtype': self.__dtype.name, 'scale': self.__scale,
+                'shaper': None if self.__shaper is None else self.__shaper.get_parameters()}
+
+    def make_waveform_table(self, m):
+        """ Generates sinwaves of cycles_per_symbol periods for every symbol of m-psk.
 
            Parameters
            ----------
-           bits : list
-               List of bits to generate sinwave from it
+           m : int or Constellation
+               Number of phases, power of two, or constellation
+
+           Returns
+           -------
+           table : np.ndarray
+               Array of shape (m, samples per symbol), row k holds sinwave for symbol value k
+        """
+        return waveform_cache.psk_table(m, self.__period, self.__amplitude, self.__sample_rate,
+                                        dtype=self.__dtype, scale=self.__scale, cycles=self.__cycles_per_symbol)
+
+    @staticmethod
+    def __pack_symbols(bits, bits_per_symbol):
+        """ Packs bits into symbol values, first bit is the most significant one.
+            If number of bits is not divisible by bits per symbol, zeros are appended.
+
+           Parameters
+           ----------
+           bits : list or np.ndarray
+               List of bits, or array of shape (links, bits) with bits of one link in every row
+           bits_per_symbol : int
+               Number of bits coded by one symbol
+
+           Returns
+           -------
+           symbols : np.ndarray
+               Value of every symbol, one row of symbols for every link
+           padding : int
+               Number of appended zeros
+        """
+        signal_bits = np.asarray(bits, dtype=np.uint8)
+        if signal_bits.ndim != 2:
+            signal_bits = signal_bits.ravel()
+
+        # append zeros, so the last symbol is complete
+        padding = -signal_bits.shape[-1] % bits_per_symbol
+        if padding:
+            zeros = np.zeros(signal_bits.shape[:-1] + (padding,), dtype=np.uint8)
+            signal_bits = np.concatenate((signal_bits, zeros), axis=-1)
+
+        weights = 1 << np.arange(bits_per_symbol - 1, -1, -1)
+        return signal_bits.reshape(signal_bits.shape[:-1] + (-1, bits_per_symbol)) @ weights, padding
+
+    def make_mpsk_mod(self, bits, m):
+        """ Generates WirelessSignal object from given list of bits in m-phase-shift keying.
+            Bits are packed into symbol values and every symbol picks its period from the waveform table.
+            If number of bits is not divisible by bits per symbol, zeros are appended and
+            the signal remembers how many of them were added.
+            Bits of many links, one link in every row, give one sinwave in every row.
+
+           Parameters
+           ----------
+           bits : list or np.ndarray
+               List of bits to generate sinwave from it, or array of shape (links, bits)
+           m : int or Constellation
+               Number of phases, power of two, or constellation
 
            Returns
            -------
            signal : WirelessSignal
                Signal generated from bits
         """
+        bits_per_symbol = get_constellation(m).bits_per_symbol
+        symbols, padding = self.__pack_symbols(bits, bits_per_symbol)
+
+        # timeline is generated by the signal only when it is needed
+        table = self.make_waveform_table(m)
+        if self.__shaper is None:
+            sinwave = table[symbols].reshape(symbols.shape[:-1] + (-1,))
+        else:
+            sinwave = self.__shape(symbols, m, table.shape[1])
+        signal = WirelessSignal(None, sinwave, self.__sample_rate)
+        signal.scale = self.__scale
+        signal.symbol_length = table.shape[1]
+        signal.cycles_per_symbol = self.__cycles_per_symbol
+        signal.shaped = self.__shaper is not None
+
+        self.__save_padding(signal, padding, bits_per_symbol)
+        return signal
+
+    def make_mpsk_baseband(self, bits, m):
+        """ Generates baseband WirelessSignal object (complex envelope) from given list of bits in m-psk.
+            Every symbol is a single complex point with amplitude of the sinwave and phase of the symbol,
+            so the signal is much smaller than the sinwave, but channel and demodulator treat it
+            the same way as the sinwave of make_mpsk_mod.
+
+           Parameters
+           ----------
+           bits : list or np.ndarray
+               List of bits to generate signal from it, or array of shape (links, bits)
+           m : int or Constellation
+               Number of phases, power of two, or constellation
+
+           Returns
+           -------
+           signal : WirelessSignal
+               Signal generated from bits, one complex sample per symbol
+        """
+        bits_per_symbol = get_constellation(m).bits_per_symbol
+        symbols, padding = self.__pack_symbols(bits, bits_per_symbol)
 
-        # x-axis, time
-        start_time = 0
-        end_time = self.__period * len(bits)  # period times number of bits
-        timeline = np.arange(start_time, end_time, 1 / self.__sample_rate)  # timeline for all bits
+        signal = WirelessSignal(None, self.__points(m)[symbols], 1 / (self.__period * self.__cycles_per_symbol))
+        signal.baseband = True
+        signal.symbol_length = self.make_waveform_table(m).shape[1]
+        signal.cycles_per_symbol = self.__cycles_per_symbol
 
-        # Phase
-        theta1 = 0  # for coding binary 1
-        theta2 = np.pi  # for coding binary 0
+        self.__save_padding(signal, padding, bits_per_symbol)
+        return signal
 
-        # sin
-        # two single period sinwaves with opposites phases
-        sample_sin_time = np.arange(0, self.__period, 1 / self.__sample_rate)
-        sinwave1 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * sample_sin_time + theta1)
-        sinwave2 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * sample_sin_time + theta2)
+    def __points(self, m):
+        """ Complex points of symbols of m-psk (or of any constellation), with amplitude of the sinwave.
 
-        # sinwave for final signal
-        sinwave = []
+           Parameters
+           ----------
+           m : int or Constellation
+               Number of phases, power of two, or constellation
 
-        for bit in bits:
-            # add a single period of sinwave for different value of bits
-            if bit == 1:
-                sinwave.extend(sinwave1)  # if bit == 1 add period with phase 0
-            elif bit == 0:
-                sinwave.extend(sinwave2)  # if bit == 0 add period with phase 1
+           Returns
+           -------
+           points : np.ndarray
+               Point of every symbol value, complex type of computations
+        """
+        complex_dtype = np.result_type(utils.compute_dtype(self.__dtype), np.complex64)
+        return (self.__amplitude * get_constellation(m).points).astype(complex_dtype)
 
-        # print(len(bits))
-        out_signal = WirelessSignal(timeline, sinwave)
-        return out_signal
+    def __shape(self, symbols, m, samples_per_symbol):
+        """ Generates sinwave of symbols with envelope of the shaper.
+            Envelope is made and put on the carrier part by part, so only the sinwave has the size of the signal.
+
+           Parameters
+           ----------
+           symbols : np.ndarray
+               Value of every symbol, one row of symbols for every link
+           m : int or Constellation
+               Number of phases, power of two, or constellation
+           samples_per_symbol : int
+               Number of samples of one symbol
+
+           Returns
+           -------
+           sinwave : np.ndarray
+               Shaped sinwave, samples_per_symbol samples for every symbol
+        """
+        points = self.__points(m)[symbols]
+        sinwave = np.empty(symbols.shape[:-1] + (symbols.shape[-1] * samples_per_symbol,), dtype=self.__dtype)
+        chunks = pulse_shaping.split_last_axis(points, max(1, (1 << 20) // samples_per_symbol))
+        position = 0
+        for envelope in self.__shaper.stream_shape(chunks, samples_per_symbol):
+            end = position + envelope.shape[-1]
+            sinwave[..., position:end] = self.__mix_up(envelope, samples_per_symbol, position)
+            position = end
+        return sinwave
+
+    def __mix_up(self, envelope, samples_per_symbol, start=0):
+        """ Turns complex envelope into sinwave on the carrier.
+
+           Parameters
+           ----------
+           envelope : np.ndarray
+               Complex envelope
+           samples_per_symbol : int
+               Number of samples of one symbol
+           start : int
+               Index of the first sample of envelope, counted from the beginning of the signal
+
+           Returns
+           -------
+           sinwave : np.ndarray
+               Sinwave of the type of samples
+        """
+        samples_per_period = samples_per_symbol // self.__cycles_per_symbol
+        sinwave = (envelope * pulse_shaping.carrier(samples_per_period, envelope.shape[-1], start,
+                                                    dtype=envelope.real.dtype)).imag
+        if np.issubdtype(self.__dtype, np.integer):
+            return utils.quantize(sinwave, self.__scale, self.__dtype)
+        return sinwave.astype(self.__dtype, copy=False)
+
+    @staticmethod
+    def __save_padding(signal, padding, bits_per_symbol):
+        """ Saves information about bits appended to complete the last symbol.
+
+           Parameters
+           ----------
+           signal : WirelessSignal
+               Generated signal
+           padding : int
+               Number of appended zeros
+           bits_per_symbol : int
+               Number of bits coded by one symbol
+        """
+        rest = (bits_per_symbol - padding) % bits_per_symbol
+        signal.padding = padding
+        if bits_per_symbol == 2:
+            signal.was_odd = rest == 1
+        elif bits_per_symbol in (3, 4):
+            signal.was_one = rest == 1
+            signal.was_two = rest == 2
+            signal.was_three = rest == 3
+
+    def stream_mpsk_mod(self, bits, m, chunk_size=65536):
+        """ Generates sinwave of m-phase-shift keying in chunks, so the whole signal is never in memory.
+            Chunks put together are equal to sinwave of make_mpsk_mod.
+
+           Parameters
+           ----------
+           bits : list or np.ndarray
+               List of bits to generate sinwave from it
+           m : int or Constellation
+               Number of phases, power of two, or constellation
+           chunk_size : int
+               Maximal number of samples in one chunk, every chunk holds whole symbols,
+               chunks of shaped sinwave are shifted by delay of the shaping filter
+
+           Returns
+           -------
+           chunks : generator of np.ndarray
+               Consecutive parts of sinwave
+        """
+        bits_per_symbol = get_constellation(m).bits_per_symbol
+        table = self.make_waveform_table(m)
+        symbols_per_chunk = max(1, chunk_size // table.shape[1])
+        bits_per_chunk = symbols_per_chunk * bits_per_symbol
+
+        def symbol_chunks():
+            for start in range(0, len(bits), bits_per_chunk):
+                yield self.__pack_symbols(bits[start:start + bits_per_chunk], bits_per_symbol)[0]
+
+        if self.__shaper is None:
+            for symbols in symbol_chunks():
+                yield table[symbols].ravel()
+            return
+
+        points = self.__points(m)
+        position = 0
+        for envelope in self.__shaper.stream_shape((points[symbols] for symbols in symbol_chunks()), table.shape[1]):
+            yield self.__mix_up(envelope, table.shape[1], position)
+            position += len(envelope)
+
+    def make_bpsk_mod(self, bits):
+        """ Generates WirelessSignal object from given list of bits in binary phase-shift keying.
+            WirelessSignal objects contains linspace and sinwave.
+
+           Parameters
+           ----------
+           bits : list
+               List of bits to generate sinwave from it
+
+           Returns
+           -------
+           signal : WirelessSignal
+               Signal generated from bits
+        """
+        return self.make_mpsk_mod(bits, 2)
 
     def make_qpsk_mod(self, bits):
         """ Generates WirelessSignal object from given list of bits in quadrature phase-shift keying.
@@ -80,52 +332,7 @@ class Modulator:
            signal : WirelessSignal
                Signal generated from bits
         """
-
-        signalBits = bits.copy()
-
-        # We need to check if signal has odd number of bits
-        odd_number_of_bits = False
-
-        # Deal with odd-sized signal
-        if len(signalBits) % 2 != 0:
-            signalBits.append(0)
-            odd_number_of_bits = True
-
-        start_time = 0
-        end_time = self.__period * len(signalBits) / 2
-        timeline = np.arange(start_time, end_time, 1 / self.__sample_rate)
-
-        theta1 = np.pi / 4  # coding 11
-        theta2 = 3 * np.pi / 4  # coding 01
-        theta3 = 5 * np.pi / 4  # coding 00
-        theta4 = 7 * np.pi / 4  # coding 10
-
-        # Generate corresponding sinwaves with length of period
-        linspace = np.arange(0, self.__period, 1 / self.__sample_rate)
-        sinwave1 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta1)
-        sinwave2 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta2)
-        sinwave3 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta3)
-        sinwave4 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta4)
-
-        sinwave = []
-
-        for i in range(0, len(signalBits)-1, 2):
-            if signalBits[i] == 1 and signalBits[i + 1] == 1:  # theta1 case
-                sinwave.extend(sinwave1)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 1:  # theta2 case
-                sinwave.extend(sinwave2)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 0:  # theta3 case
-                sinwave.extend(sinwave3)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 0:  # theta4 case
-                sinwave.extend(sinwave4)
-        signal = WirelessSignal(timeline, sinwave)
-
-        # save information about odd number of bits
-        if odd_number_of_bits:
-            signal.was_odd = True
-
-        demodulator = Demodulator()
-        return signal
+        return self.make_mpsk_mod(bits, 4)
 
     def make_8psk_mod(self, bits):
         """ Generates WirelessSignal object from given list of bits in 8-phase-shift keying.
@@ -141,76 +348,7 @@ class Modulator:
            signal : WirelessSignal
                Signal generated from bits
         """
-
-        signalBits = bits.copy()
-
-        # We need to check if signal's number of bits can be defined as 3n
-        one_number_of_bits = False
-        two_number_of_bits = False
-
-        # Deal with rest equal 2
-        if len(signalBits) % 3 == 2:
-            signalBits.append(0)
-            two_number_of_bits = True
-        # Deal with rest equal 1
-        if len(signalBits) % 3 == 1:
-            signalBits.append(0)
-            signalBits.append(0)
-            one_number_of_bits = True
-
-        start_time = 0
-        end_time = self.__period * len(signalBits) / 3
-        timeline = np.arange(start_time, end_time, 1 / self.__sample_rate)
-
-        theta1 = np.pi / 8  # coding 000
-        theta2 = 3 * np.pi / 8  # coding 001
-        theta3 = 5 * np.pi / 8  # coding 010
-        theta4 = 7 * np.pi / 8  # coding 011
-        theta5 = 9 * np.pi / 8  # coding 100
-        theta6 = 11 * np.pi / 8  # coding 101
-        theta7 = 13 * np.pi / 8  # coding 110
-        theta8 = 15 * np.pi / 8  # coding 111
-
-        # Generate corresponding sinwaves with length of period
-        linspace = np.arange(0, self.__period, 1 / self.__sample_rate)
-        sinwave1 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta1)
-        sinwave2 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta2)
-        sinwave3 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta3)
-        sinwave4 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta4)
-        sinwave5 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta5)
-        sinwave6 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta6)
-        sinwave7 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta7)
-        sinwave8 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta8)
-
-        sinwave = []
-
-        for i in range(0, len(signalBits) - 1, 3):
-            if signalBits[i] == 0 and signalBits[i + 1] == 0 and signalBits[i + 2] == 0:  # theta1 case
-                sinwave.extend(sinwave1)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 0 and signalBits[i + 2] == 1:  # theta2 case
-                sinwave.extend(sinwave2)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 1 and signalBits[i + 2] == 0:  # theta3 case
-                sinwave.extend(sinwave3)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 1 and signalBits[i + 2] == 1:  # theta4 case
-                sinwave.extend(sinwave4)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 0 and signalBits[i + 2] == 0:  # theta5 case
-                sinwave.extend(sinwave5)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 0 and signalBits[i + 2] == 1:  # theta6 case
-                sinwave.extend(sinwave6)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 1 and signalBits[i + 2] == 0:  # theta7 case
-                sinwave.extend(sinwave7)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 1 and signalBits[i + 2] == 1:  # theta8 case
-                sinwave.extend(sinwave8)
-        signal = WirelessSignal(timeline, sinwave)
-
-        # save information about rest of bits
-        if one_number_of_bits:
-            signal.was_one = True
-        if two_number_of_bits:
-            signal.was_two = True
-
-        demodulator = Demodulator()
-        return signal
+        return self.make_mpsk_mod(bits, 8)
 
     def make_16psk_mod(self, bits):
         """ Generates WirelessSignal object from given list of bits in 16-phase-shift keying.
@@ -226,128 +364,4 @@ class Modulator:
            signal : WirelessSignal
                Signal generated from bits
         """
-
-        signalBits = bits.copy()
-
-        # We need to check if signal's number of bits can be defined as 4n
-        one_number_of_bits = False
-        two_number_of_bits = False
-        three_number_of_bits = False
-        # Deal with rest equal 3
-        if len(signalBits) % 4 == 3:
-            signalBits.append(0)
-            three_number_of_bits = True
-        # Deal with rest equal 2
-        if len(signalBits) % 4 == 2:
-            signalBits.append(0)
-            signalBits.append(0)
-            two_number_of_bits = True
-        # Deal with rest equal 1
-        if len(signalBits) % 4 == 1:
-            signalBits.append(0)
-            signalBits.append(0)
-            signalBits.append(0)
-            one_number_of_bits = True
-
-        start_time = 0
-        end_time = self.__period * len(signalBits) / 4
-        timeline = np.arange(start_time, end_time, 1 / self.__sample_rate)
-
-        theta1 = np.pi / 16  # coding 0000
-        theta2 = 3 * np.pi / 16  # coding 0001
-        theta3 = 5 * np.pi / 16  # coding 0010
-        theta4 = 7 * np.pi / 16  # coding 0011
-        theta5 = 9 * np.pi / 16  # coding 0100
-        theta6 = 11 * np.pi / 16  # coding 0101
-        theta7 = 13 * np.pi / 16  # coding 0110
-        theta8 = 15 * np.pi / 16  # coding 0111
-        theta9 = 17 * np.pi / 16  # coding 1000
-        theta10 = 19 * np.pi / 16  # coding 1001
-        theta11 = 21 * np.pi / 16  # coding 1010
-        theta12 = 23 * np.pi / 16  # coding 1011
-        theta13 = 25 * np.pi / 16  # coding 1100
-        theta14 = 27 * np.pi / 16  # coding 1101
-        theta15 = 29 * np.pi / 16  # coding 1110
-        theta16 = 31 * np.pi / 16  # coding 1111
-        # Generate corresponding sinwaves with length of period
-        linspace = np.arange(0, self.__period, 1 / self.__sample_rate)
-        sinwave1 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta1)
-        sinwave2 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta2)
-        sinwave3 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta3)
-        sinwave4 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta4)
-        sinwave5 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta5)
-        sinwave6 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta6)
-        sinwave7 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta7)
-        sinwave8 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta8)
-        sinwave9 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta9)
-        sinwave10 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta10)
-        sinwave11 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta11)
-        sinwave12 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta12)
-        sinwave13 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta13)
-        sinwave14 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta14)
-        sinwave15 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta15)
-        sinwave16 = self.__amplitude * np.sin(2 * np.pi * self.__frequency * linspace + theta16)
-
-        sinwave = []
-
-        for i in range(0, len(signalBits) - 1, 4):
-            if signalBits[i] == 0 and signalBits[i + 1] == 0 and signalBits[i + 2] == 0 and signalBits[
-                i + 3] == 0:  # theta1 case
-                sinwave.extend(sinwave1)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 0 and signalBits[i + 2] == 0 and signalBits[
-                i + 3] == 1:  # theta2 case
-                sinwave.extend(sinwave2)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 0 and signalBits[i + 2] == 1 and signalBits[
-                i + 3] == 0:  # theta3 case
-                sinwave.extend(sinwave3)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 0 and signalBits[i + 2] == 1 and signalBits[
-                i + 3] == 1:  # theta4 case
-                sinwave.extend(sinwave4)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 1 and signalBits[i + 2] == 0 and signalBits[
-                i + 3] == 0:  # theta5 case
-                sinwave.extend(sinwave5)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 1 and signalBits[i + 2] == 0 and signalBits[
-                i + 3] == 1:  # theta6 case
-                sinwave.extend(sinwave6)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 1 and signalBits[i + 2] == 1 and signalBits[
-                i + 3] == 0:  # theta7 case
-                sinwave.extend(sinwave7)
-            elif signalBits[i] == 0 and signalBits[i + 1] == 1 and signalBits[i + 2] == 1 and signalBits[
-                i + 3] == 1:  # theta8 case
-                sinwave.extend(sinwave8)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 0 and signalBits[i + 2] == 0 and signalBits[
-                i + 3] == 0:  # theta9 case
-                sinwave.extend(sinwave9)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 0 and signalBits[i + 2] == 0 and signalBits[
-                i + 3] == 1:  # theta10 case
-                sinwave.extend(sinwave10)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 0 and signalBits[i + 2] == 1 and signalBits[
-                i + 3] == 0:  # theta11 case
-                sinwave.extend(sinwave11)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 0 and signalBits[i + 2] == 1 and signalBits[
-                i + 3] == 1:  # theta12 case
-                sinwave.extend(sinwave12)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 1 and signalBits[i + 2] == 0 and signalBits[
-                i + 3] == 0:  # theta13 case
-                sinwave.extend(sinwave13)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 1 and signalBits[i + 2] == 0 and signalBits[
-                i + 3] == 1:  # theta14 case
-                sinwave.extend(sinwave14)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 1 and signalBits[i + 2] == 1 and signalBits[
-                i + 3] == 0:  # theta15 case
-                sinwave.extend(sinwave15)
-            elif signalBits[i] == 1 and signalBits[i + 1] == 1 and signalBits[i + 2] == 1 and signalBits[
-                i + 3] == 1:  # theta16 case
-                sinwave.extend(sinwave16)
-        signal = WirelessSignal(timeline, sinwave)
-
-        # save information about rest of bits
-        if one_number_of_bits:
-            signal.was_one = True
-        if two_number_of_bits:
-            signal.was_two = True
-        if three_number_of_bits:
-            signal.was_three = True
-
-        demodulator = Demodulator()
-        return signal
+        return self.make_mpsk_mod(bits, 16)
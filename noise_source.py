@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class NoiseSource:
+    """
+    Source of unit Gaussian noise of a channel, built on np.random.Generator.
+    Every source is seeded, a source made without seed draws fresh entropy and keeps it,
+    so any run can be repeated with the same noise.
+
+    Optional noise bank is generated once and then copied instead of drawn, scaled by the channel,
+    so every noise level rewound to the start of the bank gets the same unit noise (NoiseSweep with common_noise).
+    Optional threaded fill draws noise in segments of segment_size samples, every segment with its own stream,
+    and gives blocks of whole segments to the threads. A segment left unfinished by one fill is continued
+    by the next one, so the noise does not depend on the number of threads, the block size
+    or splitting of the buffers into consecutive fills.
+    """
+
+    # number of samples of one stream of threaded fill
+    segment_size = 1 << 16
+
+    def __init__(self, seed=None, bank_size=None, bank_dtype=np.float64, threads=None, block_size=1 << 20):
+        """
+        Parameters
+        ----------
+        seed Seed (int or np.random.SeedSequence) of the noise, fresh entropy if None.
+        bank_size Number of samples of pre-generated noise bank, noise is drawn on every call if None.
+                  Bank shorter than the filled buffers repeats, so it should be at least as long as the signal.
+        bank_dtype Type of samples of the bank: np.float64 or np.float32.
+        threads Number of threads of block fill, single stream without blocks if None.
+                Noise of block fill differs from noise of single stream, but does not depend on number of threads.
+        block_size Number of samples of one block (task of a thread) of block fill, rounded up to whole segments.
+        """
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self.threads = threads
+        self.block_size = -(-block_size // self.segment_size) * self.segment_size
+        self.__random = np.random.default_rng(seed)
+        self.__bank = None
+        self.__position = 0
+        # stream of the segment started by the previous block fill and number of its samples left
+        self.__segment = None
+        self.__segment_left = 0
+        if bank_size is not None:
+            self.__bank = self.__random.standard_normal(bank_size, dtype=np.dtype(bank_dtype).type)
+            self.__bank.flags.writeable = False
+
+    @property
+    def chunk_size(self):
+        """ Number of samples worth filling at once: whole blocks, one for every thread.
+            Filling consecutive chunks of any size gives the same noise as filling them at once.
+        """
+        return self.block_size * (self.threads or 1)
+
+    @property
+    def entropy(self):
+        """ Entropy of the seed, passing it as seed repeats the noise of this source. """
+        return self.seed_sequence.entropy
+
+    def spawn(self):
+        """
+        Make independent source with seed spawned from seed of this one, e.g. for another kind of noise.
+
+        Returns
+        -------
+        NoiseSource New source without bank, with the same threads.
+        """
+        return NoiseSource(self.seed_sequence.spawn(1)[0], threads=self.threads, block_size=self.block_size)
+
+    def rewind(self):
+        """
+        Start copying noise from the beginning of the bank, so the next fill gets the same noise as the first one.
+        """
+        self.__position = 0
+
+    def fill(self, out):
+        """
+        Write unit noise to given array without temporary arrays of its size.
+        Parameters
+        ----------
+        out Array of np.float64 or np.float32 to be filled.
+
+        Returns
+        -------
+        np.ndarray out
+        """
+        if not out.flags.c_contiguous:
+            out[...] = self.standard_normal(out.shape, out.dtype)
+        elif self.__bank is not None:
+            self.__copy_bank(out.reshape(-1))
+        elif self.threads is None:
+            self.__random.standard_normal(out=out, dtype=out.dtype.type)
+        else:
+            self.__fill_blocks(out.reshape(-1))
+        return out
+
+    def standard_normal(self, shape, dtype=np.float64):
+        """
+        Draw new array of unit noise.
+        Parameters
+        ----------
+        shape Shape of the array.
+        dtype Type of samples: np.float64 or np.float32.
+
+        Returns
+        -------
+        np.ndarray Unit noise.
+        """
+        return self.fill(np.empty(shape, dtype=dtype))
+
+    def __copy_bank(self, out):
+        """
+        Copy consecutive samples of the bank to flat array, starting from the beginning when the bank ends.
+        Parameters
+        ----------
+        out Flat array to be filled.
+        """
+        bank_size = len(self.__bank)
+        start = 0
+        while start < len(out):
+            size = min(len(out) - start, bank_size - self.__position)
+            out[start:start + size] = self.__bank[self.__position:self.__position + size]
+            start += size
+            self.__position = (self.__position + size) % bank_size
+
+    def __fill_blocks(self, out):
+        """
+        Fill flat array segment by segment, every segment with its own stream spawned in order of segments,
+        blocks of block_size samples are filled by threads.
+        Parameters
+        ----------
+        out Flat array to be filled.
+        """
+        # the segment started by the previous fill is continued
+        head = min(self.__segment_left, len(out))
+        if head:
+            self.__segment.standard_normal(out=out[:head], dtype=out.dtype.type)
+            self.__segment_left -= head
+
+        number_of_segments = -(-(len(out) - head) // self.segment_size)
+        seeds = self.seed_sequence.spawn(number_of_segments)
+        segments_per_block = self.block_size // self.segment_size
+        starts = range(0, number_of_segments, segments_per_block)
+
+        def fill_block(first_segment):
+            for segment in range(first_segment, min(first_segment + segments_per_block, number_of_segments)):
+                start = head + segment * self.segment_size
+                part = out[start:start + self.segment_size]
+                random = np.random.default_rng(seeds[segment])
+                random.standard_normal(out=part, dtype=out.dtype.type)
+                if len(part) < self.segment_size:
+                    # the last segment is continued by the next fill
+                    self.__segment, self.__segment_left = random, self.segment_size - len(part)
+
+        if self.threads > 1 and len(starts) > 1:
+            with ThreadPoolExecutor(self.threads) as executor:
+                list(executor.map(fill_block, starts))
+        else:
+            for first_segment in starts:
+                fill_block(first_segment)
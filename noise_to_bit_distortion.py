@@ -1,10 +1,15 @@
 import enum
+from concurrent.futures import ProcessPoolExecutor
 
+import pipeline
+import result_store
 import utils
 from bitStream.file_binary_io import FileIO
+from constellation import BPSK, PSK8, PSK16, QPSK, Constellation, get_constellation
 from demodulator import Demodulator
 from modulator import Modulator
 from radio_channel import Channel
+from waveform_cache import waveform_cache
 import numpy as np
 from matplotlib import pyplot as plt
 
@@ -19,27 +24,154 @@ class Psk(enum.Enum):
     Psk16 = 3
 
 
+# constellation of every type of psk
+PSK_CONSTELLATIONS = {Psk.Bpsk: BPSK, Psk.Qpsk: QPSK, Psk.Psk8: PSK8, Psk.Psk16: PSK16}
+
+
+def constellation_of(scheme) -> Constellation:
+    """
+    Get constellation of a tested scheme, so sweeps test any constellation (e.g. Constellation.qam(16)) as psk types.
+    Parameters
+    ----------
+    scheme Type of psk, constellation, or number of phases of psk.
+
+    Returns
+    -------
+    Constellation Constellation of the scheme.
+    """
+    if isinstance(scheme, Psk):
+        return PSK_CONSTELLATIONS[scheme]
+    return get_constellation(scheme)
+
+# input bits of a worker process of parallel sweep, sent once when the worker starts
+_worker_bits = None
+
+
+def _init_worker(bits):
+    """
+    Save input bits in the worker process.
+    Parameters
+    ----------
+    bits Bits to be transferred in every task.
+    """
+    global _worker_bits
+    _worker_bits = bits
+
+
+def _simulate(task):
+    """
+    Transfer input bits of the worker with one psk and one noise level.
+    Parameters
+    ----------
+    task Tuple (psk type or constellation, noise strength, seed of channel, baseband).
+
+    Returns
+    -------
+    int Number of distorted bits.
+    """
+    psk_type, noise, seed, baseband = task
+    demodulator = Demodulator(draw_diagram=False)
+    out_bits = pipeline.transmit(_worker_bits, constellation_of(psk_type), noise, channel=Channel(seed=seed),
+                                 demodulator=demodulator, baseband=baseband)
+    return utils.compute_distorted_bits(_worker_bits, out_bits)
+
+
+def sweep_parameters(baseband):
+    """
+    Describe default modulator and demodulator of the sweep, to identify stored results.
+    Baseband simulation gives the same bit error rate, but other random numbers, so it is stored separately.
+    Parameters
+    ----------
+    baseband Simulate one complex point per symbol instead of the whole sinwave.
+
+    Returns
+    -------
+    dict Parameters of modulator and demodulator.
+    """
+    return {'modulator': Modulator().get_parameters(), 'demodulator': Demodulator().get_parameters(),
+            'baseband': baseband}
+
+
+def parallel_sweep(bits, noises, psk_types, workers=None, seed=None, baseband=False, store=None):
+    """
+    Compute number of distorted bits for every noise level and psk type (or constellation) using a pool of processes.
+    Input bits are sent to every worker once, every task has its own seed derived from the given one
+    (result_store.point_seed), so results do not depend on the number of workers and equal results
+    of sequential NoiseToBitDistortion with the same seed.
+    Parameters
+    ----------
+    bits Bits to be transferred.
+    noises Noise strengths to be tested.
+    psk_types Types of psk or constellations to be tested.
+    workers Number of processes, number of processors if None.
+    seed Seed of the whole sweep, fresh entropy if None.
+    baseband Simulate one complex point per symbol instead of the whole sinwave.
+    store ResultStore keeping finished points, only missing points are simulated if given.
+
+    Returns
+    -------
+    dict Psk type (or constellation) mapped to list of numbers of distorted bits, one for every noise.
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    seed = result_store.effective_seed(seed)
+    tasks = [(psk_type, noise) for psk_type in psk_types for noise in noises]
+    # seeds of points must not depend on which points are missing or on the order of simulation
+    seeds = [result_store.point_seed(seed, constellation_of(psk_type), noise) for psk_type, noise in tasks]
+    if store is None:
+        descriptions = [None] * len(tasks)
+        results = [None] * len(tasks)
+    else:
+        data_hash = result_store.bits_hash(bits)
+        parameters = sweep_parameters(baseband)
+        descriptions = [store.describe(data_hash, constellation_of(psk_type), noise, parameters, seed)
+                        for psk_type, noise in tasks]
+        results = [store.get(description) for description in descriptions]
+    tasks = [task + (task_seed, baseband) for task, task_seed in zip(tasks, seeds)]
+    missing = [i for i, errors in enumerate(results) if errors is None]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(bits,)) as executor:
+        # results come in order, every finished point is stored at once, so an interrupted sweep can be resumed
+        for i, errors in zip(missing, executor.map(_simulate, [tasks[i] for i in missing])):
+            results[i] = errors
+            if store is not None:
+                store.put(descriptions[i], errors)
+
+    return {psk_type: results[i * len(noises):(i + 1) * len(noises)] for i, psk_type in enumerate(psk_types)}
+
+
 class NoiseToBitDistortion:
     """
-    Test relationship between noise and bit distortion in chosen psk.
+    Test relationship between noise and bit distortion in chosen psk or any other constellation.
     Draw results as a chart.
     """
 
-    def __init__(self, start_noise: float, end_noise: float, psk_type: Psk, step=0.01):
+    def __init__(self, start_noise: float, end_noise: float, psk_type, step=0.01, baseband=False, workers=None,
+                 seed=None, store=None):
         """
         Start benchmarking.
         Parameters
         ----------
         start_noise Starting noise.
         end_noise Ending noise (max to be reached).
-        psk_type Type of psk to be tested.
+        psk_type Type of psk or constellation to be tested, or list of them tested in parallel.
         step Noise increase unit.
+        baseband Simulate one complex point per symbol instead of the whole sinwave.
+        workers Number of processes of parallel sweep, tests run one by one if None and psk_type is single.
+        seed Seed of the sweep, every point gets its own seed derived from it (result_store.point_seed),
+             so sequential and parallel tests give the same results. Fresh seed if None, it is printed.
+        store ResultStore keeping finished points, only missing points are simulated if given.
         """
         self.start_noise = start_noise
         self.end_noise = end_noise
         self.psk_type = psk_type
         self.distorter = None
         self.step = step
+        self.baseband = baseband
+        self.workers = workers
+        # unseeded test gets fresh seed, so its points are stored apart from other runs
+        self.seed = result_store.effective_seed(seed)
+        self.store = store
+        self.results = {}
         if psk_type == Psk.Bpsk:
             self.distorter = self.bpsk
         elif psk_type == Psk.Qpsk:
@@ -48,17 +180,20 @@ class NoiseToBitDistortion:
             self.distorter = self.psk8
         elif psk_type == Psk.Psk16:
             self.distorter = self.psk16
+        if isinstance(psk_type, Constellation) or baseband and isinstance(psk_type, Psk):
+            self.distorter = self.transmit_distorter(constellation_of(psk_type), baseband)
         self.original_bits = FileIO("computerA\\cloud.png").read_from_file()
         self._start()
 
     @staticmethod
-    def bpsk(input_bits, noise):
+    def bpsk(input_bits, noise, seed=None):
         """
         Perform simple bpsk modulation-demodulation and return received bits.
         Parameters
         ----------
         input_bits Bits to be trensfered.
         noise Noise strength.
+        seed Seed of the channel, fresh noise if None.
 
         Returns
         -------
@@ -66,7 +201,7 @@ class NoiseToBitDistortion:
         """
         modulator = Modulator()
         demodulator = Demodulator()
-        channel = Channel()
+        channel = Channel(seed=seed)
         signal = modulator.make_bpsk_mod(input_bits)
 
         signal = channel.send_signal(signal, noise)
@@ -75,13 +210,14 @@ class NoiseToBitDistortion:
         return result_bits
 
     @staticmethod
-    def qpsk(input_bits, noise):
+    def qpsk(input_bits, noise, seed=None):
         """
         Perform simple qpsk modulation-demodulation and return received bits.
         Parameters
         ----------
         input_bits Bits to be trensfered.
         noise Noise strength.
+        seed Seed of the channel, fresh noise if None.
 
         Returns
         -------
@@ -89,7 +225,7 @@ class NoiseToBitDistortion:
         """
         modulator = Modulator()
         demodulator = Demodulator()
-        channel = Channel()
+        channel = Channel(seed=seed)
         signal = modulator.make_qpsk_mod(input_bits)
 
         signal = channel.send_signal(signal, noise)
@@ -98,13 +234,14 @@ class NoiseToBitDistortion:
         return result_bits
 
     @staticmethod
-    def psk8(input_bits, noise):
+    def psk8(input_bits, noise, seed=None):
         """
         Perform simple 8-psk modulation-demodulation and return received bits.
         Parameters
         ----------
         input_bits Bits to be trensfered.
         noise Noise strength.
+        seed Seed of the channel, fresh noise if None.
 
         Returns
         -------
@@ -112,7 +249,7 @@ class NoiseToBitDistortion:
         """
         modulator = Modulator()
         demodulator = Demodulator()
-        channel = Channel()
+        channel = Channel(seed=seed)
         signal = modulator.make_8psk_mod(input_bits)
 
         signal = channel.send_signal(signal, noise)
@@ -121,13 +258,14 @@ class NoiseToBitDistortion:
         return result_bits
 
     @staticmethod
-    def psk16(input_bits, noise):
+    def psk16(input_bits, noise, seed=None):
         """
         Perform simple 16-psk modulation-demodulation and return received bits.
         Parameters
         ----------
         input_bits Bits to be trensfered.
         noise Noise strength.
+        seed Seed of the channel, fresh noise if None.
 
         Returns
         -------
@@ -135,7 +273,7 @@ class NoiseToBitDistortion:
         """
         modulator = Modulator()
         demodulator = Demodulator()
-        channel = Channel()
+        channel = Channel(seed=seed)
         signal = modulator.make_16psk_mod(input_bits)
 
         signal = channel.send_signal(signal, noise)
@@ -143,20 +281,89 @@ class NoiseToBitDistortion:
         result_bits = demodulator.make_16psk_demod(signal, channel)
         return result_bits
 
+    @staticmethod
+    def baseband_distorter(m):
+        """
+        Make function performing m-psk modulation-demodulation of complex envelope.
+        Parameters
+        ----------
+        m Number of phases, or constellation.
+
+        Returns
+        -------
+        function Function taking input bits, noise strength and seed of the channel and returning received bits.
+        """
+        return NoiseToBitDistortion.transmit_distorter(m, True)
+
+    @staticmethod
+    def transmit_distorter(m, baseband=False):
+        """
+        Make function performing modulation-demodulation of any constellation with pipeline.transmit.
+        Parameters
+        ----------
+        m Number of phases, or constellation.
+        baseband Simulate one complex point per symbol instead of the whole sinwave.
+
+        Returns
+        -------
+        function Function taking input bits, noise strength and seed of the channel and returning received bits.
+        """
+        demodulator = Demodulator()
+
+        def distorter(input_bits, noise, seed=None):
+            return pipeline.transmit(input_bits, m, noise, channel=Channel(seed=seed), demodulator=demodulator,
+                                     baseband=baseband)
+        return distorter
+
+    def _distort(self, noise):
+        """
+        Transfer original bits with the distorter, channel seed of the point is derived from seed of the test.
+        Parameters
+        ----------
+        noise Noise strength.
+
+        Returns
+        -------
+        int Number of distorted bits.
+        """
+        seed = result_store.point_seed(self.seed, constellation_of(self.psk_type), noise)
+        out_bits = self.distorter(self.original_bits, noise, seed)
+        return utils.compute_distorted_bits(self.original_bits, out_bits)
+
     def _start(self):
         """
         Internal function that performs the tests and draws resulting chart.
         """
-        distorted_bit_axis = []
-        noise_axis = []
+        noise_axis = [i/100 for i in range(int(self.start_noise*100), int(self.end_noise*100), int(self.step*100))]
+        print("Seed:", self.seed)
+
+        single = isinstance(self.psk_type, (Psk, Constellation))
+        if self.workers is None and single:
+            distorted_bit_axis = []
+            data_hash = parameters = None
+            if self.store is not None:
+                data_hash = result_store.bits_hash(self.original_bits)
+                parameters = sweep_parameters(self.baseband)
+            for noise in noise_axis:
+                print("Testing noise=", noise, "/", self.end_noise)
+                if self.store is None:
+                    num_distorted_bits = self._distort(noise)
+                else:
+                    num_distorted_bits = self.store.point(data_hash, constellation_of(self.psk_type), noise,
+                                                          lambda: self._distort(noise), parameters, self.seed)
+                distorted_bit_axis.append(num_distorted_bits)
+            print("Waveform cache hits:", waveform_cache.hits, "misses:", waveform_cache.misses)
+            self.results = {self.psk_type: distorted_bit_axis}
+        else:
+            psk_types = [self.psk_type] if single else list(self.psk_type)
+            print("Testing", len(noise_axis), "noise levels of", len(psk_types), "psk types in parallel")
+            self.results = parallel_sweep(self.original_bits, noise_axis, psk_types, self.workers, self.seed,
+                                          self.baseband, self.store)
 
-        for i in range(int(self.start_noise*100), int(self.end_noise*100), int(self.step*100)):
-            print("Testing noise=", i/100, "/", self.end_noise)
-            out_bits = self.distorter(self.original_bits, i/100)
-            num_distorted_bits = utils.compute_distorted_bits(self.original_bits, out_bits)
-            distorted_bit_axis.append(num_distorted_bits)
-            noise_axis.append(i/100)
-        plt.plot(noise_axis, distorted_bit_axis)
+        for psk_type, distorted_bit_axis in self.results.items():
+            plt.plot(noise_axis, distorted_bit_axis, label=psk_type.name)
+        if len(self.results) > 1:
+            plt.legend()
         plt.title("Zależność ilości przekłamanych bitów od szumu")
         plt.xlabel("Szum")
         plt.ylabel("Przekłamane bity")
@@ -0,0 +1,174 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from constellation import get_constellation
+from decimator import Decimator
+from demodulator import Demodulator
+from pulse_shaping import MatchedFilter, PulseShaper
+from radio_channel import Channel
+from wireless_signal import WirelessSignal
+
+# shared buffers and demodulator of a worker process, attached once when the worker starts
+_worker = {}
+
+
+class _ShardChannel(Channel):
+    """
+    Channel of a shard, its noise of complex numbers is the part of the noise drawn for the whole signal
+    by the channel of the caller, so correlation detection adds the same noise as sequential demodulation.
+    """
+
+    def __init__(self, noise_strength, complex_noise):
+        """
+        Parameters
+        ----------
+        noise_strength Noise strength of the channel.
+        complex_noise Scaled noise of complex numbers of the symbols of the shard.
+        """
+        super().__init__(noise_strength)
+        self.__complex_noise = complex_noise
+
+    def add_noise_to_complex(self, complex_numbers, noise_strength=None):
+        return complex_numbers + self.__complex_noise
+
+
+def _init_worker(samples_name, samples_dtype, samples_length, bits_name, bits_length, noise_name, signal_attributes,
+                 parameters, noise_strength, m):
+    """
+    Attach shared buffers of samples, bits and noise of complex numbers and make demodulator in the worker process.
+    Parameters
+    ----------
+    samples_name Name of shared memory of received samples.
+    samples_dtype Type of samples.
+    samples_length Number of samples.
+    bits_name Name of shared memory of decided bits.
+    bits_length Number of bits.
+    noise_name Name of shared memory of noise of complex numbers of all symbols, None if detection adds no noise.
+    signal_attributes Dictionary of baseband, symbol_length, cycles_per_symbol and scale of the signal.
+    parameters Parameters of demodulator (Demodulator.get_parameters).
+    noise_strength Noise strength of the channel.
+    m Number of phases of psk, or constellation.
+    """
+    samples_memory = shared_memory.SharedMemory(name=samples_name)
+    bits_memory = shared_memory.SharedMemory(name=bits_name)
+    noise_memory = None if noise_name is None else shared_memory.SharedMemory(name=noise_name)
+    number_of_symbols = samples_length // (1 if signal_attributes['baseband'] else signal_attributes['symbol_length'])
+    _worker.update(
+        samples_memory=samples_memory, bits_memory=bits_memory, noise_memory=noise_memory,
+        samples=np.ndarray(samples_length, dtype=samples_dtype, buffer=samples_memory.buf),
+        bits=np.ndarray(bits_length, dtype=np.uint8, buffer=bits_memory.buf),
+        noise=None if noise_memory is None else np.ndarray(number_of_symbols, dtype=np.complex128,
+                                                           buffer=noise_memory.buf),
+        signal_attributes=signal_attributes, noise_strength=noise_strength, m=m,
+        demodulator=Demodulator(parameters['period'], parameters['amplitude'], parameters['sample_rate'],
+                                parameters['detection'], parameters['dtype'], draw_diagram=False,
+                                cycles_per_symbol=parameters['cycles_per_symbol'],
+                                decimator=parameters['decimator'] and Decimator(**parameters['decimator']),
+                                matched_filter=parameters['matched_filter'] and MatchedFilter(
+                                    PulseShaper(**parameters['matched_filter']))))
+
+
+def _demodulate_shard(task):
+    """
+    Demodulate a range of symbols of the shared samples and write their bits to the shared bits.
+    Parameters
+    ----------
+    task Tuple (first symbol, end symbol).
+
+    Returns
+    -------
+    int Number of written bits.
+    """
+    start, end = task
+    attributes = _worker['signal_attributes']
+    samples_per_symbol = 1 if attributes['baseband'] else attributes['symbol_length']
+    bits_per_symbol = get_constellation(_worker['m']).bits_per_symbol
+
+    signal = WirelessSignal(None, _worker['samples'][start * samples_per_symbol:end * samples_per_symbol])
+    signal.__dict__.update(attributes)
+    if _worker['noise'] is None:
+        channel = Channel(_worker['noise_strength'])
+    else:
+        channel = _ShardChannel(_worker['noise_strength'], _worker['noise'][start:end])
+    bits = _worker['demodulator'].make_mpsk_demod(signal, channel, _worker['m'])
+    _worker['bits'][start * bits_per_symbol:end * bits_per_symbol] = bits
+    return len(bits)
+
+
+def _adds_complex_noise(parameters, m):
+    """
+    Check if demodulation adds channel noise to complex points of symbols (correlation detection).
+    Parameters
+    ----------
+    parameters Parameters of demodulator (Demodulator.get_parameters).
+    m Number of phases of psk, or constellation.
+
+    Returns
+    -------
+    bool True if noise of complex numbers is drawn.
+    """
+    return (parameters['detection'] == Demodulator.CORRELATION and parameters['matched_filter'] is None
+            and get_constellation(m).constant_envelope)
+
+
+def parallel_mpsk_demod(demodulator, data_signal, channel, m, workers=None, shard_symbols=1 << 16):
+    """
+    Demodulate m-psk signal with a pool of processes.
+    Received samples are put into shared memory once, every worker demodulates ranges (shards) of symbols
+    and writes their bits straight into shared output, so neither samples nor bits are pickled.
+    Bits are the same as bits of Demodulator.make_mpsk_demod with the same channel, except decimated
+    or matched filtered sinwave, which is filtered shard by shard. Correlation detection adds noise
+    to complex points: it is drawn from the channel for all symbols at once, as make_mpsk_demod draws it,
+    and shared with the workers. Constellation diagram is not drawn.
+    Parameters
+    ----------
+    demodulator Demodulator giving parameters of demodulation.
+    data_signal Received signal.
+    channel Channel responsible for delivering data_signal.
+    m Number of phases, power of two, or constellation.
+    workers Number of processes, number of processors if None.
+    shard_symbols Number of symbols of one shard.
+
+    Returns
+    -------
+    np.ndarray Received bits.
+    """
+    samples = np.ascontiguousarray(data_signal.get_sinwave())
+    samples_per_symbol = 1 if data_signal.baseband else data_signal.symbol_length
+    number_of_symbols = len(samples) // samples_per_symbol
+    number_of_bits = number_of_symbols * get_constellation(m).bits_per_symbol
+    parameters = demodulator.get_parameters()
+
+    complex_noise = None
+    if _adds_complex_noise(parameters, m):
+        complex_noise = channel.add_noise_to_complex(np.zeros(number_of_symbols, dtype=np.complex128))
+
+    tasks = [(start, min(start + shard_symbols, number_of_symbols))
+             for start in range(0, number_of_symbols, shard_symbols)]
+    attributes = {'baseband': data_signal.baseband, 'symbol_length': data_signal.symbol_length,
+                  'cycles_per_symbol': data_signal.cycles_per_symbol, 'scale': data_signal.scale}
+
+    samples_memory = shared_memory.SharedMemory(create=True, size=max(1, samples.nbytes))
+    bits_memory = shared_memory.SharedMemory(create=True, size=max(1, number_of_bits))
+    noise_memory = None
+    if complex_noise is not None:
+        noise_memory = shared_memory.SharedMemory(create=True, size=max(16, complex_noise.nbytes))
+    try:
+        np.ndarray(len(samples), dtype=samples.dtype, buffer=samples_memory.buf)[:] = samples
+        if noise_memory is not None:
+            np.ndarray(number_of_symbols, dtype=np.complex128, buffer=noise_memory.buf)[:] = complex_noise
+        initargs = (samples_memory.name, samples.dtype, len(samples), bits_memory.name, number_of_bits,
+                    None if noise_memory is None else noise_memory.name, attributes, parameters,
+                    channel.get_noise_strength(), m)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+            list(executor.map(_demodulate_shard, tasks))
+        bits = np.ndarray(number_of_bits, dtype=np.uint8, buffer=bits_memory.buf).copy()
+    finally:
+        for memory in (samples_memory, bits_memory, noise_memory):
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+
+    return bits[:number_of_bits - data_signal.padding]
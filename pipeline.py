@@ -0,0 +1,216 @@
+import numpy as np
+
+from demodulator import Demodulator
+from modulator import Modulator
+from noise_source import NoiseSource
+from radio_channel import Channel
+
+
+def stream_transmission(bits, m, noise_strength, modulator=None, channel=None, demodulator=None, chunk_size=65536):
+    """
+    Send bits through modulator, channel and demodulator in chunks of samples.
+    Only a few chunks of samples are in memory at once, whatever the size of the data.
+    Parameters
+    ----------
+    bits Bits to be transferred.
+    m Number of phases of psk.
+    noise_strength Noise strength.
+    modulator Modulator to be used, default one if None.
+    channel Channel to be used, default one if None.
+    demodulator Demodulator to be used, default one if None.
+    chunk_size Maximal number of samples in one chunk.
+
+    Returns
+    -------
+    generator Consecutive parts of received bits.
+    """
+    modulator = modulator or Modulator()
+    channel = channel or Channel()
+    demodulator = demodulator or Demodulator()
+
+    chunks = modulator.stream_mpsk_mod(bits, m, chunk_size)
+    # chunks of modulator are new arrays, so noise is added to them in place
+    chunks = channel.stream_signal(chunks, noise_strength, copy=False,
+                                   symbol_length=modulator.make_waveform_table(m).shape[1],
+                                   cycles_per_symbol=modulator.get_parameters()['cycles_per_symbol'],
+                                   shaped=modulator.get_parameters()['shaper'] is not None)
+    return demodulator.stream_mpsk_demod(chunks, channel, m, len(bits))
+
+
+def transmit(bits, m, noise_strength, modulator=None, channel=None, demodulator=None, baseband=False,
+             dtype=np.float64):
+    """
+    Send whole bits through modulator, channel and demodulator.
+    Parameters
+    ----------
+    bits Bits to be transferred.
+    m Number of phases of psk.
+    noise_strength Noise strength.
+    modulator Modulator to be used, default one if None.
+    channel Channel to be used, default one if None.
+    demodulator Demodulator to be used, default one if None.
+    baseband Send one complex point per symbol instead of the sinwave.
+             Bit errors match sinwave sent to the same demodulator, with any detection.
+    dtype Type of samples of default modulator and demodulator: np.float64, np.float32 or np.int16.
+
+    Returns
+    -------
+    np.ndarray Received bits.
+    """
+    modulator = modulator or Modulator(dtype=dtype)
+    channel = channel or Channel()
+    demodulator = demodulator or Demodulator(dtype=dtype)
+
+    if baseband:
+        signal = modulator.make_mpsk_baseband(bits, m)
+    else:
+        signal = modulator.make_mpsk_mod(bits, m)
+    # modulated signal is not used anywhere else, so noise is added to it in place
+    signal = channel.send_signal(signal, noise_strength, copy=False)
+    return demodulator.make_mpsk_demod(signal, channel, m)
+
+
+def transmit_links(payloads, orders, noise_strengths, modulator=None, channel=None, demodulator=None,
+                   baseband=False, dtype=np.float64):
+    """
+    Send many independent links at once, every link with its own payload, psk and noise strength.
+    Links of the same psk are modulated, sent and demodulated together as one array with a row for every link,
+    so the cost of a call is paid once per psk, not once per link.
+    Noise is drawn row after row, links of every psk in order of their rows, so the result equals links sent
+    one by one through the same channel grouped by psk.
+    Parameters
+    ----------
+    payloads Bits of every link, array of shape (links, bits).
+    orders Number of phases of psk of every link, or a single one for all links.
+    noise_strengths Noise strength of every link, or a single one for all links.
+    modulator Modulator to be used, default one if None.
+    channel Channel to be used, default one if None.
+    demodulator Demodulator to be used, default one if None.
+    baseband Send one complex point per symbol instead of the sinwave.
+    dtype Type of samples of default modulator and demodulator: np.float64, np.float32 or np.int16.
+
+    Returns
+    -------
+    np.ndarray Received bits, one row for every link.
+    """
+    payloads = np.asarray(payloads, dtype=np.uint8)
+    if payloads.ndim != 2:
+        raise ValueError("Payloads should be an array of shape (links, bits), got shape {0}".format(payloads.shape))
+    number_of_links = payloads.shape[0]
+    orders = np.broadcast_to(orders, (number_of_links,))
+    noise_strengths = np.broadcast_to(np.asarray(noise_strengths, dtype=np.float64), (number_of_links,))
+
+    modulator = modulator or Modulator(dtype=dtype)
+    channel = channel or Channel()
+    demodulator = demodulator or Demodulator(dtype=dtype)
+
+    received = np.empty_like(payloads)
+    for m in np.unique(orders):
+        links = np.flatnonzero(orders == m)
+        if baseband:
+            signal = modulator.make_mpsk_baseband(payloads[links], int(m))
+        else:
+            signal = modulator.make_mpsk_mod(payloads[links], int(m))
+        # modulated signal is not used anywhere else, so noise is added to it in place
+        signal = channel.send_signal(signal, noise_strengths[links], copy=False)
+        received[links] = demodulator.make_mpsk_demod(signal, channel, int(m))
+    return received
+
+
+class NoiseSweep:
+    """
+    Bits modulated once and sent many times with different noise.
+    Clean signal is read-only and every transmission writes its noisy copy to the same scratch buffer,
+    so modulation and allocation are paid once, not once per noise level.
+    With common noise unit noise is drawn once too: it is kept in a noise bank and every level copies it.
+    """
+
+    def __init__(self, bits, m, modulator=None, demodulator=None, baseband=False, dtype=np.float64,
+                 common_noise=False, seed=None, threads=None, bank_dtype=np.float64):
+        """
+        Modulate bits.
+        Parameters
+        ----------
+        bits Bits to be transferred.
+        m Number of phases of psk.
+        modulator Modulator to be used, default one if None.
+        demodulator Demodulator to be used, default one if None.
+        baseband Send one complex point per symbol instead of the sinwave.
+        dtype Type of samples of default modulator and demodulator: np.float64, np.float32 or np.int16.
+        common_noise Give every noise level the same unit noise (common random numbers), so levels differ
+                     only by noise strength: noise of the signal is drawn once into a bank as long as the signal
+                     and the channel of the sweep is rewound before every level.
+        seed Seed of channels made by the sweep, fresh entropy if None.
+        threads Number of threads drawing noise of channels made by the sweep (NoiseSource), one stream if None.
+        bank_dtype Type of samples of the noise bank: np.float64 or np.float32, which halves its memory.
+        """
+        self.m = m
+        self.modulator = modulator or Modulator(dtype=dtype)
+        self.demodulator = demodulator or Demodulator(dtype=dtype)
+
+        if baseband:
+            self.clean_signal = self.modulator.make_mpsk_baseband(bits, m)
+        else:
+            self.clean_signal = self.modulator.make_mpsk_mod(bits, m)
+        self.clean_signal.get_sinwave().flags.writeable = False
+        self.__scratch = np.empty_like(self.clean_signal.get_sinwave())
+
+        self.__seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.__threads = threads
+        self.__channel = None
+        if common_noise:
+            # real and imaginary parts of baseband points get noise in pairs
+            bank_size = self.__scratch.size * (2 if np.iscomplexobj(self.__scratch) else 1)
+            self.__channel = Channel(noise_source=NoiseSource(self.__seed, bank_size, bank_dtype, threads))
+
+    def __level_channel(self, channel):
+        """
+        Get channel of a noise level.
+        Parameters
+        ----------
+        channel Channel given by the caller, used as it is.
+
+        Returns
+        -------
+        Channel Given channel, rewound channel of common noise, or new channel with seed spawned from the sweep.
+        """
+        if channel is not None:
+            return channel
+        if self.__channel is not None:
+            self.__channel.rewind()
+            return self.__channel
+        return Channel(noise_source=NoiseSource(self.__seed.spawn(1)[0], threads=self.__threads))
+
+    def transmit(self, noise_strength, channel=None):
+        """
+        Send clean signal through channel and demodulator.
+        Parameters
+        ----------
+        noise_strength Noise strength.
+        channel Channel to be used, channel of the sweep if None.
+
+        Returns
+        -------
+        np.ndarray Received bits.
+        """
+        channel = self.__level_channel(channel)
+        signal = channel.add_noise(self.clean_signal, noise_strength, out=self.__scratch)
+        return self.demodulator.make_mpsk_demod(signal, channel, self.m)
+
+    def transmit_batch(self, noise_strengths, channel=None):
+        """
+        Send clean signal through channel with every noise strength at once and demodulate the whole batch.
+        Batch holds one noisy signal per noise strength, so it suits small (e.g. baseband) signals.
+        Parameters
+        ----------
+        noise_strengths Noise strengths, one for every row of the result.
+        channel Channel to be used, channel of the sweep if None. Bank of common noise is as long as one signal,
+                so every row gets the same unit noise.
+
+        Returns
+        -------
+        np.ndarray Received bits, one row for every noise strength.
+        """
+        channel = self.__level_channel(channel)
+        batch = channel.send_batch(self.clean_signal, noise_strengths)
+        return self.demodulator.make_mpsk_demod(batch, channel, self.m)
@@ -0,0 +1,432 @@
+import hashlib
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from waveform_cache import waveform_cache
+
+
+def raised_cosine_taps(rolloff, span, samples_per_symbol, root=False) -> np.ndarray:
+    """
+    Impulse response of raised cosine (or root raised cosine) filter, peak in the middle.
+    Parameters
+    ----------
+    rolloff Excess bandwidth, between 0 and 1.
+    span Length of the filter in symbols.
+    samples_per_symbol Number of samples of one symbol.
+    root Root raised cosine, pair of two of them (transmitter and matched filter) is a raised cosine.
+
+    Returns
+    -------
+    np.ndarray span * samples_per_symbol + 1 taps, not normalized.
+    """
+    half = span * samples_per_symbol // 2
+    t = np.arange(-half, half + 1) / samples_per_symbol
+    taps = np.empty(len(t))
+    if root:
+        # points where the general formula is 0 / 0 get their limits
+        singular = np.isclose(np.abs(4 * rolloff * t), 1)
+        middle = np.isclose(t, 0)
+        regular = ~(singular | middle)
+        tr = t[regular]
+        taps[regular] = ((np.sin(np.pi * tr * (1 - rolloff)) + 4 * rolloff * tr * np.cos(np.pi * tr * (1 + rolloff)))
+                         / (np.pi * tr * (1 - (4 * rolloff * tr) ** 2)))
+        taps[middle] = 1 - rolloff + 4 * rolloff / np.pi
+        taps[singular] = rolloff / np.sqrt(2) * ((1 + 2 / np.pi) * np.sin(np.pi / (4 * rolloff))
+                                                  + (1 - 2 / np.pi) * np.cos(np.pi / (4 * rolloff)))
+    else:
+        singular = np.isclose(np.abs(2 * rolloff * t), 1)
+        tr = t[~singular]
+        taps[~singular] = np.sinc(tr) * np.cos(np.pi * rolloff * tr) / (1 - (2 * rolloff * tr) ** 2)
+        taps[singular] = np.pi / 4 * np.sinc(1 / (2 * rolloff))
+    return taps
+
+
+def carrier(samples_per_period, length, start=0, down=False, dtype=np.float64):
+    """
+    Complex carrier exp(2j pi n / samples_per_period) of samples start ... start + length - 1.
+    Sinwave A * sin(phase) is the imaginary part of complex envelope A * exp(1j * phase) times carrier,
+    2j times conjugated carrier mixes sinwave down to the envelope.
+    Parameters
+    ----------
+    samples_per_period Number of samples of one period of carrier.
+    length Number of samples.
+    start Index of the first sample, counted from the beginning of the signal.
+    down Give 2j times conjugated carrier, for mixing down.
+    dtype Real type of the samples, the carrier is its complex type.
+
+    Returns
+    -------
+    np.ndarray Complex carrier.
+    """
+    complex_dtype = np.result_type(dtype, np.complex64)
+
+    def generate():
+        phases = np.exp(2j * np.pi * np.arange(samples_per_period) / samples_per_period)
+        return (2j * np.conj(phases) if down else phases).astype(complex_dtype)
+
+    table = waveform_cache.get(('carrier', samples_per_period, down, complex_dtype.str), generate)
+    return table[(start + np.arange(length)) % samples_per_period]
+
+
+class OverlapSaveFilter:
+    """
+    FIR filter of long signals computed with FFT overlap-save block convolution.
+    Signal is cut into overlapping blocks of block_size samples, every block is multiplied by the spectrum
+    of the taps and the first len(taps) - 1 wrapped samples of its inverse transform are dropped.
+    Spectrum of the taps is computed once for every (taps, block size) and kept in the waveform cache.
+    Output equals causal direct convolution (np.convolve(samples, taps)[:len(samples)]), also when the signal
+    comes in chunks.
+    """
+
+    def __init__(self, taps, block_size=None, blocks_per_batch=None):
+        """
+        Parameters
+        ----------
+        taps Real taps of the filter.
+        block_size Number of samples of one FFT block, power of two at least 4 times the number of taps if None.
+        blocks_per_batch Number of blocks transformed at once, about 2**20 samples of blocks if None.
+        """
+        self.taps = np.array(taps, dtype=np.float64)
+        self.taps.flags.writeable = False
+        self.overlap = len(self.taps) - 1
+        if block_size is None:
+            block_size = max(64, 1 << int(np.ceil(np.log2(4 * len(self.taps)))))
+        if block_size <= self.overlap:
+            raise ValueError("Block size {0} should be larger than number of taps {1}".format(
+                block_size, len(self.taps)))
+        self.block_size = block_size
+        self.step = block_size - self.overlap
+        self.blocks_per_batch = blocks_per_batch or max(1, (1 << 20) // block_size)
+        self.__taps_hash = hashlib.sha1(self.taps.tobytes()).hexdigest()
+
+    @property
+    def delay(self):
+        """ Delay of symmetric taps in samples. """
+        return self.overlap // 2
+
+    def spectrum(self, dtype=np.float64):
+        """
+        Get spectrum of the taps for blocks of this filter.
+        Parameters
+        ----------
+        dtype Type of filtered samples: np.float64 or np.float32.
+
+        Returns
+        -------
+        np.ndarray Read-only rfft of the taps padded to block_size.
+        """
+        def generate():
+            complex_dtype = np.result_type(dtype, np.complex64)
+            return np.fft.rfft(self.taps, self.block_size).astype(complex_dtype)
+
+        key = ('overlap_save', self.__taps_hash, len(self.taps), self.block_size, np.dtype(dtype).str)
+        return waveform_cache.get(key, generate)
+
+    def apply(self, samples):
+        """
+        Filter whole samples along the last axis, rows of a batch are filtered separately.
+        Long samples are filtered part by part, so only the result has the size of the samples.
+        Parameters
+        ----------
+        samples Real or complex samples.
+
+        Returns
+        -------
+        np.ndarray Filtered samples of the same length.
+        """
+        samples = np.asarray(samples)
+        return np.concatenate(list(self.stream(split_last_axis(samples, self.blocks_per_batch * self.step))), axis=-1)
+
+    def stream(self, chunks):
+        """
+        Filter samples given in chunks of any size, the last len(taps) - 1 samples are kept for the next chunk.
+        Parameters
+        ----------
+        chunks Iterable of consecutive parts of samples.
+
+        Returns
+        -------
+        generator Filtered chunks, of the same lengths as the given ones.
+        """
+        history = None
+        for chunk in chunks:
+            chunk = np.asarray(chunk)
+            if history is None:
+                history = np.zeros(chunk.shape[:-1] + (self.overlap,), dtype=chunk.dtype)
+            extended = np.concatenate((history, chunk), axis=-1)
+            history = extended[..., extended.shape[-1] - self.overlap:].copy()
+            yield self.__convolve(extended)
+
+    def __convolve(self, extended):
+        """
+        Filter samples preceded by len(taps) - 1 samples of history.
+        Parameters
+        ----------
+        extended History followed by samples.
+
+        Returns
+        -------
+        np.ndarray Filtered samples, without history.
+        """
+        if np.iscomplexobj(extended):
+            # real and imaginary parts are filtered as a batch of two real signals
+            parts = self.__convolve(np.stack((extended.real, extended.imag)))
+            return parts[0] + 1j * parts[1]
+
+        dtype = np.result_type(extended.dtype, np.float32)
+        leading = extended.shape[:-1]
+        number_of_samples = extended.shape[-1] - self.overlap
+        number_of_blocks = -(-number_of_samples // self.step)
+        if not number_of_blocks:
+            return np.zeros(leading + (0,), dtype=dtype)
+
+        padded = np.zeros(leading + (number_of_blocks * self.step + self.overlap,), dtype=dtype)
+        padded[..., :extended.shape[-1]] = extended
+        blocks = sliding_window_view(padded, self.block_size, axis=-1)[..., ::self.step, :]
+        spectrum = self.spectrum(dtype)
+
+        out = np.empty(leading + (number_of_blocks * self.step,), dtype=dtype)
+        for start in range(0, number_of_blocks, self.blocks_per_batch):
+            part = blocks[..., start:start + self.blocks_per_batch, :]
+            filtered = np.fft.irfft(np.fft.rfft(part, axis=-1) * spectrum, self.block_size, axis=-1)
+            # first samples of every block are wrapped around by circular convolution
+            out[..., start * self.step:start * self.step + part.shape[-2] * self.step] = \
+                filtered[..., self.overlap:].reshape(leading + (-1,))
+        return out[..., :number_of_samples]
+
+
+class PulseShaper:
+    """
+    Transmitter stage giving symbols raised cosine (root raised cosine by default) envelope
+    instead of rectangular one, so the spectrum of the signal is limited to (1 + rolloff) / 2 of symbol rate
+    around the carrier. Symbol points are put in the middle of their symbols and filtered by the
+    overlap-save engine, delay of the filter is removed.
+    Taps are scaled so the energy of a symbol is the same as with rectangular envelope.
+    Pulses are cut at the ends of the signal, so the first and the last few symbols lose part of their tails.
+    """
+
+    def __init__(self, rolloff=0.35, span=16, root=True, block_size=None):
+        """
+        Parameters
+        ----------
+        rolloff Excess bandwidth, between 0 and 1.
+        span Length of the filter in symbols.
+        root Root raised cosine, matched filter of the receiver completes it to raised cosine without
+             inter-symbol interference. Plain raised cosine is free of interference without matched filter.
+        block_size Number of samples of one FFT block, chosen by OverlapSaveFilter if None.
+        """
+        self.rolloff = rolloff
+        self.span = span
+        self.root = root
+        self.block_size = block_size
+
+    def get_parameters(self):
+        """
+        Return parameters which change shaped signal.
+
+        Returns
+        -------
+        dict Rolloff, span, root and block_size.
+        """
+        return {'rolloff': self.rolloff, 'span': self.span, 'root': self.root, 'block_size': self.block_size}
+
+    def taps(self, samples_per_symbol):
+        """
+        Taps of the shaping filter.
+        Parameters
+        ----------
+        samples_per_symbol Number of samples of one symbol.
+
+        Returns
+        -------
+        np.ndarray Read-only taps, energy of them equals samples_per_symbol.
+        """
+        def generate():
+            taps = raised_cosine_taps(self.rolloff, self.span, samples_per_symbol, self.root)
+            return taps * np.sqrt(samples_per_symbol / np.sum(taps ** 2))
+
+        key = ('pulse', self.rolloff, self.span, self.root, samples_per_symbol)
+        return waveform_cache.get(key, generate)
+
+    def make_filter(self, samples_per_symbol):
+        """
+        Make overlap-save engine with taps of the shaping filter, spectrum of them is shared through the cache.
+        Parameters
+        ----------
+        samples_per_symbol Number of samples of one symbol.
+
+        Returns
+        -------
+        OverlapSaveFilter Filter of shaper.
+        """
+        return OverlapSaveFilter(self.taps(samples_per_symbol), self.block_size)
+
+    def shape(self, points, samples_per_symbol):
+        """
+        Make complex envelope of symbols.
+        Parameters
+        ----------
+        points Complex points of symbols, or batch of them with points of one signal in every row.
+        samples_per_symbol Number of samples of one symbol.
+
+        Returns
+        -------
+        np.ndarray Complex envelope, samples_per_symbol samples for every point.
+        """
+        points = np.asarray(points)
+        chunks = split_last_axis(points, max(1, (1 << 20) // samples_per_symbol))
+        return np.concatenate(list(self.stream_shape(chunks, samples_per_symbol)), axis=-1)
+
+    def stream_shape(self, chunks, samples_per_symbol):
+        """
+        Make complex envelope of symbols given in chunks, put together it equals envelope of shape.
+        Parameters
+        ----------
+        chunks Iterable of consecutive parts of complex points of symbols (along the last axis of a batch).
+        samples_per_symbol Number of samples of one symbol.
+
+        Returns
+        -------
+        generator Consecutive parts of complex envelope.
+        """
+        engine = self.make_filter(samples_per_symbol)
+        last = []
+
+        def impulses():
+            for points in chunks:
+                points = np.asarray(points)
+                part = np.zeros(points.shape[:-1] + (points.shape[-1] * samples_per_symbol,),
+                                dtype=np.result_type(points, np.complex64))
+                part[..., samples_per_symbol // 2::samples_per_symbol] = points
+                last[:] = [part]
+                yield part
+            # delay of the filter is flushed with zeros and dropped from the front
+            if last:
+                yield np.zeros(last[0].shape[:-1] + (engine.delay,), dtype=last[0].dtype)
+
+        skipped = 0
+        for part in engine.stream(impulses()):
+            if skipped < engine.delay:
+                dropped = min(engine.delay - skipped, part.shape[-1])
+                skipped += dropped
+                part = part[..., dropped:]
+            if part.shape[-1]:
+                yield part
+
+
+class MatchedFilter:
+    """
+    Receiver front-end of shaped signals: sinwave is mixed down to complex envelope with the carrier,
+    filtered by the filter matched to the pulse of the transmitter on the overlap-save engine
+    and sampled in the middle of every symbol. Noise-free point of a symbol of root raised cosine
+    has amplitude of the sinwave, matched filter removes the mixing product at twice the carrier frequency.
+    """
+
+    def __init__(self, shaper):
+        """
+        Parameters
+        ----------
+        shaper PulseShaper of the transmitter.
+        """
+        self.shaper = shaper
+
+    def get_parameters(self):
+        """
+        Return parameters which change received points.
+
+        Returns
+        -------
+        dict Parameters of the shaper.
+        """
+        return self.shaper.get_parameters()
+
+    def make_filter(self, samples_per_symbol):
+        """
+        Make overlap-save engine with matched taps: taps of the shaper scaled so a symbol of root raised cosine
+        gives its own point.
+        Parameters
+        ----------
+        samples_per_symbol Number of samples of one symbol.
+
+        Returns
+        -------
+        OverlapSaveFilter Matched filter.
+        """
+        taps = self.shaper.taps(samples_per_symbol)
+        return OverlapSaveFilter(taps[::-1] / np.sum(taps ** 2), self.shaper.block_size)
+
+    def points(self, samples, samples_per_symbol, samples_per_period):
+        """
+        Find complex point of every whole symbol of sinwave.
+        Parameters
+        ----------
+        samples Sinwave, or batch of sinwaves with one of them in every row.
+        samples_per_symbol Number of samples of one symbol.
+        samples_per_period Number of samples of one period of carrier.
+
+        Returns
+        -------
+        np.ndarray Complex points, multiplied by amplitude of sinwave.
+        """
+        samples = np.asarray(samples)
+        chunks = split_last_axis(samples, max(1, (1 << 20) // samples_per_symbol) * samples_per_symbol)
+        return np.concatenate(list(self.stream_points(chunks, samples_per_symbol, samples_per_period)), axis=-1)
+
+    def stream_points(self, chunks, samples_per_symbol, samples_per_period):
+        """
+        Find complex points of sinwave given in chunks of any size, put together they equal points of whole sinwave.
+        Point of a symbol is sampled delay of the filter after the middle of the symbol.
+        Parameters
+        ----------
+        chunks Iterable of consecutive parts of sinwave (along the last axis of a batch).
+        samples_per_symbol Number of samples of one symbol.
+        samples_per_period Number of samples of one period of carrier.
+
+        Returns
+        -------
+        generator Consecutive parts of complex points.
+        """
+        engine = self.make_filter(samples_per_symbol)
+        received = 0
+
+        def envelopes():
+            nonlocal received
+            envelope = None
+            for chunk in chunks:
+                chunk = np.asarray(chunk)
+                envelope = chunk * carrier(samples_per_period, chunk.shape[-1], received, down=True,
+                                           dtype=chunk.dtype)
+                received += chunk.shape[-1]
+                yield envelope
+            # delay of the filter is flushed with zeros, so the last symbols reach their sampling instants
+            if envelope is not None:
+                yield np.zeros(envelope.shape[:-1] + (engine.delay,), dtype=envelope.dtype)
+
+        first = samples_per_symbol // 2 + engine.delay
+        position = 0
+        for part in engine.stream(envelopes()):
+            # symbols sampled in this part, only whole symbols of sinwave are sampled
+            end = position + part.shape[-1]
+            start_symbol = max(0, -(-(position - first) // samples_per_symbol))
+            end_symbol = min(received // samples_per_symbol, -(-(end - first) // samples_per_symbol))
+            if end_symbol > start_symbol:
+                yield part[..., first + start_symbol * samples_per_symbol - position:
+                           first + (end_symbol - 1) * samples_per_symbol - position + 1:samples_per_symbol]
+            position = end
+
+
+def split_last_axis(array, size):
+    """
+    Cut array into consecutive parts along the last axis.
+    Parameters
+    ----------
+    array Array to be cut.
+    size Number of samples of every part but the last one.
+
+    Returns
+    -------
+    list Parts (views) of the array, a single empty part for empty array.
+    """
+    length = array.shape[-1]
+    return [array[..., start:start + size] for start in range(0, length, size)] or [array]
@@ -1,17 +1,65 @@
 from wireless_signal import WirelessSignal
 import numpy as np
 
+import utils
+from impairments import ImpairmentChain
+from noise_source import NoiseSource
+
 
 class Channel:
-    def __init__(self, noise_strength=0.1):
+    def __init__(self, noise_strength=0.1, seed=None, noise_source=None, impairments=None):
         """ Initialize Channel object and set noise_strength attribute
 
             Parameters
            ----------
             noise_strength : float
                 Strength of noises in channel.
+            seed : int or np.random.SeedSequence
+                Seed of noises, fresh entropy if None (kept in seed_sequence, so the run can be repeated).
+                Noise of signal and noise of complex numbers are separate streams,
+                so they do not depend on the order of calls.
+            noise_source : NoiseSource
+                Source of noise of signal, e.g. with noise bank or threaded fill, made from seed if None.
+                Noise of complex numbers is spawned from it, so are impairments if seed is None.
+            impairments : list of Impairment or ImpairmentChain
+                Stages (phase and frequency offset, fading, amplitude scaling, impulsive noise...)
+                applied in order to the signal before the noise, chunk by chunk.
+                Every stage draws from its own generator spawned from the seed.
         """
         self.__noise_strength = noise_strength
+        if seed is None and noise_source is not None:
+            # the run is repeated with the seed of the given noise
+            seed = noise_source.seed_sequence
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        if noise_source is None:
+            signal_seed, complex_seed = seed.spawn(2)
+            self.noise_source = NoiseSource(signal_seed)
+            self.__complex_source = NoiseSource(complex_seed)
+        else:
+            self.noise_source = noise_source
+            self.__complex_source = noise_source.spawn()
+        # seed of complex noise, kept to restart it (rewind)
+        self.__complex_seed = self.__complex_source.seed_sequence
+        self.impairments = None
+        if impairments is not None:
+            if not isinstance(impairments, ImpairmentChain):
+                impairments = ImpairmentChain(impairments)
+            self.impairments = impairments
+            self.__impairment_randoms = impairments.generators(seed.spawn(1)[0])
+
+    def rewind(self):
+        """ Start noise from the beginning, so the next transmission gets the same unit noise as the first one:
+            noise bank of noise_source is copied from its start and noise of complex numbers
+            is restarted from its seed. Noise source without bank keeps drawing new noise of signal.
+        """
+        self.noise_source.rewind()
+        seed = self.__complex_seed
+        self.__complex_source = NoiseSource(np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key,
+                                                                   pool_size=seed.pool_size),
+                                            threads=self.__complex_source.threads,
+                                            block_size=self.__complex_source.block_size)
 
     def set_noise_strength(self, noise_strength):
         """ Set noise_strength attribute
@@ -23,7 +71,17 @@ class Channel:
         """
         self.__noise_strength = noise_strength
 
-    def send_signal(self, wireless_signal, noise_strength=None):
+    def get_noise_strength(self):
+        """ Get noise_strength attribute
+
+           Returns
+           -------
+            noise_strength : float
+                Strength of noises in channel.
+        """
+        return self.__noise_strength
+
+    def send_signal(self, wireless_signal, noise_strength=None, copy=True):
         """ Get some WirelessSignal and returns that signal with some noise.
 
             Parameters
@@ -31,8 +89,13 @@ class Channel:
             wireless_signal : WirelessSignal
                 WirelessSignal object to send over the channel
 
-            noise_strength : float
-                Strength of noises.
+            noise_strength : float or np.ndarray
+                Strength of noises, signal of many links (one sinwave in every row) may get one strength per link.
+
+            copy : bool
+                Keep the clean sinwave and give the signal a new noisy one. If False, noise is added
+                chunk by chunk straight to the sinwave of the signal, without any array of its size,
+                unless the sinwave is read-only (e.g. a clean signal kept by its owner), which is copied first.
 
            Returns
            -------
@@ -40,37 +103,308 @@ class Channel:
                Signal with noise.
         """
 
+        wireless_signal: WirelessSignal
+
+        # Add some noises
+        if copy:
+            wireless_signal.set_sinwave(self.add_noise(wireless_signal, noise_strength).get_sinwave())
+            return wireless_signal
+
+        if noise_strength is not None:
+            self.__noise_strength = noise_strength
+
+        sinwave = wireless_signal.get_sinwave()
+        if not isinstance(sinwave, np.ndarray) or not sinwave.flags.writeable or not sinwave.flags.c_contiguous:
+            # copy on write, read-only samples are never changed
+            sinwave = np.array(sinwave)
+        if np.broadcast_shapes(np.shape(self.__noise_strength), sinwave.shape[:-1]) != sinwave.shape[:-1]:
+            raise ValueError("Batch of noise strengths can not be added in place, use send_batch")
+
+        rows = sinwave.reshape(-1, sinwave.shape[-1])
+        for row, row_strength in zip(rows, self.__row_strengths(self.__noise_strength, sinwave, sinwave.shape[:-1])):
+            self.__impair(row, wireless_signal)
+            self.__add_noise_in_place(row, row_strength, wireless_signal)
+        wireless_signal.set_sinwave(sinwave)
+        return wireless_signal
+
+    def add_noise(self, wireless_signal, noise_strength=None, out=None):
+        """ Get some WirelessSignal and returns new signal with some noise, given signal is not changed,
+            so one clean (even read-only) signal can be sent many times with different noise.
+            Noise is the same as send_signal would add.
+
+            Parameters
+           ----------
+            wireless_signal : WirelessSignal
+                WirelessSignal object to send over the channel
+
+            noise_strength : float or np.ndarray
+                Strength of noises. Strengths are matched with leading axes of the sinwave, so a signal
+                of many links (one sinwave in every row) may get one strength per link,
+                and a single sinwave gets one row for every strength (see send_batch).
+
+            out : np.ndarray
+                Buffer of the shape and type of the sinwave to write noisy sinwave to, e.g. reused for every noise,
+                new array is allocated if None
+
+           Returns
+           -------
+            wireless_signal : WirelessSignal
+               Signal with noise, its sinwave is out if given.
+        """
+
         # Set noise strength
         if noise_strength is not None:
             self.__noise_strength = noise_strength
 
-        wireless_signal: WirelessSignal
+        sinwave = np.asarray(wireless_signal.get_sinwave())
+        strength = self.__noise_strength
+        shape = np.broadcast_shapes(np.shape(strength), sinwave.shape[:-1]) + sinwave.shape[-1:]
+        row_strengths = self.__row_strengths(strength, sinwave, shape[:-1])
+        if np.ndim(strength):
+            # every strength is applied to its own row, computed in precision of the samples
+            strength = np.reshape(row_strengths, shape[:-1] + (1,))
 
-        # Add some noises
-        sinwave = wireless_signal.get_sinwave()
-        length = len(sinwave)
+        if out is None:
+            out = np.empty(shape, dtype=sinwave.dtype)
+        elif out.shape != shape or out.dtype != sinwave.dtype:
+            raise ValueError("Buffer of shape {0} and type {1} does not fit noisy sinwave of shape {2} and type {3}"
+                             .format(out.shape, out.dtype, shape, sinwave.dtype))
+        elif np.shares_memory(out, sinwave):
+            raise ValueError("Buffer shares memory with the clean sinwave")
 
-        noise = self.__noise_strength * np.random.normal(0, 1, length)
-        wireless_signal.set_sinwave(sinwave + noise)        # 15 * np.random.randn(length)
+        if self.impairments is not None or np.issubdtype(sinwave.dtype, np.integer):
+            # samples are copied, impaired and get noise row by row, in chunks
+            out[...] = sinwave
+            rows = out.reshape(-1, sinwave.shape[-1])
+            for row, row_strength in zip(rows, row_strengths):
+                self.__impair(row, wireless_signal)
+                self.__add_noise_in_place(row, row_strength, wireless_signal)
+        elif wireless_signal.baseband:
+            # complex noise equivalent to unit noise of sinwave, real and imaginary parts are drawn in pairs.
+            # Projection of symbol_length samples of unit noise on a sine (or cosine) reference scaled
+            # by 2 / symbol_length has variance 2 / symbol_length, so it is the variance of each part.
+            self.noise_source.fill(out.view(sinwave.real.dtype).reshape(-1, 2))
+            out *= np.sqrt(2 / wireless_signal.symbol_length)
+            out *= strength
+            out += sinwave
+        else:
+            self.noise_source.fill(out)
+            out *= strength
+            out += sinwave        # 15 * np.random.randn(length)
 
-        return wireless_signal
+        return wireless_signal.copy(out)
+
+    @staticmethod
+    def __row_strengths(noise_strength, sinwave, rows_shape):
+        """ Gets noise strength of every row of noisy sinwave.
+
+            Parameters
+           ----------
+            noise_strength : float or np.ndarray
+                Strength of noises, matched with leading axes of rows
+
+            sinwave : np.ndarray
+                Clean sinwave
+
+            rows_shape : tuple
+                Shape of leading axes of noisy sinwave
+
+           Returns
+           -------
+            strengths : list or np.ndarray
+               Strength of every row in precision of the samples, single strength is not converted
+        """
+        number_of_rows = int(np.prod(rows_shape))
+        if not np.ndim(noise_strength):
+            return [noise_strength] * number_of_rows
+        real_dtype = np.float32 if np.issubdtype(sinwave.dtype, np.integer) else sinwave.real.dtype
+        return np.broadcast_to(np.asarray(noise_strength, dtype=real_dtype), rows_shape).reshape(-1)
+
+    def __impair(self, samples, wireless_signal, first_symbol=0):
+        """ Applies impairments of the channel to given samples in place, if there are any.
+
+            Parameters
+           ----------
+            samples : np.ndarray
+                Contiguous samples of the signal to be changed
+
+            wireless_signal : WirelessSignal
+                Signal of the samples
+
+            first_symbol : int
+                Index of the first symbol of samples in the whole signal
+        """
+        if self.impairments is not None:
+            self.impairments.apply(samples, wireless_signal, self.__impairment_randoms, first_symbol)
+
+    def __add_noise_in_place(self, samples, noise_strength, wireless_signal):
+        """ Adds noise to given samples in place, chunk by chunk, so only one chunk of noise is in memory.
+            Noise is the same as noise of the whole samples drawn at once.
+
+            Parameters
+           ----------
+            samples : np.ndarray
+                Contiguous samples of the signal to be changed: floating point, complex (baseband) or quantized
+
+            noise_strength : float
+                Strength of noises.
+
+            wireless_signal : WirelessSignal
+                Signal of the samples, its baseband, symbol_length and scale describe the samples
+        """
+        if wireless_signal.baseband:
+            # real and imaginary parts get noise in pairs, as in add_noise
+            samples = samples.view(samples.real.dtype)
+        samples = samples.reshape(-1)
+        quantized = np.issubdtype(samples.dtype, np.integer)
+        chunk_size = self.noise_source.chunk_size
+        noise = np.empty(min(chunk_size, len(samples)), dtype=np.float32 if quantized else samples.dtype)
+
+        for start in range(0, len(samples), chunk_size):
+            part = samples[start:start + chunk_size]
+            part_noise = self.noise_source.fill(noise[:len(part)])
+            if wireless_signal.baseband:
+                part_noise *= np.sqrt(2 / wireless_signal.symbol_length)
+            part_noise *= noise_strength
+            if quantized:
+                # quantized samples get noise in float32 and are quantized again with the same scale
+                part_noise += part * np.asarray(wireless_signal.scale, dtype=np.float32)
+                part[...] = utils.quantize(part_noise, wireless_signal.scale, samples.dtype)
+            else:
+                part += part_noise
+
+    def send_batch(self, wireless_signal, noise_strengths, out=None):
+        """ Get one clean WirelessSignal and returns batch signal with one noisy copy for every noise strength,
+            made with a few whole-batch operations. Row k of the batch gets the same noise as k-th of
+            consecutive add_noise calls. Demodulator takes the batch directly and returns one row of bits
+            for every noise strength. Batch holds all noisy copies, so it takes noise_strengths times more
+            memory than the signal, stream_batch yields them one by one.
+
+            Parameters
+           ----------
+            wireless_signal : WirelessSignal
+                WirelessSignal object to send over the channel, it is not changed
+
+            noise_strengths : list or np.ndarray
+                Strength of noises, one for every row of the batch.
+
+            out : np.ndarray
+                Buffer of shape (number of strengths, length of sinwave) and type of the sinwave,
+                new array is allocated if None
+
+           Returns
+           -------
+            wireless_signal : WirelessSignal
+               Batch signal with one noisy sinwave in every row.
+        """
+        noise_strengths = np.asarray(noise_strengths, dtype=np.float64)
+        if noise_strengths.ndim != 1:
+            raise ValueError("Noise strengths of a batch must be a vector, got shape {0}".format(
+                noise_strengths.shape))
+        return self.add_noise(wireless_signal, noise_strengths, out)
+
+    def stream_batch(self, wireless_signal, noise_strengths, out=None):
+        """ Get one clean WirelessSignal and yields its noisy copies one by one, rows of send_batch.
+            Channel has noise strength of the last yielded copy, so every copy can be demodulated
+            as soon as it is yielded.
+
+            Parameters
+           ----------
+            wireless_signal : WirelessSignal
+                WirelessSignal object to send over the channel, it is not changed
+
+            noise_strengths : list or np.ndarray
+                Strength of noises, one for every copy.
+
+            out : np.ndarray
+                Buffer of the shape and type of the sinwave reused for every copy, so every copy
+                is overwritten by the next one, new array for every copy if None
+
+           Returns
+           -------
+            wireless_signals : generator of WirelessSignal
+               Signals with noise.
+        """
+        for noise_strength in noise_strengths:
+            yield self.add_noise(wireless_signal, float(noise_strength), out)
+
+    def stream_signal(self, chunks, noise_strength=None, copy=True, symbol_length=1, cycles_per_symbol=1,
+                      shaped=False):
+        """ Get chunks of signal and yield them with some noise, one by one.
+            Noise is the same as send_signal would add to the whole signal.
+
+            Parameters
+           ----------
+            chunks : iterable of np.ndarray
+                Consecutive parts of sinwave to send over the channel
+
+            noise_strength : float
+                Strength of noises.
+
+            copy : bool
+                Keep given chunks. If False, noise is added straight to writable chunks.
+
+            symbol_length : int
+                Number of samples of one symbol, every chunk must hold whole symbols if the channel has impairments
+
+            cycles_per_symbol : int
+                Number of periods of sinwave in one symbol, used by impairments turning phase
+
+            shaped : bool
+                Symbols have envelope of a pulse shaper, impairments turning phase reject them
+
+           Returns
+           -------
+            chunks : generator of np.ndarray
+               Parts of sinwave with noise.
+        """
+
+        # Set noise strength
+        if noise_strength is not None:
+            self.__noise_strength = noise_strength
+
+        first_symbol = 0
+        for chunk in chunks:
+            if np.issubdtype(chunk.dtype, np.integer):
+                raise ValueError("Quantized samples can not be streamed, use floating point samples")
+            if copy or not chunk.flags.writeable or not chunk.flags.c_contiguous:
+                chunk = np.array(chunk)
+            block = WirelessSignal(None, chunk)
+            block.symbol_length = symbol_length
+            block.cycles_per_symbol = cycles_per_symbol
+            block.shaped = shaped
+            self.__impair(chunk, block, first_symbol)
+            first_symbol += len(chunk) // symbol_length
+            self.__add_noise_in_place(chunk, self.__noise_strength, block)
+            yield chunk
 
-    def add_noise_to_complex(self, complex_numbers):
+    def add_noise_to_complex(self, complex_numbers, noise_strength=None):
         """ Demodulates given signal (WirelessSignal) to list of bits based on bpsk modulation
 
            Parameters
            ----------
-           complex_numbers: list
-                List of complex numbers representing a sine signal
+           complex_numbers: list or np.ndarray
+                List of complex numbers representing a sine signal, or batch of them with one list in every row
+           noise_strength: float or np.ndarray
+                Strength of noises, vector gives every row of the batch its own strength,
+                channel noise_strength if None
 
            Returns
            -------
             complex_numbers : list
                List of complex numbers with added noise with strength of channel noise_strength
         """
+        if noise_strength is None:
+            noise_strength = self.__noise_strength
+        shape = np.shape(complex_numbers)
+        if np.ndim(noise_strength):
+            # vector of strengths is applied row by row
+            noise_strength = np.asarray(noise_strength)
+            noise_strength = noise_strength.reshape(noise_strength.shape + (1,) * (len(shape) - noise_strength.ndim))
 
         # Generate Gauss noise, AWGN with unity power
-        noise = (np.random.randn(len(complex_numbers)) + 1j * np.random.randn(len(complex_numbers))) / np.sqrt(2)
+        # real and imaginary parts are drawn in pairs, so noise does not depend on splitting of the signal
+        noise = self.__complex_source.standard_normal(shape + (2,)).view(np.complex128)[..., 0] / np.sqrt(2)
         # Add Gauss noise to complex numbers
-        complex_numbers = complex_numbers + noise * np.sqrt(self.__noise_strength)
+        complex_numbers = complex_numbers + noise * np.sqrt(noise_strength)
         return complex_numbers
@@ -0,0 +1,225 @@
+import csv
+import hashlib
+import json
+import os
+import zlib
+
+import numpy as np
+
+from constellation import BPSK, PSK8, PSK16, QPSK, Constellation
+
+# psk columns of exported csv in their order, names of Psk types mapped to their constellations
+CSV_COLUMNS = {'bpsk': BPSK, 'qpsk': QPSK, 'psk8': PSK8, 'psk16': PSK16}
+
+
+def scheme_key(scheme) -> str:
+    """
+    Identify modulation scheme of stored points and of seeds of points.
+    Parameters
+    ----------
+    scheme Constellation, or a name for points which are not simulated with a constellation.
+
+    Returns
+    -------
+    str Name of the constellation and hash of its points (Constellation.key), so constellations
+        of the same name do not share points, or the given name.
+    """
+    if isinstance(scheme, Constellation):
+        name, points = scheme.key
+        return "{0}:{1}".format(name, hashlib.sha256(points).hexdigest()[:16])
+    return scheme
+
+
+def bits_hash(bits) -> str:
+    """
+    Compute hash of input bits, so results stay valid when their file is renamed and expire when it changes.
+    Every entry point hashes the bits it sends, so all of them share stored points of the same data.
+    Parameters
+    ----------
+    bits Bits to be hashed.
+
+    Returns
+    -------
+    str Hexadecimal sha256 of packed bits and their number.
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    digest = hashlib.sha256(np.packbits(bits).tobytes())
+    digest.update(str(len(bits)).encode())
+    return digest.hexdigest()
+
+
+def effective_seed(seed):
+    """
+    Get seed a sweep is simulated with: given seed, or fresh entropy if None.
+    Stored points are keyed by it, so points of unseeded runs are never mistaken for each other
+    or for seeded ones, and the run can be repeated with the returned seed.
+    Parameters
+    ----------
+    seed Seed of the sweep or None.
+
+    Returns
+    -------
+    int Seed of the sweep.
+    """
+    if seed is None:
+        return np.random.SeedSequence().entropy
+    return seed
+
+
+def point_seed(seed, scheme, noise):
+    """
+    Derive seed of a single point from seed of the sweep, so every point gets the same noise
+    whatever the order of simulation and whichever points were already stored.
+    Parameters
+    ----------
+    seed Seed of the sweep.
+    scheme Constellation (or name, see scheme_key).
+    noise Noise strength.
+
+    Returns
+    -------
+    np.random.SeedSequence Seed of the channel, None if seed is None.
+    """
+    if seed is None:
+        return None
+    return np.random.SeedSequence(seed, spawn_key=(zlib.crc32(scheme_key(scheme).encode()),
+                                                   int(round(noise * 10**6))))
+
+
+class ResultStore:
+    """
+    Results of simulations kept on disk, one json file per simulated point.
+    Every point is addressed by a hash of everything it depends on: input data, constellation, noise,
+    parameters of modulator and demodulator and seed. Finished points are written atomically, so
+    an interrupted sweep loses only the point being simulated and a rerun simulates only the missing ones.
+    """
+
+    def __init__(self, directory="results"):
+        """
+        Parameters
+        ----------
+        directory Directory of stored points, created if missing.
+        """
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def describe(data_hash, scheme, noise, parameters=None, seed=None) -> dict:
+        """
+        Describe everything a point depends on.
+        Parameters
+        ----------
+        data_hash Hash of input data (bits_hash).
+        scheme Constellation (or name, see scheme_key).
+        noise Noise strength.
+        parameters Dictionary of parameters of modulator, demodulator and channel.
+        seed Effective seed of the sweep (effective_seed).
+
+        Returns
+        -------
+        dict Description of the point.
+        """
+        return {'data': data_hash, 'psk': scheme_key(scheme), 'noise': float(noise), 'parameters': parameters or {},
+                'seed': seed}
+
+    @staticmethod
+    def key(description) -> str:
+        """
+        Compute address of a point.
+        Parameters
+        ----------
+        description Description of the point made by describe.
+
+        Returns
+        -------
+        str Hexadecimal sha256 of the description.
+        """
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()
+
+    def __path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, description):
+        """
+        Read number of distorted bits of stored point.
+        Parameters
+        ----------
+        description Description of the point.
+
+        Returns
+        -------
+        int Number of distorted bits or None if the point was not simulated yet.
+        """
+        try:
+            with open(self.__path(self.key(description)), "r") as file:
+                errors = json.load(file)['errors']
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return errors
+
+    def put(self, description, errors):
+        """
+        Store point atomically, the file is either complete or missing.
+        Parameters
+        ----------
+        description Description of the point.
+        errors Number of distorted bits.
+        """
+        record = dict(description, errors=int(errors))
+        path = self.__path(self.key(description))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = "{0}.{1}.tmp".format(path, os.getpid())
+        with open(temporary_path, "w") as file:
+            json.dump(record, file)
+        os.replace(temporary_path, path)
+
+    def point(self, data_hash, scheme, noise, simulate, parameters=None, seed=None):
+        """
+        Get number of distorted bits of a point, simulate and store it if it is missing.
+        Parameters
+        ----------
+        data_hash Hash of input data.
+        scheme Constellation (or name, see scheme_key).
+        noise Noise strength.
+        simulate Function without arguments returning number of distorted bits.
+        parameters Dictionary of parameters of modulator, demodulator and channel.
+        seed Seed of the simulation.
+
+        Returns
+        -------
+        int Number of distorted bits.
+        """
+        description = self.describe(data_hash, scheme, noise, parameters, seed)
+        errors = self.get(description)
+        if errors is None:
+            errors = int(simulate())
+            self.put(description, errors)
+        return errors
+
+    def export_csv(self, file_name, data_hash, noises, original_size, parameters=None, seed=None):
+        """
+        Write stored points to csv in layout of wrong_bits.csv: noise;bpsk;qpsk;psk8;psk16;oryginal_size.
+        Missing points are left empty.
+        Parameters
+        ----------
+        file_name Path to the csv file.
+        data_hash Hash of input data.
+        noises Noise strengths, one row each.
+        original_size Number of input bits.
+        parameters Dictionary of parameters of modulator, demodulator and channel.
+        seed Seed of the simulations.
+        """
+        headers = ['noise'] + list(CSV_COLUMNS) + ['oryginal_size']
+        with open(file_name, 'w', newline='') as out_file:
+            writer = csv.DictWriter(out_file, delimiter=';', lineterminator='\n', fieldnames=headers)
+            writer.writeheader()
+            for noise in noises:
+                row = {'noise': noise, 'oryginal_size': original_size}
+                for column, constellation in CSV_COLUMNS.items():
+                    errors = self.get(self.describe(data_hash, constellation, noise, parameters, seed))
+                    row[column] = '' if errors is None else str(errors).replace('.', ',')
+                writer.writerow(row)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from demodulator import Demodulator
+from pipeline import transmit
+from radio_channel import Channel
+
+NUMBER_OF_BITS = 60000
+SWEEP_NOISES = (0.01, 0.05, 0.1, 0.2, 0.3, 0.5)
+# correlation at noise levels of the default sweep, projection at levels where it makes errors
+LEVELS = [(Demodulator.CORRELATION, m, noise) for m in (2, 4, 8, 16) for noise in SWEEP_NOISES] + \
+         [(Demodulator.PROJECTION, m, noise) for m, noises in {2: (6, 8), 4: (4, 6), 8: (2, 3), 16: (1, 1.5)}.items()
+          for noise in noises]
+
+
+@pytest.fixture(scope="module")
+def bits():
+    return np.random.default_rng(0).integers(0, 2, NUMBER_OF_BITS)
+
+
+@pytest.mark.parametrize("detection, m, noise", LEVELS)
+def test_baseband_matches_passband(bits, detection, m, noise):
+    # independent noise of both simulations, so bit error rates agree within 4 standard deviations
+    # of their difference, errors of one symbol counted as dependent
+    demodulator = Demodulator(detection=detection, draw_diagram=False)
+    passband = np.mean(transmit(bits, m, noise, channel=Channel(seed=0), demodulator=demodulator) != bits)
+    baseband = np.mean(transmit(bits, m, noise, channel=Channel(seed=1), demodulator=demodulator,
+                                baseband=True) != bits)
+
+    bits_per_symbol = int(np.log2(m))
+    tolerance = 4 * np.sqrt(2 * bits_per_symbol * max(passband, 1 / NUMBER_OF_BITS) / NUMBER_OF_BITS)
+    assert abs(passband - baseband) <= tolerance
@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+import pytest
+from scipy.stats import pearsonr
+
+from demodulator import Demodulator
+from modulator import Modulator
+from radio_channel import Channel
+
+PERIOD, AMPLITUDE, SAMPLE_RATE = 6, 1, 100
+LEGACY_NAMES = {2: 'make_bpsk_demod', 4: 'make_qpsk_demod', 8: 'make_8psk_demod', 16: 'make_16psk_demod'}
+
+
+def legacy_demod(data_signal, channel, m):
+    """
+    Bits of the original make_*_demod: every symbol is compared with patterns one by one with pearsonr
+    (normalized dot product for bpsk), the first best pattern gives the point, points get channel noise
+    and are decided by the original chains of comparisons.
+    """
+    sinwave = data_signal.get_sinwave()
+    symbol_length = PERIOD * SAMPLE_RATE
+    pattern_sin_time = np.arange(0, PERIOD, 1 / SAMPLE_RATE)
+    thetas = [0] if m == 2 else [(2 * k + 1) * np.pi / m for k in range(m)]
+    patterns = [AMPLITUDE * np.sin(2 * np.pi / PERIOD * pattern_sin_time + theta) for theta in thetas]
+
+    complex_numbers = []
+    for start in range(0, len(sinwave), symbol_length):
+        sample = sinwave[start:start + symbol_length]
+        if m == 2:
+            phi = math.acos(np.dot(patterns[0], sample) / (np.linalg.norm(patterns[0]) * np.linalg.norm(sample)))
+        else:
+            coefficients = [pearsonr(sample, pattern)[0] for pattern in patterns]
+            phi = thetas[coefficients.index(max(coefficients))]
+        complex_numbers.append(np.cos(phi) + 1j * np.sin(phi))
+    complex_numbers = channel.add_noise_to_complex(complex_numbers)
+
+    bits = []
+    for point in complex_numbers:
+        if m == 2:
+            bits.append(1 if np.real(point) > 0 else 0)
+        elif m == 4:
+            bits.extend([1 if np.real(point) > 0 else 0, 1 if np.imag(point) > 0 else 0])
+        else:
+            # sectors of width 2 pi / m counted from 0, bits are the number of the sector
+            sector = int(np.angle(point) % (2 * np.pi) // (2 * np.pi / m))
+            bits.extend(int(bit) for bit in np.binary_repr(sector, int(np.log2(m))))
+    return bits[:len(bits) - data_signal.padding]
+
+
+@pytest.mark.parametrize("m", [2, 4, 8, 16])
+@pytest.mark.parametrize("noise", [0.5, 2.0])
+def test_correlation_equals_legacy(m, noise):
+    bits = np.random.default_rng(m).integers(0, 2, 1201)
+    signal = Channel(noise, seed=1).add_noise(Modulator().make_mpsk_mod(bits, m))
+    demodulator = Demodulator(PERIOD, AMPLITUDE, SAMPLE_RATE, draw_diagram=False)
+
+    legacy = legacy_demod(signal, Channel(noise, seed=2), m)
+    np.testing.assert_array_equal(demodulator.make_mpsk_demod(signal, Channel(noise, seed=2), m), legacy)
+    np.testing.assert_array_equal(getattr(demodulator, LEGACY_NAMES[m])(signal, Channel(noise, seed=2)), legacy)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from impairments import AmplitudeScaling, Fading, FrequencyOffset, ImpairmentChain, ImpulsiveNoise, PhaseOffset
+from modulator import Modulator
+from noise_source import NoiseSource
+from pipeline import stream_transmission, transmit
+from pulse_shaping import PulseShaper
+from radio_channel import Channel
+
+
+def random_stages():
+    return [FrequencyOffset(0.001), Fading(3.0, coherence_symbols=7), ImpulsiveNoise(0.01, 3.0), AmplitudeScaling(0.9)]
+
+
+@pytest.fixture
+def bits():
+    return np.random.default_rng(1).integers(0, 2, 20003).astype(np.uint8)
+
+
+@pytest.mark.parametrize("chunk_size", [600, 6000, 65536])
+@pytest.mark.parametrize("chain_chunk_size", [300, 1 << 16])
+def test_stream_equals_batch(bits, chunk_size, chain_chunk_size):
+    modulator = Modulator()
+    batch = Channel(0.3, seed=5, impairments=random_stages()).send_signal(modulator.make_mpsk_mod(bits, 4))
+
+    channel = Channel(0.3, seed=5, impairments=ImpairmentChain(random_stages(), chunk_size=chain_chunk_size))
+    chunks = channel.stream_signal(modulator.stream_mpsk_mod(bits, 4, chunk_size),
+                                   symbol_length=modulator.make_waveform_table(4).shape[1])
+    np.testing.assert_array_equal(np.concatenate(list(chunks)), batch.get_sinwave())
+
+
+def test_stream_transmission_equals_transmit(bits):
+    expected = transmit(bits, 8, 0.3, channel=Channel(seed=3, impairments=random_stages()))
+    received = stream_transmission(bits, 8, 0.3, channel=Channel(seed=3, impairments=random_stages()),
+                                   chunk_size=1234)
+    np.testing.assert_array_equal(np.concatenate(list(received)), expected)
+
+
+def test_noise_source_seeds_impairments(bits):
+    first, second = (transmit(bits, 4, 0.3, channel=Channel(noise_source=NoiseSource(9), impairments=random_stages()))
+                     for _ in range(2))
+    np.testing.assert_array_equal(first, second)
+
+
+def test_shaped_signal_is_not_turned(bits):
+    modulator = Modulator(shaper=PulseShaper())
+    with pytest.raises(ValueError):
+        transmit(bits, 4, 0.1, modulator=modulator, channel=Channel(impairments=[PhaseOffset(0.3)]))
+    assert len(transmit(bits, 4, 0.1, modulator=modulator, channel=Channel(impairments=[AmplitudeScaling(0.5)]))) \
+        == len(bits)
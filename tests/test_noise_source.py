@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from modulator import Modulator
+from noise_source import NoiseSource
+from radio_channel import Channel
+
+NUMBER_OF_SAMPLES = 300000
+SPLITS = [[NUMBER_OF_SAMPLES], [1, 65535, 70000, 164464], [12345] * 24 + [NUMBER_OF_SAMPLES - 12345 * 24]]
+
+
+def fill(source, sizes, dtype):
+    return np.concatenate([source.fill(np.empty(size, dtype=dtype)) for size in sizes])
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("threads", [1, 2, 4])
+@pytest.mark.parametrize("block_size", [1, 1 << 16, 100000, 1 << 20])
+@pytest.mark.parametrize("sizes", SPLITS)
+def test_block_fill_does_not_depend_on_threads_blocks_or_chunks(dtype, threads, block_size, sizes):
+    expected = fill(NoiseSource(7, threads=1), [NUMBER_OF_SAMPLES], dtype)
+    np.testing.assert_array_equal(fill(NoiseSource(7, threads=threads, block_size=block_size), sizes, dtype),
+                                  expected)
+
+
+@pytest.mark.parametrize("sizes", SPLITS)
+def test_single_stream_does_not_depend_on_chunks(sizes):
+    expected = fill(NoiseSource(7), [NUMBER_OF_SAMPLES], np.float64)
+    np.testing.assert_array_equal(fill(NoiseSource(7), sizes, np.float64), expected)
+
+
+@pytest.mark.parametrize("threads, block_size", [(1, 1 << 16), (3, 1 << 16), (2, 1 << 20)])
+def test_channel_noise_does_not_depend_on_threads(threads, block_size):
+    signal = Modulator().make_mpsk_mod(np.random.default_rng(0).integers(0, 2, 4000), 4)
+    expected = Channel(0.5, noise_source=NoiseSource(3, threads=1)).add_noise(signal).get_sinwave()
+
+    channel = Channel(0.5, noise_source=NoiseSource(3, threads=threads, block_size=block_size))
+    np.testing.assert_array_equal(channel.add_noise(signal).get_sinwave(), expected)
+    # in place noise is added chunk by chunk
+    channel = Channel(0.5, noise_source=NoiseSource(3, threads=threads, block_size=block_size))
+    np.testing.assert_array_equal(channel.send_signal(signal.copy(np.array(signal.get_sinwave())), copy=False)
+                                  .get_sinwave(), expected)
+
+
+def test_seed_repeats_noise():
+    source = NoiseSource()
+    np.testing.assert_array_equal(NoiseSource(source.entropy).standard_normal(1000), source.standard_normal(1000))
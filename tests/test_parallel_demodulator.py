@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from demodulator import Demodulator
+from modulator import Modulator
+from parallel_demodulator import parallel_mpsk_demod
+from radio_channel import Channel
+
+DETECTIONS = [Demodulator.CORRELATION, Demodulator.PROJECTION, Demodulator.FFT]
+
+
+@pytest.fixture(scope="module")
+def bits():
+    return np.random.default_rng(0).integers(0, 2, 20001).astype(np.uint8)
+
+
+@pytest.mark.parametrize("m", [2, 4, 8, 16])
+@pytest.mark.parametrize("detection", DETECTIONS)
+@pytest.mark.parametrize("baseband", [False, True])
+def test_parallel_equals_sequential(bits, m, detection, baseband):
+    modulator = Modulator()
+    signal = modulator.make_mpsk_baseband(bits, m) if baseband else modulator.make_mpsk_mod(bits, m)
+    signal = Channel(0.3, seed=3).send_signal(signal)
+    demodulator = Demodulator(detection=detection, draw_diagram=False)
+
+    expected = demodulator.make_mpsk_demod(signal, Channel(0.3, seed=5), m)
+    # shards of 1000 symbols, the last one shorter
+    received = parallel_mpsk_demod(demodulator, signal, Channel(0.3, seed=5), m, workers=2, shard_symbols=1000)
+    np.testing.assert_array_equal(received, expected)
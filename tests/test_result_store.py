@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+
+import result_store
+from constellation import BPSK, PSK8, QPSK
+from noise_to_bit_distortion import parallel_sweep, sweep_parameters
+from result_store import CSV_COLUMNS, ResultStore
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_point_is_simulated_once(tmp_path):
+    calls = []
+
+    def simulate():
+        calls.append(1)
+        return 17
+
+    for directory_store in (ResultStore(str(tmp_path)), ResultStore(str(tmp_path))):
+        assert directory_store.point("data", QPSK, 0.1, simulate, {'a': 1}, seed=3) == 17
+    assert len(calls) == 1
+    # every part of the description is part of the key
+    ResultStore(str(tmp_path)).point("data", QPSK, 0.1, simulate, {'a': 1}, seed=4)
+    assert len(calls) == 2
+
+
+def test_second_sweep_reads_every_point(tmp_path):
+    bits = np.random.default_rng(0).integers(0, 2, 2000)
+    noises = [0.1, 0.3, 0.5]
+    constellations = [BPSK, QPSK, PSK8]
+
+    first_store = ResultStore(str(tmp_path))
+    first = parallel_sweep(bits, noises, constellations, workers=1, seed=5, store=first_store)
+    assert first_store.misses == len(noises) * len(constellations)
+
+    second_store = ResultStore(str(tmp_path))
+    assert parallel_sweep(bits, noises, constellations, workers=1, seed=5, store=second_store) == first
+    assert (second_store.hits, second_store.misses) == (len(noises) * len(constellations), 0)
+
+
+def test_interrupted_sweep_simulates_missing_points(tmp_path):
+    bits = np.random.default_rng(0).integers(0, 2, 2000)
+    noises = [0.1, 0.3, 0.5]
+    full = parallel_sweep(bits, noises, [QPSK], workers=1, seed=5, store=ResultStore(str(tmp_path)))
+
+    # a point lost by the interruption
+    key = ResultStore.key(ResultStore.describe(result_store.bits_hash(bits), QPSK, 0.3, sweep_parameters(False), 5))
+    os.remove(os.path.join(str(tmp_path), key[:2], key + ".json"))
+
+    store = ResultStore(str(tmp_path))
+    assert parallel_sweep(bits, noises, [QPSK], workers=1, seed=5, store=store) == full
+    assert (store.hits, store.misses) == (2, 1)
+
+
+def test_export_csv_has_legacy_layout(tmp_path):
+    # points of wrong_bits.csv written by the original wrong_bits_test
+    with open(os.path.join(REPOSITORY, "wrong_bits.csv"), newline='') as file:
+        legacy = file.read()
+    rows = [line.split(';') for line in legacy.splitlines()[1:]]
+
+    store = ResultStore(str(tmp_path / "results"))
+    for row in rows:
+        for column, errors in zip(CSV_COLUMNS.values(), row[1:5]):
+            store.put(store.describe("data", column, float(row[0]), seed=1), int(errors))
+
+    file_name = str(tmp_path / "wrong_bits.csv")
+    store.export_csv(file_name, "data", [float(row[0]) for row in rows], int(rows[0][5]), seed=1)
+    with open(file_name, newline='') as file:
+        assert file.read() == legacy
+
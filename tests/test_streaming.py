@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from demodulator import Demodulator
+from modulator import Modulator
+from pipeline import stream_transmission, transmit
+from radio_channel import Channel
+
+DETECTIONS = [Demodulator.CORRELATION, Demodulator.PROJECTION, Demodulator.FFT]
+
+
+@pytest.fixture(scope="module")
+def bits():
+    # odd number of bits, so the last symbol of every psk but bpsk is padded
+    return np.random.default_rng(0).integers(0, 2, 3001).astype(np.uint8)
+
+
+@pytest.mark.parametrize("m", [2, 4, 8, 16])
+@pytest.mark.parametrize("detection", DETECTIONS)
+@pytest.mark.parametrize("chunk_size", [7 * 600, 1000, 1 << 20])
+def test_stream_transmission_equals_transmit(bits, m, detection, chunk_size):
+    # 7 symbols do not divide number of symbols of any psk, 1000 samples are not whole symbols
+    demodulator = Demodulator(detection=detection, draw_diagram=False)
+    expected = transmit(bits, m, 0.4, channel=Channel(seed=3), demodulator=demodulator)
+    received = stream_transmission(bits, m, 0.4, channel=Channel(seed=3), demodulator=demodulator,
+                                   chunk_size=chunk_size)
+    np.testing.assert_array_equal(np.concatenate(list(received)), expected)
+
+
+@pytest.mark.parametrize("m", [2, 4, 8, 16])
+@pytest.mark.parametrize("detection", DETECTIONS)
+def test_stream_demod_of_uneven_chunks(bits, m, detection):
+    demodulator = Demodulator(detection=detection, draw_diagram=False)
+    signal = Channel(0.4, seed=1).add_noise(Modulator().make_mpsk_mod(bits, m))
+    expected = demodulator.make_mpsk_demod(signal, Channel(0.4, seed=2), m)
+
+    sinwave = signal.get_sinwave()
+    # cuts inside symbols, chunk shorter than a symbol and empty chunk
+    cuts = [0, 250, 1111, 1111, 4321, 4500, len(sinwave) // 2 + 17, len(sinwave)]
+    chunks = (sinwave[start:end] for start, end in zip(cuts, cuts[1:]))
+    received = demodulator.stream_mpsk_demod(chunks, Channel(0.4, seed=2), m, len(bits))
+    np.testing.assert_array_equal(np.concatenate(list(received)), expected)
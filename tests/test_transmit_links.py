@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from demodulator import Demodulator
+from pipeline import transmit, transmit_links
+from radio_channel import Channel
+
+
+@pytest.mark.parametrize("baseband", [False, True])
+@pytest.mark.parametrize("detection", [Demodulator.CORRELATION, Demodulator.PROJECTION])
+def test_links_equal_transmit_loop(baseband, detection):
+    rng = np.random.default_rng(1)
+    number_of_links = 12
+    payloads = rng.integers(0, 2, (number_of_links, 2001), dtype=np.uint8)
+    orders = rng.choice([2, 4, 8, 16], number_of_links)
+    noise_strengths = rng.uniform(0.05, 0.8, number_of_links)
+
+    received = transmit_links(payloads, orders, noise_strengths, channel=Channel(seed=5),
+                              demodulator=Demodulator(detection=detection, draw_diagram=False), baseband=baseband)
+
+    # links sent one by one through the same channel, grouped by psk in order of their rows
+    channel = Channel(seed=5)
+    expected = np.empty_like(payloads)
+    for m in np.unique(orders):
+        for link in np.flatnonzero(orders == m):
+            expected[link] = transmit(payloads[link], int(m), noise_strengths[link], channel=channel,
+                                      demodulator=Demodulator(detection=detection, draw_diagram=False),
+                                      baseband=baseband)
+    np.testing.assert_array_equal(received, expected)
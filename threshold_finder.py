@@ -0,0 +1,106 @@
+import time
+
+from ber_estimator import BerEstimator
+from noise_to_bit_distortion import Psk
+
+
+class CriticalNoise:
+    """
+    Noise strength at which bit error rate of psk (or constellation) reaches the target, with the cost of the search.
+    """
+
+    def __init__(self, psk_type, target_ber, noise, simulations, bits, seconds, estimates):
+        """
+        Parameters
+        ----------
+        psk_type Type of psk or constellation.
+        target_ber Searched bit error rate.
+        noise Critical noise strength, middle of the last interval of the search.
+        simulations Number of bit error rate estimates made by the search.
+        bits Number of bits simulated by all estimates.
+        seconds Duration of the search.
+        estimates Tested noise strengths mapped to their BerEstimate.
+        """
+        self.psk_type = psk_type
+        self.target_ber = target_ber
+        self.noise = noise
+        self.simulations = simulations
+        self.bits = bits
+        self.seconds = seconds
+        self.estimates = estimates
+
+    def __repr__(self):
+        return "CriticalNoise({0}, ber={1:.1e}, noise={2:.4f}, simulations={3}, bits={4}, seconds={5:.2f})".format(
+            self.psk_type.name, self.target_ber, self.noise, self.simulations, self.bits, self.seconds)
+
+
+def find_critical_noise(psk_type, target_ber, low=0.0, high=1.0, resolution=0.01, **estimator_args):
+    """
+    Find noise strength at which bit error rate reaches the target using bisection.
+    Bit error rate grows with noise, so every estimate halves the interval holding the critical noise.
+    Both ends are estimated first, the search fails if they do not bracket the target.
+    Every estimate starts from the same seed, so the compared estimates differ only by noise.
+    Parameters
+    ----------
+    psk_type Type of psk or constellation to be tested.
+    target_ber Searched bit error rate.
+    low Noise strength below the critical one, bit error rate there has to be below the target.
+    high Noise strength above the critical one, bit error rate there has to reach the target.
+    resolution Search stops when the interval is not wider than this.
+    estimator_args Arguments of BerEstimator, seed is 0 and max_bits is enough for 1000 errors at target bit error
+                   rate if not given.
+
+    Returns
+    -------
+    CriticalNoise Critical noise strength and cost of the search.
+    """
+    estimator_args.setdefault("seed", 0)
+    estimator_args.setdefault("max_bits", int(1000 / target_ber))
+    estimator = BerEstimator(psk_type, **estimator_args)
+    estimates = {}
+    bits = 0
+
+    start = time.perf_counter()
+    for noise in (low, high):
+        estimates[noise] = estimator.estimate(noise)
+        bits += estimates[noise].bits
+    if estimates[low].ber >= target_ber:
+        raise ValueError("Bit error rate {0:.3e} at low noise {1} already reaches target {2:.3e}".format(
+            estimates[low].ber, low, target_ber))
+    if estimates[high].ber < target_ber:
+        raise ValueError("Bit error rate {0:.3e} at high noise {1} is below target {2:.3e}, raise high".format(
+            estimates[high].ber, high, target_ber))
+
+    while high - low > resolution:
+        noise = (low + high) / 2
+        estimate = estimator.estimate(noise)
+        estimates[noise] = estimate
+        bits += estimate.bits
+        if estimate.ber < target_ber:
+            low = noise
+        else:
+            high = noise
+    seconds = time.perf_counter() - start
+
+    return CriticalNoise(psk_type, target_ber, (low + high) / 2, len(estimates), bits, seconds, estimates)
+
+
+def find_critical_noises(target_ber, psk_types=tuple(Psk), **search_args):
+    """
+    Find critical noise strength of every given psk type or constellation.
+    Parameters
+    ----------
+    target_ber Searched bit error rate.
+    psk_types Types of psk or constellations to be tested, all psk types by default.
+    search_args Arguments of find_critical_noise.
+
+    Returns
+    -------
+    dict Psk type (or constellation) mapped to its CriticalNoise.
+    """
+    return {psk_type: find_critical_noise(psk_type, target_ber, **search_args) for psk_type in psk_types}
+
+
+if __name__ == "__main__":
+    for critical_noise in find_critical_noises(1e-2).values():
+        print(critical_noise)
@@ -1,3 +1,65 @@
+import numpy as np
+
+# number of ones in every byte value
+BYTE_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis], axis=1).sum(axis=1).astype(np.uint8)
+
+
+class BitErrorStats:
+    """
+    Statistics of differences between sent and received bits.
+    """
+
+    def __init__(self, total, per_byte, per_symbol, burst_lengths, error_positions):
+        """
+        Parameters
+        ----------
+        total Number of different bits.
+        per_byte Histogram, element k is the number of bytes with k wrong bits.
+        per_symbol Histogram, element k is the number of symbols with k wrong bits.
+        burst_lengths Histogram, element k is the number of bursts (runs of consecutive wrong bits) of length k.
+        error_positions Indexes of wrong bits.
+        """
+        self.total = total
+        self.per_byte = per_byte
+        self.per_symbol = per_symbol
+        self.burst_lengths = burst_lengths
+        self.error_positions = error_positions
+
+    @property
+    def number_of_bursts(self) -> int:
+        return int(self.burst_lengths.sum())
+
+    @property
+    def mean_burst_length(self) -> float:
+        return self.total / self.number_of_bursts if self.number_of_bursts else 0.0
+
+    @property
+    def max_burst_length(self) -> int:
+        return len(self.burst_lengths) - 1
+
+    def __repr__(self):
+        return "BitErrorStats(total={0}, bursts={1}, mean_burst_length={2:.2f}, max_burst_length={3})".format(
+            self.total, self.number_of_bursts, self.mean_burst_length, self.max_burst_length)
+
+
+def count_distorted_bytes(bytes_1, bytes_2) -> int:
+    """
+    Compare two packed bit sets (8 bits per byte) and compute number of different bits with xor and popcount.
+    Parameters
+    ----------
+    bytes_1 First packed bit set (bytes or np.uint8 array) to be compared.
+    bytes_2 Second packed bit set to be compared.
+
+    Returns
+    -------
+    int Number.
+    """
+    bytes_1 = np.frombuffer(bytes_1, dtype=np.uint8) if isinstance(bytes_1, bytes) else np.asarray(bytes_1)
+    bytes_2 = np.frombuffer(bytes_2, dtype=np.uint8) if isinstance(bytes_2, bytes) else np.asarray(bytes_2)
+    size = min(len(bytes_1), len(bytes_2))
+    return int(BYTE_POPCOUNT[np.bitwise_xor(bytes_1[:size], bytes_2[:size])].sum(dtype=np.int64))
+
+
 def compute_distorted_bits(bit_set_1, bit_set_2) -> int:
     """
     Compare two bit sets and compute number of different bits.
@@ -11,10 +73,127 @@ def compute_distorted_bits(bit_set_1, bit_set_2) -> int:
     int Number.
     """
     size = min(len(bit_set_1), len(bit_set_2))
-    distorted = 0
+    return count_distorted_bytes(np.packbits(np.asarray(bit_set_1[:size], dtype=np.uint8)),
+                                 np.packbits(np.asarray(bit_set_2[:size], dtype=np.uint8)))
+
+
+def analyze_distorted_bits(bit_set_1, bit_set_2, bits_per_symbol=1) -> BitErrorStats:
+    """
+    Compare two bit sets and compute where the different bits are.
+    Parameters
+    ----------
+    bit_set_1 First bit set to be compared.
+    bit_set_2 Second bit set to be compared.
+    bits_per_symbol Number of bits coded by one symbol of the modulation.
+
+    Returns
+    -------
+    BitErrorStats Number of different bits, their histograms per byte and per symbol and bursts of them.
+    """
+    size = min(len(bit_set_1), len(bit_set_2))
+    wrong_bytes = np.bitwise_xor(np.packbits(np.asarray(bit_set_1[:size], dtype=np.uint8)),
+                                 np.packbits(np.asarray(bit_set_2[:size], dtype=np.uint8)))
+    errors_per_byte = BYTE_POPCOUNT[wrong_bytes]
+    total = int(errors_per_byte.sum(dtype=np.int64))
+    per_byte = np.bincount(errors_per_byte, minlength=9)
+    error_positions = np.flatnonzero(np.unpackbits(wrong_bytes)[:size])
+
+    # every wrong bit belongs to one symbol, symbols without wrong bits are the rest
+    number_of_symbols = -(-size // bits_per_symbol)
+    errors_per_symbol = np.bincount(error_positions // bits_per_symbol, minlength=number_of_symbols)
+    per_symbol = np.bincount(errors_per_symbol, minlength=bits_per_symbol + 1)
+
+    # burst starts where the previous wrong bit is not the neighbour
+    starts = np.flatnonzero(np.diff(error_positions, prepend=-2) != 1)
+    lengths = np.diff(starts, append=len(error_positions))
+    burst_lengths = np.bincount(lengths) if len(lengths) else np.zeros(1, dtype=np.int64)
+
+    return BitErrorStats(total, per_byte, per_symbol, burst_lengths, error_positions)
+
+
+def bits_per_symbol(m) -> int:
+    """
+    Compute number of bits coded by a single symbol of m-psk.
+    Parameters
+    ----------
+    m Number of phases, has to be a power of two.
+
+    Returns
+    -------
+    int Number of bits per symbol.
+    """
+    if m < 2 or m & (m - 1) != 0:
+        raise ValueError("Number of phases has to be a power of two, got {0}".format(m))
+    return m.bit_length() - 1
+
+
+def psk_phases(m) -> np.ndarray:
+    """
+    Phase shifts of m-psk indexed by the value of the coded bits (first bit is the most significant one).
+    Bpsk and qpsk keep their historical phases, higher orders use (2k + 1) * pi / m.
+    Parameters
+    ----------
+    m Number of phases, has to be a power of two.
+
+    Returns
+    -------
+    np.ndarray Array of m phases.
+    """
+    bits_per_symbol(m)
+    if m == 2:
+        return np.array([np.pi, 0])     # 0, 1
+    if m == 4:
+        return np.array([5 * np.pi / 4, 3 * np.pi / 4, 7 * np.pi / 4, np.pi / 4])   # 00, 01, 10, 11
+    return (2 * np.arange(m) + 1) * np.pi / m
+
+
+def psk_bit_table(m) -> np.ndarray:
+    """
+    Bits coded by every symbol value of m-psk (first bit is the most significant one).
+    Parameters
+    ----------
+    m Number of phases, has to be a power of two.
 
-    for i in range(0, size):
-        if bit_set_1[i] != bit_set_2[i]:
-            distorted += 1
+    Returns
+    -------
+    np.ndarray Array of shape (m, bits per symbol).
+    """
+    weights = np.arange(bits_per_symbol(m) - 1, -1, -1)
+    return ((np.arange(m)[:, np.newaxis] >> weights) & 1).astype(np.uint8)
+
+
+def compute_dtype(dtype) -> np.dtype:
+    """
+    Floating point type used for computations on samples of given type.
+    Quantized (integer) samples are computed in float32.
+    Parameters
+    ----------
+    dtype Type of samples.
+
+    Returns
+    -------
+    np.dtype Floating point type.
+    """
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.integer):
+        return np.dtype(np.float32)
+    return dtype
+
+
+def quantize(samples, scale, dtype=np.int16) -> np.ndarray:
+    """
+    Quantize samples to integers, so that samples are approximately equal to result multiplied by scale.
+    Values out of range of the integer type are clipped.
+    Parameters
+    ----------
+    samples Floating point samples.
+    scale Value of one quantization step.
+    dtype Integer type of result.
 
-    return distorted
+    Returns
+    -------
+    np.ndarray Quantized samples.
+    """
+    limits = np.iinfo(dtype)
+    quantized = np.rint(np.asarray(samples) / scale)
+    return np.clip(quantized, limits.min, limits.max, out=quantized).astype(dtype)
@@ -0,0 +1,188 @@
+import collections
+import threading
+
+import numpy as np
+
+import utils
+from constellation import get_constellation
+
+
+def symbol_length(period, sample_rate, cycles=1):
+    """
+    Number of samples of a symbol of cycles periods of sinwave, counted as np.arange(0, cycles * period,
+    1 / sample_rate) counts them, without rounding errors of the float rate.
+    Parameters
+    ----------
+    period Period of sinwave.
+    sample_rate Number of samples per milisecond.
+    cycles Number of periods of sinwave in one symbol.
+
+    Returns
+    -------
+    int Number of samples of a symbol.
+    """
+    return int(np.ceil(cycles * period * sample_rate - 1e-9))
+
+
+def sample_times(period, sample_rate, cycles=1, decimation=1):
+    """
+    Times of samples of a symbol, every decimation-th sample of the symbol at sample_rate.
+    Parameters
+    ----------
+    period Period of sinwave.
+    sample_rate Number of samples per milisecond.
+    cycles Number of periods of sinwave in one symbol.
+    decimation Decimation factor, it has to divide symbol_length.
+
+    Returns
+    -------
+    np.ndarray Times of symbol_length // decimation samples.
+    """
+    return np.arange(symbol_length(period, sample_rate, cycles) // decimation) * (decimation / sample_rate)
+
+
+class WaveformCache:
+    """
+    Process-wide store of single period waveform tables shared by modulators and demodulators.
+    Least recently used tables are dropped when the cache is full.
+    Stored tables are read-only, because every user gets the same array.
+    """
+
+    def __init__(self, max_size=64):
+        """
+        Initialize empty cache.
+        Parameters
+        ----------
+        max_size Maximal number of stored tables.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.__tables = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__tables)
+
+    def get(self, key, generate):
+        """
+        Get table stored under the key, generate and store it if it is missing.
+        Parameters
+        ----------
+        key Hashable description of the table.
+        generate Function without arguments returning the table.
+
+        Returns
+        -------
+        np.ndarray Read-only table.
+        """
+        with self.__lock:
+            table = self.__tables.get(key)
+            if table is not None:
+                self.__tables.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+
+        table = np.asarray(generate())
+        table.flags.writeable = False
+
+        with self.__lock:
+            self.__tables[key] = table
+            self.__tables.move_to_end(key)
+            while len(self.__tables) > self.max_size:
+                self.__tables.popitem(last=False)
+        return table
+
+    def clear(self):
+        """
+        Remove all tables and reset counters.
+        """
+        with self.__lock:
+            self.__tables.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def psk_table(self, m, period, amplitude, sample_rate, phase_offset=0, dtype=np.float64, scale=1, cycles=1,
+                  decimation=1):
+        """
+        Sinwaves of every symbol of m-psk (or of any constellation), a symbol holds whole periods of sinwave.
+        Parameters
+        ----------
+        m Number of phases, power of two, or Constellation.
+        period Period of sinwave.
+        amplitude Amplitude of sinwave.
+        sample_rate Number of samples per milisecond.
+        phase_offset Phase added to every symbol.
+        dtype Type of samples.
+        scale Quantization step of integer samples.
+        cycles Number of periods of sinwave in one symbol.
+        decimation Keep every decimation-th sample, e.g. for detection after Decimator, it has to divide
+                   the number of samples of a symbol.
+
+        Returns
+        -------
+        np.ndarray Array of shape (m, samples per symbol), row k holds sinwave of symbol value k.
+        """
+        constellation = get_constellation(m)
+
+        def generate():
+            phases = constellation.phases + phase_offset
+            frequency = 1 / period
+            sample_sin_time = sample_times(period, sample_rate, cycles, decimation)
+            # sinwave of point p: A * |p| * sin(wt + angle(p))
+            table = (amplitude * constellation.magnitudes[:, np.newaxis]
+                     * np.sin(2 * np.pi * frequency * sample_sin_time + phases[:, np.newaxis]))
+            if np.issubdtype(dtype, np.integer):
+                return utils.quantize(table, scale, dtype)
+            return table.astype(dtype, copy=False)
+
+        key = ('psk', constellation.key, period, amplitude, sample_rate, phase_offset, np.dtype(dtype).str, scale,
+               cycles, decimation)
+        return self.get(key, generate)
+
+    def pearson_table(self, m, period, amplitude, sample_rate, phase_offset=0, dtype=np.float64, cycles=1,
+                      decimation=1):
+        """
+        Centered and normalized sinwaves of every symbol of m-psk, used for pearson correlation.
+        Parameters are the same as in psk_table.
+
+        Returns
+        -------
+        np.ndarray Array of shape (m, samples per symbol).
+        """
+        def generate():
+            patterns = self.psk_table(m, period, amplitude, sample_rate, phase_offset, dtype, cycles=cycles,
+                                      decimation=decimation)
+            patterns = patterns - patterns.mean(axis=1, keepdims=True)
+            return patterns / np.linalg.norm(patterns, axis=1, keepdims=True)
+
+        key = ('pearson', get_constellation(m).key, period, amplitude, sample_rate, phase_offset, np.dtype(dtype).str,
+               cycles, decimation)
+        return self.get(key, generate)
+
+    def quadrature_references(self, period, amplitude, sample_rate, phase_offset=0, dtype=np.float64, cycles=1,
+                              decimation=1):
+        """
+        Sine and cosine references of a symbol, scaled so the projection of a noise-free
+        symbol lies on the unit circle.
+        Parameters are the same as in psk_table.
+
+        Returns
+        -------
+        np.ndarray Array of shape (2, samples per symbol), sine in the first row, cosine in the second one.
+        """
+        def generate():
+            frequency = 1 / period
+            sample_sin_time = sample_times(period, sample_rate, cycles, decimation)
+            # A * sin(wt + phi) = A * cos(phi) * sin(wt) + A * sin(phi) * cos(wt)
+            references = np.array([np.sin(2 * np.pi * frequency * sample_sin_time + phase_offset),
+                                   np.cos(2 * np.pi * frequency * sample_sin_time + phase_offset)])
+            references *= 2 / (len(sample_sin_time) * amplitude)
+            return references.astype(dtype, copy=False)
+
+        key = ('quadrature', 0, period, amplitude, sample_rate, phase_offset, np.dtype(dtype).str, cycles, decimation)
+        return self.get(key, generate)
+
+
+waveform_cache = WaveformCache()
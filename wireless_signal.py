@@ -1,24 +1,39 @@
 import matplotlib.pylab as plt
+import numpy as np
 # import plotly.graph_objects as go
 
 
 class WirelessSignal:
-    def __init__(self, linspace, sinwave):
+    def __init__(self, linspace, sinwave, sample_rate=None):
         """ Set default parameters for modulation
 
             Parameters
             ----------
-            linspace : list or np.array
-                Linspace, timeline for signal.
+            linspace : list or np.array or None
+                Linspace, timeline for signal. If None, it is generated from sample_rate when needed.
             sinwave: list or np.array
                 signal values
+            sample_rate: int
+                Sample rate, number of samples per milisecond, used for generating linspace
         """
         self.__linspace = linspace
         self.__sinwave = sinwave
+        self.__sample_rate = sample_rate
         self.was_odd = False
         self.was_one = False
         self.was_two = False
         self.was_three = False
+        self.padding = 0
+        # number of sinwave samples of one symbol,
+        # baseband signal holds one complex point per symbol standing for symbol_length samples of sinwave
+        self.baseband = False
+        self.symbol_length = 1
+        # number of whole periods of sinwave in one symbol
+        self.cycles_per_symbol = 1
+        # symbols have envelope of a pulse shaper, so a symbol window does not hold whole periods of one sinwave
+        self.shaped = False
+        # quantized (integer) sinwave multiplied by scale gives real values
+        self.scale = 1
 
     def get_linspace(self):
         """ Gets linspace of WirelessSignal
@@ -28,6 +43,8 @@ class WirelessSignal:
            list
                linspace of the WirelessSignal
         """
+        if self.__linspace is None:
+            self.__linspace = np.arange(len(self.__sinwave)) / self.__sample_rate
         return self.__linspace
 
     def get_sinwave(self):
@@ -40,6 +57,24 @@ class WirelessSignal:
         """
         return self.__sinwave
 
+    def get_samples(self, dtype=np.float64):
+        """ Gets sinwave of WirelessSignal object as floating point array
+
+            Parameters
+            ----------
+            dtype: np.dtype
+                Floating point type of result
+
+           Returns
+           -------
+           np.ndarray
+               sinwave of the WirelessSignal, quantized sinwave is multiplied by scale
+        """
+        sinwave = np.asarray(self.__sinwave)
+        if np.issubdtype(sinwave.dtype, np.integer):
+            return sinwave.astype(dtype) * np.asarray(self.scale, dtype=dtype)
+        return sinwave.astype(dtype, copy=False)
+
     def set_linspace(self, linspace):
         """ Sets linspace of WirelessSignal object
 
@@ -60,10 +95,28 @@ class WirelessSignal:
         """
         self.__sinwave = sinwave
 
+    def copy(self, sinwave=None):
+        """ Makes WirelessSignal with the same parameters (padding, sample rate, scale...) and given sinwave
+
+            Parameters
+            ----------
+            sinwave: np.ndarray or None
+                sinwave of the copy, sinwave of this signal (not copied) if None
+
+           Returns
+           -------
+           WirelessSignal
+               New signal, this signal is not changed
+        """
+        signal = WirelessSignal(self.__linspace, self.__sinwave if sinwave is None else sinwave, self.__sample_rate)
+        signal.__dict__.update({name: value for name, value in self.__dict__.items()
+                                if not name.startswith('_WirelessSignal__')})
+        return signal
+
     def show_signal(self):
         """ Show WirelessSignal on the plot """
         try:
-            plt.plot(self.__linspace, self.__sinwave)
+            plt.plot(self.get_linspace(), self.__sinwave)
             plt.xlabel('time[s]')
             plt.ylabel('sin(x)')
             plt.axis('tight')